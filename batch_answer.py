@@ -0,0 +1,102 @@
+"""
+Answer a file of questions in one batch and write the results as JSONL, in input order.
+
+    python batch_answer.py questions.txt [--output answers.jsonl] [--concurrency 4]
+
+The input is either plain text (one question per line) or JSONL with a "question"
+field per line; "-" reads stdin. Menu and photo questions are answered directly,
+the rest go through AryaChatbot.iter_responses (batched embedding and retrieval,
+bounded concurrent LLM calls).
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import Dict, Iterator, List, Optional, TextIO, Union
+
+logger = logging.getLogger(__name__)
+
+
+def read_questions(stream: TextIO) -> List[str]:
+    """Questions from plain-text lines or JSONL objects with a "question" field; blank lines are skipped."""
+    questions = []
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            questions.append(str(json.loads(line)["question"]))
+        else:
+            questions.append(line)
+    return questions
+
+
+def to_record(question: str, response: Union[str, Dict], index: Optional[int] = None) -> Dict:
+    """JSON record for a response from get_response/iter_responses (also used by server.py)."""
+    record = {"question": question} if index is None else {"index": index, "question": question}
+    if isinstance(response, str):
+        record.update(type="menu", text=response)
+    elif "photos" in response:
+        record.update(type="photos", photos=response["photos"])
+    elif "error" in response:
+        record.update(type="error", error=response["error"])
+    else:
+        record.update(type="answer", text=response["text"])
+    return record
+
+
+def answer_questions(chatbot, questions: List[str], output: TextIO, max_concurrency: int = 4) -> Dict[str, int]:
+    """Write one JSONL record per question as soon as it (and every earlier one) is answered."""
+    counts: Dict[str, int] = {}
+    responses: Iterator = chatbot.iter_responses(questions, max_concurrency=max_concurrency)
+    for index, (question, response) in enumerate(zip(questions, responses)):
+        record = to_record(question, response, index)
+        counts[record["type"]] = counts.get(record["type"], 0) + 1
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+    return counts
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Answer a file of questions and write JSONL")
+    parser.add_argument("questions", help="Text file (one question per line) or JSONL; - for stdin")
+    parser.add_argument("--output", default="-", help="JSONL output path (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum LLM calls in flight")
+    parser.add_argument("--backend", choices=["local", "pinecone"], default=None,
+                        help="Vector backend (default: VECTOR_BACKEND from the config)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    from config import chatbot_options, load_config
+    from chatbot import AryaChatbot
+    from faq_store import FAQStore
+
+    if args.questions == "-":
+        questions = read_questions(sys.stdin)
+    else:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = read_questions(f)
+
+    config = load_config()
+    options = chatbot_options(config)
+    if args.backend:
+        options['vector_backend'] = args.backend
+    chatbot = AryaChatbot(
+        faq_store=FAQStore(config['FAQ_STORE_PATH'], threshold=float(config['FAQ_THRESHOLD']))
+        if config['FAQ_STORE_PATH'] else None,
+        **options
+    )
+    # Menu and photo questions are answered while the model loads
+    chatbot.start_warmup()
+
+    if args.output == "-":
+        counts = answer_questions(chatbot, questions, sys.stdout, args.concurrency)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            counts = answer_questions(chatbot, questions, f, args.concurrency)
+    logger.info("Answered %d questions: %s", len(questions), counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Embedding backends compared: load time, memory, query latency and retrieval agreement.
+
+Each configuration (backend:model, see embedding_backends.py) runs in a fresh
+subprocess, so its RSS is not mixed up with the others'. The worker embeds every
+chunk of data/data.txt, then embeds the labelled questions of
+benchmarks/retrieval_questions.json one at a time and retrieves the top 3 chunks.
+The report gives, per configuration:
+
+    load s       time to load (and on first use, export) the model
+    RSS MB       resident memory after loading and indexing
+    p50/p95 ms   single-query embedding latency
+    hit@3        questions with a relevant chunk in the top 3
+    top1 / @3    agreement with the first configuration (the reference): same top chunk,
+                 and the mean overlap of the top-3 sets
+
+Needs the model weights (network access or a warm cache) and, for the ONNX backends,
+onnxruntime (and optimum to build the export once).
+
+    python benchmarks/bench_embeddings.py [--configs torch:large,int8:large,onnx-int8:large,onnx-int8:small]
+        [--threads 4] [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+DEFAULT_CONFIGS = "torch:large,int8:large,onnx:large,onnx-int8:large,onnx-int8:base,onnx-int8:small"
+TOP_K = 3
+
+
+def run_worker(config: str, threads: int, cache_dir: str) -> Dict:
+    """Measure one backend:model in this process (called in a subprocess by main)."""
+    import numpy as np
+
+    from bench_get_response import percentile
+    from bench_tenancy import rss_mb
+    from embedding_backends import load_embeddings
+    from ingest import chunk_knowledge_base
+
+    backend, _, model = config.partition(":")
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    embeddings = load_embeddings(backend, model or "large", cache_dir, threads or None)
+    embeddings.embed_query("warm up")
+    load_seconds = time.perf_counter() - start
+
+    chunks = chunk_knowledge_base(os.path.join(ROOT_DIR, "data", "data.txt"))
+    texts = [chunk["text"] for chunk in chunks]
+    start = time.perf_counter()
+    matrix = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    index_seconds = time.perf_counter() - start
+
+    with open(os.path.join(BENCH_DIR, "retrieval_questions.json"), encoding="utf-8") as f:
+        labelled = json.load(f)
+    latencies, top, hits = [], [], 0
+    for item in labelled:
+        start = time.perf_counter()
+        vector = np.asarray(embeddings.embed_query(item["question"]), dtype=np.float32)
+        latencies.append(time.perf_counter() - start)
+        ranked = [int(i) for i in np.argsort(-(matrix @ vector))[:TOP_K]]
+        top.append(ranked)
+        relevant = [snippet.lower() for snippet in item["relevant"]]
+        hits += any(snippet in texts[i].lower() for i in ranked for snippet in relevant)
+
+    return {
+        "config": config,
+        "dimensions": int(matrix.shape[1]),
+        "load_seconds": load_seconds,
+        "index_seconds": index_seconds,
+        "rss_mb": rss_mb() - rss_before,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "hit_at_3": hits / len(labelled),
+        "top": top,
+    }
+
+
+def agreement(reference: List[List[int]], other: List[List[int]]) -> Dict:
+    pairs = list(zip(reference, other))
+    return {
+        "top1": sum(a[0] == b[0] for a, b in pairs) / len(pairs),
+        "overlap_at_3": sum(len(set(a) & set(b)) / TOP_K for a, b in pairs) / len(pairs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--configs", default=DEFAULT_CONFIGS, help="Comma-separated backend:model pairs")
+    parser.add_argument("--threads", type=int, default=0, help="Embedding threads (0: runtime default)")
+    parser.add_argument("--cache-dir", default="", help="Model cache (default: the Hugging Face cache)")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.threads, args.cache_dir or None)))
+        return
+
+    results = []
+    for config in args.configs.split(","):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", config, "--threads", str(args.threads),
+             "--cache-dir", args.cache_dir],
+            cwd=ROOT_DIR, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{config}: failed\n{proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ''}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    if not results:
+        sys.exit("No configuration could be measured")
+
+    reference = results[0]
+    print(f"{'config':<20} {'dims':>5} {'load s':>7} {'RSS MB':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'hit@3':>6} {'top1':>6} {'@3':>6}")
+    for result in results:
+        result["agreement"] = agreement(reference["top"], result["top"])
+        print(f"{result['config']:<20} {result['dimensions']:>5} {result['load_seconds']:>7.1f} "
+              f"{result['rss_mb']:>8.0f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+              f"{result['hit_at_3']:>6.0%} {result['agreement']['top1']:>6.0%} "
+              f"{result['agreement']['overlap_at_3']:>6.0%}")
+    print(f"agreement is measured against {reference['config']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"reference": reference["config"], "threads": args.threads, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Offline end-to-end latency benchmark for AryaChatbot.get_response.
+
+The chatbot runs against deterministic local stand-ins (benchmarks/stubs.py), with
+configurable artificial latency for the embedding model, the vector index and the LLM.
+A labelled question corpus (benchmarks/questions.json) covers the menu, day/meal,
+photo and QA routes. Per route the harness reports p50/p95/p99 latency, throughput
+and peak Python allocations per call. Results are machine-readable, so runs from two
+commits can be compared:
+
+    python benchmarks/bench_get_response.py --json before.json
+    python benchmarks/bench_get_response.py --json after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from stubs import make_stub_chatbot  # noqa: E402
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], allocations: List[int]) -> Dict:
+    total = sum(latencies)
+    return {
+        "count": len(latencies),
+        "mean_ms": total / len(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_qps": len(latencies) / total if total else 0.0,
+        "peak_alloc_kib_p50": percentile(allocations, 50) / 1024,
+        "peak_alloc_kib_max": max(allocations) / 1024 if allocations else 0.0,
+    }
+
+
+def load_corpus(path: str) -> Dict[str, List[str]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def response_kind(response) -> str:
+    """Which path answered: menu (plain text), photo or qa."""
+    if isinstance(response, str):
+        return "menu"
+    return "photo" if "photos" in response else "qa"
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(bot, corpus: Dict[str, List[str]], iterations: int, trace_allocations: bool) -> Dict:
+    """Ask every corpus question `iterations` times; group timings by route."""
+    latencies = defaultdict(list)
+    allocations = defaultdict(list)
+    mismatches = []
+
+    # Warm the menu and photo paths (manifest load, first CSV read) outside the timings;
+    # QA questions are left cold so the first iteration measures real cache misses
+    for label, questions in corpus.items():
+        if label != "qa":
+            for question in questions:
+                bot.get_response(question)
+
+    for _ in range(iterations):
+        for label, questions in corpus.items():
+            for question in questions:
+                hits_before = bot.answer_cache.hits
+                if trace_allocations:
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+                start = time.perf_counter()
+                response = bot.get_response(question)
+                elapsed = time.perf_counter() - start
+                if trace_allocations:
+                    peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+                else:
+                    peak_bytes = 0
+
+                answered_by = response_kind(response)
+                if answered_by != label.split("_")[0] and question not in {m["question"] for m in mismatches}:
+                    mismatches.append({"question": question, "expected": label, "answered_by": answered_by})
+
+                route = label
+                if label == "qa" and bot.answer_cache.hits > hits_before:
+                    route = "qa_cached"
+                latencies[route].append(elapsed)
+                allocations[route].append(peak_bytes)
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    all_allocations = [value for values in allocations.values() for value in values]
+    return {
+        "routes": {route: summarize(latencies[route], allocations[route]) for route in sorted(latencies)},
+        "overall": summarize(all_latencies, all_allocations),
+        "routing_mismatches": mismatches,
+    }
+
+
+def compare(current: Dict, baseline: Dict):
+    """Print per-route p50/p95 deltas against a previous result file."""
+    print(f"\nvs {baseline['meta'].get('revision', '?')}:")
+    for route, stats in current["routes"].items():
+        old = baseline["routes"].get(route)
+        if not old:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            delta = stats[key] - old[key]
+            pct = delta / old[key] * 100 if old[key] else 0.0
+            print(f"  {route:<13} {key:<7} {old[key]:9.3f} -> {stats[key]:9.3f} ms ({pct:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline get_response latency benchmark")
+    parser.add_argument("--corpus", default=os.path.join(BENCH_DIR, "questions.json"))
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0)
+    parser.add_argument("--retrieval-latency-ms", type=float, default=40.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the answer and embedding caches")
+    parser.add_argument("--no-allocations", action="store_true", help="Skip tracemalloc (it slows every call)")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Previous results file to diff against")
+    args = parser.parse_args()
+
+    bot = make_stub_chatbot(
+        embed_latency=args.embed_latency_ms / 1000,
+        retrieval_latency=args.retrieval_latency_ms / 1000,
+        llm_latency=args.llm_latency_ms / 1000,
+        use_cache=not args.no_cache
+    )
+    corpus = load_corpus(args.corpus)
+
+    if not args.no_allocations:
+        tracemalloc.start()
+    results = run(bot, corpus, args.iterations, trace_allocations=not args.no_allocations)
+    if not args.no_allocations:
+        tracemalloc.stop()
+
+    results["meta"] = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "embed_latency_ms": args.embed_latency_ms,
+        "retrieval_latency_ms": args.retrieval_latency_ms,
+        "llm_latency_ms": args.llm_latency_ms,
+        "cache": not args.no_cache,
+        "allocations_traced": not args.no_allocations,
+    }
+
+    print(f"{'route':<13} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'qps':>9} {'alloc KiB':>10}")
+    for route, stats in list(results["routes"].items()) + [("overall", results["overall"])]:
+        print(f"{route:<13} {stats['count']:>5} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+              f"{stats['p99_ms']:>9.3f} {stats['throughput_qps']:>9.1f} {stats['peak_alloc_kib_p50']:>10.1f}")
+    for mismatch in results["routing_mismatches"]:
+        print(f"routing mismatch: {mismatch}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Tail latency and error benchmark for llm_client.ResilientLLM against the local stub endpoint.
+
+Starts benchmarks/stub_llm_server.py in-process with a slow tail and random 500/503s,
+then sends the same sequence of calls through each client variant:
+
+    single   one attempt, no hedging (roughly the old bare endpoint client plus a timeout)
+    retry    jittered retries within the deadline
+    hedged   retries plus a duplicate request after the p95 delay
+
+and reports p50/p95/p99 latency, failed calls and the client's retry/hedge counters.
+
+    python benchmarks/bench_llm_client.py [--calls 200] [--slow-rate 0.05] [--fail-rate 0.05]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from bench_get_response import percentile  # noqa: E402
+from stub_llm_server import StubLLMServer  # noqa: E402
+from llm_client import ResilientLLM  # noqa: E402
+
+VARIANTS = {
+    "single": {"max_attempts": 1, "hedge": False},
+    "retry": {"max_attempts": 3, "hedge": False},
+    "hedged": {"max_attempts": 3, "hedge": True},
+}
+
+
+def run_variant(args, options: Dict) -> Dict:
+    server = StubLLMServer(latency=args.latency_ms / 1000, slow_rate=args.slow_rate,
+                           slow_latency=args.slow_ms / 1000, fail_rate=args.fail_rate, seed=args.seed)
+    server.start()
+    llm = ResilientLLM(endpoint_url=server.url, timeout=args.timeout, backoff_base=0.05,
+                       hedge_delay=args.latency_ms * 2 / 1000, **options)
+    latencies, failures = [], 0
+
+    def call(i):
+        start = time.perf_counter()
+        try:
+            llm.invoke(f"question {i}")
+            return time.perf_counter() - start, False
+        except Exception:
+            return time.perf_counter() - start, True
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for latency, failed in pool.map(call, range(args.calls)):
+                latencies.append(latency)
+                failures += failed
+    finally:
+        server.shutdown()
+        server.server_close()
+    stats = llm.stats()
+    return {
+        "calls": args.calls,
+        "failures": failures,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "upstream_requests": server.requests,
+        "retries": stats["retries"],
+        "hedges": stats["hedges"],
+        "hedge_wins": stats["hedge_wins"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=1000.0)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=5.0, help="Client deadline per call in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+    # Every retry logs a warning; keep the table readable
+    logging.getLogger("llm_client").setLevel(logging.ERROR)
+
+    report = {}
+    print(f"{'variant':8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'failed':>7} "
+          f"{'upstream':>9} {'retries':>8} {'hedges':>7} {'won':>5}")
+    for name, options in VARIANTS.items():
+        result = run_variant(args, options)
+        report[name] = result
+        print(f"{name:8} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f} "
+              f"{result['max_ms']:8.1f} {result['failures']:7d} {result['upstream_requests']:9d} "
+              f"{result['retries']:8d} {result['hedges']:7d} {result['hedge_wins']:5d}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Peak-load benchmark for the LLM scheduler against a rate-limited stub endpoint.
+
+A burst of --users distinct QA questions arrives over --arrival-seconds (Poisson
+arrivals) at a chatbot whose LLM is the real ResilientLLM client talking to
+benchmarks/stub_llm_server.py. The stub answers 429 with Retry-After above
+--endpoint-rate requests per second. Each variant runs on a fresh chatbot and endpoint:
+
+    unscheduled  no rate budget, queue or deadline: every question goes straight to the
+                 endpoint, and the client retries 429s until its timeout
+    scheduled    a rate budget of --rate calls per second plus a --burst (together at most
+                 --endpoint-rate in any second), a bounded priority queue and a --deadline;
+                 questions that cannot make it get the fallback answer
+
+The report gives, per variant, how many users were answered, answered within the
+deadline, shed to the fallback answer or failed, latency percentiles of answers and of
+fallbacks/failures, and the upstream requests and 429s the endpoint saw.
+
+    python benchmarks/bench_llm_scheduler.py [--users 200] [--arrival-seconds 5]
+        [--endpoint-rate 10] [--latency-ms 500] [--deadline 4] [--json out.json]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from bench_get_response import percentile  # noqa: E402
+from chatbot import SHED_ANSWER  # noqa: E402
+from llm_client import ResilientLLM  # noqa: E402
+from stub_llm_server import StubLLMServer  # noqa: E402
+from stubs import make_stub_chatbot  # noqa: E402
+
+
+def variants(args) -> Dict[str, Dict]:
+    return {
+        "unscheduled": dict(llm_rate_limit=None, llm_max_in_flight=10 ** 6, llm_queue_size=10 ** 6,
+                            llm_deadline=None),
+        "scheduled": dict(llm_rate_limit=args.rate or args.endpoint_rate - args.burst, llm_burst=args.burst,
+                          llm_max_in_flight=args.max_in_flight, llm_queue_size=args.queue_size,
+                          llm_deadline=args.deadline),
+    }
+
+
+def run_variant(args, options: Dict) -> Dict:
+    server = StubLLMServer(latency=args.latency_ms / 1000, rate_limit=args.endpoint_rate, seed=args.seed)
+    server.start()
+    llm = ResilientLLM(endpoint_url=server.url, timeout=args.timeout, max_attempts=args.max_attempts,
+                       pool_size=args.users)
+    bot = make_stub_chatbot(llm=llm, use_cache=False, **options)
+    # The scheduler starts from the endpoint's typical latency, as it would after a few calls
+    bot.llm_scheduler.default_service_seconds = args.latency_ms / 1000
+
+    rng = random.Random(args.seed)
+    arrivals, at = [], 0.0
+    for _ in range(args.users):
+        at += rng.expovariate(args.users / args.arrival_seconds)
+        arrivals.append(at)
+    outcomes: List[Tuple[str, float]] = [("", 0.0)] * args.users
+
+    def user(i: int, start: float):
+        time.sleep(max(0.0, start + arrivals[i] - time.perf_counter()))
+        asked = time.perf_counter()
+        try:
+            response = bot.get_response(f"Tell me about the hostel fee, question {i}")
+            outcome = "shed" if response["text"] == SHED_ANSWER else "answered"
+        except Exception:
+            outcome = "failed"
+        outcomes[i] = (outcome, time.perf_counter() - asked)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i, start)) for i in range(args.users)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    answered = [seconds for outcome, seconds in outcomes if outcome == "answered"]
+    other = [seconds for outcome, seconds in outcomes if outcome != "answered"]
+    ms = lambda values, q: percentile(values, q) * 1000 if values else 0.0  # noqa: E731
+    return {
+        "users": args.users,
+        "answered": len(answered),
+        "in_deadline": sum(seconds <= args.deadline for seconds in answered),
+        "shed": sum(outcome == "shed" for outcome, _ in outcomes),
+        "failed": sum(outcome == "failed" for outcome, _ in outcomes),
+        "answer_p50_ms": ms(answered, 50),
+        "answer_p95_ms": ms(answered, 95),
+        "fallback_p95_ms": ms(other, 95),
+        "upstream_requests": server.requests + server.rate_limited,
+        "upstream_429s": server.rate_limited,
+        "scheduler": bot.llm_scheduler.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--arrival-seconds", type=float, default=5.0, help="Window the users arrive in")
+    parser.add_argument("--endpoint-rate", type=float, default=10.0, help="Endpoint requests per second before 429")
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Endpoint time per answer")
+    parser.add_argument("--deadline", type=float, default=4.0, help="Seconds a user waits for an answer")
+    parser.add_argument("--rate", type=float, default=0.0, help="Scheduler budget (0: --endpoint-rate minus --burst)")
+    parser.add_argument("--burst", type=int, default=2)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=10.0, help="LLM client deadline per call")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+    # Every retry logs a warning; keep the table readable
+    logging.basicConfig(level=logging.ERROR)
+
+    report = {}
+    print(f"{args.users} users over {args.arrival_seconds:g}s, endpoint limit {args.endpoint_rate:g}/s, "
+          f"{args.latency_ms:g} ms per answer, {args.deadline:g}s deadline")
+    print(f"{'variant':<12} {'answered':>8} {'in time':>8} {'shed':>6} {'failed':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'fallback p95':>12} {'upstream':>9} {'429s':>6}")
+    for name, options in variants(args).items():
+        result = run_variant(args, options)
+        report[name] = result
+        print(f"{name:<12} {result['answered']:>8} {result['in_deadline']:>8} {result['shed']:>6} "
+              f"{result['failed']:>7} {result['answer_p50_ms']:>8.0f} {result['answer_p95_ms']:>8.0f} "
+              f"{result['fallback_p95_ms']:>12.0f} {result['upstream_requests']:>9} {result['upstream_429s']:>6}")
+    print("fallback p95: latency of shed and failed questions")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark: per-question routing cost of IntentRouter versus the original
+inline regex/substring cascade in handle_menu_query/handle_photo_query, and a check
+that both classify the question set alike.
+
+    python benchmarks/bench_router.py [--iterations 2000]
+
+Only classification is timed; menu lookups and photo globbing are excluded.
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from router import DEFAULT_PHOTO_CATEGORIES, IntentRouter  # noqa: E402
+
+QUESTIONS = [
+    "What's for lunch today?",
+    "Show me the weekly menu",
+    "What is the menu on Monday?",
+    "What is for dinner on friday",
+    "Saturday breakfast please",
+    "Show me the hostel rooms",
+    "Can I see pictures of the mess?",
+    "Photos of the sports facilities",
+    "I want to see the hostel building",
+    "How many rooms are there in the hostel?",
+    "What is the mess fee and when is it due?",
+    "Can my parents stay overnight in my room?",
+    "Who should I contact about the wifi issue?",
+    "Is smoking allowed inside the hostel?",
+    "What time do I need to be back at night?",
+]
+
+
+def legacy_route(question: str, photo_categories=DEFAULT_PHOTO_CATEGORIES):
+    """The pre-router classification cascade, kept verbatim for comparison."""
+    question_lower = question.lower()
+    if re.search(r"(current menu|today menu|what's for|what is for|what are we eating|mess menu|food|"
+                 r"today's food|what's being served|what is on the menu|what are we having|"
+                 r"what are we eating today|what's on today's menu|what's on the menu for today|"
+                 r"what are we getting in the mess|what food is in the mess|what is for lunch|"
+                 r"what is for dinner|today's lunch menu|today's dinner menu)", question_lower):
+        return ("menu_current", None, None)
+    if re.search(r"week(ly)? menu", question_lower):
+        return ("menu_week", None, None)
+
+    days_of_week = ['sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
+    meals = ['breakfast', 'lunch', 'dinner', 'dessert', 'morning', 'night']
+    day_found = None
+    meal_found = None
+    for day in days_of_week:
+        if day in question_lower:
+            day_found = day.capitalize()
+            break
+    for meal in meals:
+        if meal in question_lower:
+            meal_found = meal
+            break
+    if day_found:
+        return ("menu_day", day_found, meal_found)
+
+    if not re.search(r"(photo|picture|image|pic|show me|look|view)", question_lower):
+        return ("qa", None, None)
+    targets = []
+    for category, subcategories in photo_categories.items():
+        if category in question_lower:
+            subs = [sub for sub in subcategories if sub.replace("_", " ") in question_lower]
+            targets.append((category, subs))
+    whole_hostel = bool(re.search(r"(hostel|building|campus)", question_lower))
+    return ("photo", targets, whole_hostel)
+
+
+def router_route(router: IntentRouter, question: str):
+    route = router.route(question)
+    if route.intent == "photo":
+        return ("photo", route.photo_categories, route.whole_hostel)
+    return (route.intent, route.day, route.meal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N timing runs")
+    args = parser.parse_args()
+
+    router = IntentRouter()
+
+    mismatches = [q for q in QUESTIONS if legacy_route(q) != router_route(router, q)]
+    for question in mismatches:
+        print(f"MISMATCH {question!r}: legacy={legacy_route(question)} router={router_route(router, question)}")
+
+    n = args.iterations * len(QUESTIONS)
+    legacy = min(timeit.repeat(lambda: [legacy_route(q) for q in QUESTIONS],
+                               number=args.iterations, repeat=args.repeat)) / n
+    compiled = min(timeit.repeat(lambda: [router.route(q) for q in QUESTIONS],
+                                 number=args.iterations, repeat=args.repeat)) / n
+
+    print(f"questions: {len(QUESTIONS)}  iterations: {args.iterations}  mismatches: {len(mismatches)}")
+    print(f"legacy cascade : {legacy * 1e6:8.2f} us/question")
+    print(f"IntentRouter   : {compiled * 1e6:8.2f} us/question")
+    print(f"speedup        : {legacy / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
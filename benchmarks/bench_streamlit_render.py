@@ -0,0 +1,119 @@
+"""
+Per-rerun render time of streamlit_app.py, measured headless with Streamlit's AppTest.
+
+The app runs against the stub chatbot from benchmarks/stubs.py (no model or API keys).
+A session first asks --history questions (photo and text, so the history holds images),
+then the harness times:
+
+    rerun    a plain rerun of the whole page, e.g. after a widget outside the chat changes
+    submit   asking a new question through the form
+
+AppTest always reruns the whole script, so for the app's chat fragment the harness also
+reports the time spent inside it (arya_render_seconds{view="chat"}), which is what a
+submit costs in a browser session where only the fragment reruns.
+
+    python benchmarks/bench_streamlit_render.py [--history 5] [--runs 30] [--json out.json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from bench_get_response import percentile  # noqa: E402
+from metrics import DEFAULT_METRICS  # noqa: E402
+from stubs import make_stub_chatbot  # noqa: E402
+
+QUESTIONS = [
+    "Show me a picture of the hostel building",
+    "How many rooms are there in the hostel?",
+    "Show me photos of the mess",
+    "What is the mess fee?",
+    "Can parents visit the hostel?",
+]
+
+
+def summarize(latencies: List[float]) -> Dict:
+    return {
+        "runs": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+def ask(app, question: str):
+    app.text_input(key="user_input").input(question)
+    next(button for button in app.button if button.label == "Send").click().run()
+    if app.exception:
+        raise Exception(f"App error: {app.exception[0].message}")
+
+
+def chat_view_seconds() -> List[float]:
+    """[total seconds, renders] of the app's chat fragment so far; empty if the app has none."""
+    for series in DEFAULT_METRICS.snapshot()["histograms"].get("arya_render_seconds", []):
+        if series["labels"].get("view") == "chat":
+            return [series["sum"], series["count"]]
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--history", type=int, default=5, help="Questions asked before timing")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    from streamlit.testing.v1 import AppTest
+
+    os.environ.setdefault("HUGGING_FACE_API", "stub")
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ["FAQ_STORE_PATH"] = ""
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    os.chdir(ROOT_DIR)
+
+    app = AppTest.from_file(os.path.join(ROOT_DIR, "streamlit_app.py"), default_timeout=60)
+    app.session_state["chatbot"] = make_stub_chatbot()
+    app.run()
+    for i in range(args.history):
+        ask(app, QUESTIONS[i % len(QUESTIONS)])
+
+    reruns = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        app.run()
+        reruns.append(time.perf_counter() - start)
+
+    submits = []
+    chat_before = chat_view_seconds()
+    for i in range(args.runs):
+        start = time.perf_counter()
+        ask(app, QUESTIONS[(args.history + i) % len(QUESTIONS)])
+        submits.append(time.perf_counter() - start)
+    chat_after = chat_view_seconds()
+
+    report = {"history": args.history, "rerun": summarize(reruns), "submit": summarize(submits)}
+    if chat_after:
+        total, count = chat_before or [0.0, 0]
+        report["chat_fragment_mean_ms"] = (chat_after[0] - total) / (chat_after[1] - count) * 1000
+    print(f"{'':8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name in ("rerun", "submit"):
+        result = report[name]
+        print(f"{name:8} {result['mean_ms']:8.2f} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f}")
+    if "chat_fragment_mean_ms" in report:
+        print(f"chat fragment per submit: {report['chat_fragment_mean_ms']:.2f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
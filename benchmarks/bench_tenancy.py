@@ -0,0 +1,142 @@
+"""
+Memory per hostel when several hostels share one process (tenancy.py).
+
+Builds --tenants hostels in a scratch directory (each a copy of data/data.txt with its
+own hostel name, plus a copy of the menu; all share the hostel_photos tree), then loads
+them one by one through a TenantRegistry and reports:
+
+    process      RSS with the shared model/client and the first hostel loaded, i.e. what
+                 a dedicated process per hostel costs
+    per tenant   RSS growth for each further hostel, and the registry's own estimate
+    eviction     loads/evictions when cycling through all hostels under --budget-mb
+
+By default the stub chatbot from benchmarks/stubs.py is used (no model download), so
+"process" understates a real deployment, where the shared embedding model alone is
+~2 GB; --real loads the actual model (needs HUGGING_FACE_API and network access).
+
+    python benchmarks/bench_tenancy.py [--tenants 8] [--budget-mb 2] [--real] [--json out.json]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from stubs import StubChatbot  # noqa: E402
+from tenancy import Tenant, TenantRegistry  # noqa: E402
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux /proc), falling back to the peak from getrusage."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_tenants(root: str, count: int) -> List[Tenant]:
+    with open(os.path.join(ROOT_DIR, "data", "data.txt"), encoding="utf-8") as f:
+        knowledge = f.read()
+    tenants = []
+    for i in range(count):
+        tenant_id = f"hostel{i}"
+        name = f"Hostel {i}"
+        base = os.path.join(root, tenant_id)
+        os.makedirs(base)
+        with open(os.path.join(base, "data.txt"), "w", encoding="utf-8") as f:
+            f.write(knowledge.replace("Arya Bhatt Hostel", name))
+        shutil.copy(os.path.join(ROOT_DIR, "data", "mess_menu.csv"), os.path.join(base, "mess_menu.csv"))
+        tenants.append(Tenant(id=tenant_id, name=name, data_path=os.path.join(base, "data.txt"),
+                              index_dir=os.path.join(base, "index"), menu_path=os.path.join(base, "mess_menu.csv"),
+                              photos_directory=os.path.join(ROOT_DIR, "hostel_photos")))
+    return tenants
+
+
+def touch(chatbot):
+    """Exercise the tenant's index, menu and photos so lazily built state is counted."""
+    chatbot.get_response("How many rooms are there in the hostel?")
+    chatbot.get_response("What is for dinner today?")
+    chatbot.get_response("Show me photos of the mess")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tenants", type=int, default=8)
+    parser.add_argument("--budget-mb", type=float, default=2.0, help="Registry budget for the eviction run")
+    parser.add_argument("--real", action="store_true", help="Use the real embedding model and LLM client")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    root = tempfile.mkdtemp(prefix="arya-tenants-")
+    try:
+        tenants = make_tenants(root, args.tenants)
+        if args.real:
+            from chatbot import AryaChatbot
+            chatbot_class = AryaChatbot
+            chatbot_kwargs: Dict = {"pinecone_api_key": None, "pinecone_env": None,
+                                    "huggingface_api": os.environ.get("HUGGING_FACE_API"), "vector_backend": "local"}
+        else:
+            chatbot_class = StubChatbot
+            chatbot_kwargs = {}
+
+        # Unbounded budget: measure the growth per hostel
+        registry = TenantRegistry(tenants, chatbot_kwargs, memory_budget_mb=float("inf"), chatbot_class=chatbot_class)
+        before = rss_mb()
+        touch(registry.get(tenants[0].id))
+        gc.collect()
+        process = rss_mb()
+        growth = []
+        for tenant in tenants[1:]:
+            start = rss_mb()
+            touch(registry.get(tenant.id))
+            gc.collect()
+            growth.append(rss_mb() - start)
+        estimates = registry.stats()["loaded_mb"]
+
+        # Tight budget: cycle through every hostel twice
+        bounded = TenantRegistry(tenants, chatbot_kwargs, memory_budget_mb=args.budget_mb, chatbot_class=chatbot_class)
+        for _ in range(2):
+            for tenant in tenants:
+                bounded.get(tenant.id)
+        bounded_stats = bounded.stats()
+
+        report = {
+            "tenants": args.tenants,
+            "real_model": args.real,
+            "rss_before_mb": before,
+            "process_mb": process,
+            "per_tenant_rss_mb": sum(growth) / len(growth) if growth else None,
+            "per_tenant_estimate_mb": sum(estimates.values()) / len(estimates),
+            "eviction": {key: bounded_stats[key] for key in ("budget_mb", "total_mb", "loaded", "loads", "evictions")},
+        }
+        print(f"process with one hostel:    {process:8.1f} MB RSS")
+        if growth:
+            print(f"each further hostel:        {report['per_tenant_rss_mb']:8.2f} MB RSS "
+                  f"(estimate {report['per_tenant_estimate_mb']:.2f} MB)")
+        print(f"budget {args.budget_mb:g} MB, {args.tenants} hostels x2: {bounded_stats['loads']} loads, "
+              f"{bounded_stats['evictions']} evictions, {len(bounded_stats['loaded'])} resident "
+              f"({bounded_stats['total_mb']:.2f} MB)")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Compressed local index: memory per vector, search latency and recall per compression mode.
+
+Every mode of vector_codecs.py ("none", "float16", "int8", "pq") is measured with and
+without re-ranking (--rerank), on two corpora:
+
+    kb         the chunks of data/data.txt, queried with the labelled questions of
+               benchmarks/retrieval_questions.json (stub embeddings by default, or a real
+               model with --backend/--model, see embedding_backends.py)
+    synthetic  --vectors clustered unit vectors of --dim dimensions, queried with noisy
+               copies of random members; the knowledge base is far too small for the
+               codes to matter, this stands in for a large one
+
+The report gives, per corpus, mode and re-rank setting:
+
+    B/vec        bytes held in memory per vector (float32 is 4 x dim)
+    MB           the whole in-memory copy; with compression the float32 matrix stays
+                 memory-mapped on disk and only re-ranked rows are read
+    fit s        time to fit the codes; they are saved next to the index, so later rows
+                 of the same mode (and later starts) only load them
+    p50/p95 ms   single-query search latency, query embedding excluded
+    recall@3     overlap of the top 3 with the exact float32 top 3
+    hit@3        (kb only) questions with a relevant chunk in the top 3
+
+    python benchmarks/bench_vector_compression.py [--vectors 50000] [--dim 1024] [--rerank 0,10]
+        [--backend torch --model large] [--json out.json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from bench_get_response import percentile  # noqa: E402
+from local_index import LocalVectorStore  # noqa: E402
+from stubs import StubEmbeddings  # noqa: E402
+from vector_codecs import COMPRESSION_MODES  # noqa: E402
+
+TOP_K = 3
+
+
+def knowledge_base(embeddings) -> Dict:
+    """Chunk vectors, query vectors and relevance labels for data/data.txt."""
+    from ingest import chunk_knowledge_base
+
+    texts = [chunk["text"] for chunk in chunk_knowledge_base(os.path.join(ROOT_DIR, "data", "data.txt"))]
+    with open(os.path.join(BENCH_DIR, "retrieval_questions.json"), encoding="utf-8") as f:
+        labelled = json.load(f)
+    return {
+        "name": "kb",
+        "texts": texts,
+        "vectors": np.asarray(embeddings.embed_documents(texts), dtype=np.float32),
+        "queries": np.asarray([embeddings.embed_query(item["question"]) for item in labelled], dtype=np.float32),
+        "relevant": [[snippet.lower() for snippet in item["relevant"]] for item in labelled],
+    }
+
+
+def synthetic(count: int, dim: int, queries: int, seed: int) -> Dict:
+    """Clustered unit vectors (about 50 per cluster) and noisy copies of some of them as queries."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, count // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=count)] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picked = vectors[rng.choice(count, queries, replace=False)]
+    noisy = picked + 0.03 * rng.standard_normal(picked.shape).astype(np.float32)
+    return {
+        "name": "synthetic",
+        "texts": [f"vector {i}" for i in range(count)],
+        "vectors": vectors,
+        "queries": noisy / np.linalg.norm(noisy, axis=1, keepdims=True),
+        "relevant": None,
+    }
+
+
+def build_index(corpus: Dict, embeddings, index_dir: str) -> None:
+    store = LocalVectorStore(embeddings, index_dir=index_dir, source_sha1=corpus["name"])
+    store.add_vectors(LocalVectorStore._normalize(corpus["vectors"]), corpus["texts"],
+                      [{} for _ in corpus["texts"]], [str(i) for i in range(len(corpus["texts"]))])
+    store.save()
+
+
+def measure(corpus: Dict, embeddings, index_dir: str, mode: str, rerank: int,
+            exact: Optional[List[List[int]]]) -> Dict:
+    store = LocalVectorStore.load(embeddings, index_dir)
+    start = time.perf_counter()
+    store.compress(mode, rerank)
+    fit_seconds = time.perf_counter() - start
+    rows, dim = store.vectors.shape
+    in_memory = store.codec.nbytes if store.codec is not None else rows * dim * 4
+
+    latencies, top = [], []
+    for query in corpus["queries"]:
+        start = time.perf_counter()
+        results = store.similarity_search_with_score_by_vector(query.tolist(), k=TOP_K)
+        latencies.append(time.perf_counter() - start)
+        top.append([int(doc.metadata["id"]) for doc, _ in results])
+
+    result = {
+        "corpus": corpus["name"],
+        "mode": mode,
+        "rerank": rerank,
+        "vectors": rows,
+        "bytes_per_vector": in_memory / rows,
+        "memory_mb": in_memory / 1e6,
+        "fit_seconds": fit_seconds,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "recall_at_3": (sum(len(set(a) & set(b)) for a, b in zip(exact, top)) / (TOP_K * len(top))
+                        if exact is not None else 1.0),
+        "top": top,
+    }
+    if corpus["relevant"] is not None:
+        hits = sum(any(snippet in corpus["texts"][i].lower() for i in ranked for snippet in relevant)
+                   for ranked, relevant in zip(top, corpus["relevant"]))
+        result["hit_at_3"] = hits / len(top)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default=",".join(COMPRESSION_MODES), help="Comma-separated compression modes")
+    parser.add_argument("--rerank", default="0,10", help="Comma-separated re-rank factors (0: approximate order)")
+    parser.add_argument("--vectors", type=int, default=50000, help="Synthetic corpus size (0 skips it)")
+    parser.add_argument("--dim", type=int, default=1024, help="Synthetic (and stub embedding) dimensions")
+    parser.add_argument("--queries", type=int, default=200, help="Synthetic queries")
+    parser.add_argument("--backend", help="Embed the knowledge base with a real model (embedding_backends.py)")
+    parser.add_argument("--model", default="large", help="e5 size alias or model id, with --backend")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    if args.backend:
+        from embedding_backends import load_embeddings
+        embeddings = load_embeddings(args.backend, args.model)
+    else:
+        embeddings = StubEmbeddings(args.dim)
+
+    corpora = [knowledge_base(embeddings)]
+    if args.vectors:
+        corpora.append(synthetic(args.vectors, args.dim, args.queries, args.seed))
+    modes = args.modes.split(",")
+    reranks = [int(value) for value in args.rerank.split(",")]
+
+    results = []
+    for corpus in corpora:
+        with tempfile.TemporaryDirectory(prefix="arya-codes-") as index_dir:
+            build_index(corpus, embeddings, index_dir)
+            exact = measure(corpus, embeddings, index_dir, "none", 0, None)
+            results.append(exact)
+            for mode in modes:
+                if mode == "none":
+                    continue
+                for rerank in reranks:
+                    results.append(measure(corpus, embeddings, index_dir, mode, rerank, exact["top"]))
+
+    print(f"{'corpus':<10} {'mode':<8} {'rerank':>6} {'B/vec':>7} {'MB':>8} {'fit s':>6} {'p50 ms':>7} "
+          f"{'p95 ms':>7} {'recall@3':>8} {'hit@3':>6}")
+    for result in results:
+        hit = f"{result['hit_at_3']:>6.0%}" if "hit_at_3" in result else f"{'':>6}"
+        print(f"{result['corpus']:<10} {result['mode']:<8} {result['rerank']:>6} {result['bytes_per_vector']:>7.0f} "
+              f"{result['memory_mb']:>8.2f} {result['fit_seconds']:>6.1f} {result['p50_ms']:>7.2f} "
+              f"{result['p95_ms']:>7.2f} {result['recall_at_3']:>8.0%} {hit}")
+    print(f"recall@3 is against the exact float32 top {TOP_K}; rerank k re-scores {TOP_K} x k candidates")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"embeddings": embeddings.model_name if hasattr(embeddings, "model_name") else None,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
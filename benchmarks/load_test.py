@@ -0,0 +1,271 @@
+"""
+Concurrent-user load test for the chatbot core and the Streamlit app.
+
+Simulates N sessions at once, each asking --questions questions drawn from
+benchmarks/questions.json with a configurable mix of menu, photo and QA questions,
+for every N in --sessions. The remote services are the stand-ins from
+benchmarks/stubs.py, with the latencies given on the command line.
+
+    core   each session is a thread calling AryaChatbot.get_response on one shared
+           chatbot and keeping its own chat history, like a Streamlit session
+    app    each session is a headless Streamlit session (AppTest) running
+           streamlit_app.py; all of them share one chatbot, as st.cache_resource does.
+           Latency is a whole script run per question, so it includes rendering.
+           AppTest swaps process-wide runtime state on every run, so script runs are
+           serialized: sessions interleave instead of overlapping, and this target
+           measures per-session memory and render cost rather than concurrency.
+
+Per concurrency level it reports throughput, latency percentiles (overall and per
+kind), RSS growth per session and the hit rates of the answer cache, the query
+embedding cache and in-flight coalescing. Each level starts from a fresh chatbot.
+
+    python benchmarks/load_test.py [--target core|app] [--sessions 1,4,16,64]
+        [--mix menu=0.3,photo=0.2,qa=0.5] [--json out.json]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from bench_get_response import load_corpus, percentile  # noqa: E402
+from bench_tenancy import rss_mb  # noqa: E402
+from stubs import make_stub_chatbot  # noqa: E402
+
+# Same cap streamlit_app.manage_chat_history applies
+MAX_HISTORY = 50
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ("menu", "photo", "qa"):
+            raise Exception(f"Unknown question kind in --mix: {kind}")
+        mix[kind] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise Exception("--mix needs at least one positive weight")
+    return mix
+
+
+def questions_by_kind(corpus: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Corpus labels (menu_current, menu_day, photo, qa, ...) grouped into menu/photo/qa."""
+    kinds: Dict[str, List[str]] = {}
+    for label, questions in corpus.items():
+        kinds.setdefault(label.split("_")[0], []).extend(questions)
+    return kinds
+
+
+def session_script(rng: random.Random, kinds: Dict[str, List[str]], mix: Dict[str, float],
+                   count: int) -> List[Tuple[str, str]]:
+    """(kind, question) pairs for one session."""
+    names = list(mix)
+    picks = rng.choices(names, weights=[mix[name] for name in names], k=count)
+    return [(kind, rng.choice(kinds[kind])) for kind in picks]
+
+
+class RSSMonitor:
+    """Samples RSS in the background and keeps the peak."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def run_core_session(bot, script: List[Tuple[str, str]], think: float) -> Tuple[List[Tuple[str, float]], List[Dict]]:
+    """Ask the script on the shared chatbot; the history is returned so it stays alive until measured."""
+    timings = []
+    history: List[Dict] = []
+    for kind, question in script:
+        start = time.perf_counter()
+        response = bot.get_response(question)
+        timings.append((kind, time.perf_counter() - start))
+        text = response if isinstance(response, str) else response.get("text", "")
+        entry = {"id": time.time_ns(), "question": question, "response": text,
+                 "markdown": f"**You:** {question}\n\n**ARYA:** {text}"}
+        if isinstance(response, dict) and "photos" in response:
+            entry["photos"] = response["photos"]
+        history.append(entry)
+        history = history[-MAX_HISTORY:]
+        if think:
+            time.sleep(think)
+    return timings, history
+
+
+# AppTest.run replaces the process-wide Runtime instance; only one may run at a time
+APP_RUN_LOCK = threading.Lock()
+
+
+def new_app_session(bot):
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(os.path.join(ROOT_DIR, "streamlit_app.py"), default_timeout=120)
+    app.session_state["chatbot"] = bot
+    with APP_RUN_LOCK:
+        app.run()
+    return app
+
+
+def run_app_session(app, script: List[Tuple[str, str]], think: float) -> Tuple[List[Tuple[str, float]], object]:
+    """Ask the script through the app's form; the session is returned so it stays alive until measured."""
+    timings = []
+    for kind, question in script:
+        start = time.perf_counter()
+        with APP_RUN_LOCK:
+            app.text_input(key="user_input").input(question)
+            next(button for button in app.button if button.label == "Send").click().run()
+        timings.append((kind, time.perf_counter() - start))
+        if app.exception:
+            raise Exception(f"App error: {app.exception[0].message}")
+        if think:
+            time.sleep(think)
+    return timings, app
+
+
+def summarize(latencies: List[float]) -> Dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def run_level(args, sessions: int, kinds: Dict[str, List[str]], mix: Dict[str, float]) -> Dict:
+    bot = make_stub_chatbot(
+        embed_latency=args.embed_latency_ms / 1000,
+        retrieval_latency=args.retrieval_latency_ms / 1000,
+        llm_latency=args.llm_latency_ms / 1000
+    )
+    rng = random.Random(args.seed + sessions)
+    scripts = [session_script(rng, kinds, mix, args.questions) for _ in range(sessions)]
+    think = args.think_ms / 1000
+
+    # One throwaway session asking each kind once loads the menu CSV, the photo manifest
+    # and (for the app) Streamlit's lazily imported modules, which are not per-session
+    # memory; the caches it filled are then emptied
+    warm_up = [(kind, kinds[kind][0]) for kind in ("menu", "photo", "qa")]
+    if args.target == "app":
+        run_app_session(new_app_session(bot), warm_up, 0.0)
+    else:
+        run_core_session(bot, warm_up, 0.0)
+    bot.answer_cache.clear()
+    if hasattr(bot.embeddings, "clear"):
+        bot.embeddings.clear()
+        bot.embeddings.memory_hits = bot.embeddings.disk_hits = bot.embeddings.misses = 0
+    bot.inflight.leaders = bot.inflight.followers = 0
+
+    gc.collect()
+    before = rss_mb()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        if args.target == "app":
+            # Sessions are opened up front; their first (empty) run is not timed
+            apps = list(pool.map(lambda _: new_app_session(bot), range(sessions)))
+            start = time.perf_counter()
+            with RSSMonitor() as monitor:
+                results = list(pool.map(lambda pair: run_app_session(pair[0], pair[1], think), zip(apps, scripts)))
+        else:
+            start = time.perf_counter()
+            with RSSMonitor() as monitor:
+                results = list(pool.map(lambda script: run_core_session(bot, script, think), scripts))
+        elapsed = time.perf_counter() - start
+    gc.collect()
+    # Session state (histories or AppTest sessions) is still referenced by results here
+    after = rss_mb()
+
+    latencies: Dict[str, List[float]] = {}
+    for timings, _ in results:
+        for kind, seconds in timings:
+            latencies.setdefault(kind, []).append(seconds)
+    everything = [seconds for values in latencies.values() for seconds in values]
+    embeddings_stats = bot.embeddings.stats() if hasattr(bot.embeddings, "stats") else {}
+    return {
+        "sessions": sessions,
+        "questions": len(everything),
+        "seconds": elapsed,
+        "throughput_qps": len(everything) / elapsed if elapsed else 0.0,
+        "latency": summarize(everything),
+        "latency_by_kind": {kind: summarize(values) for kind, values in sorted(latencies.items())},
+        "rss_before_mb": before,
+        "rss_peak_mb": monitor.peak,
+        "rss_after_mb": after,
+        "rss_per_session_mb": (after - before) / sessions,
+        "answer_cache": bot.answer_cache.stats(),
+        "embedding_cache": embeddings_stats,
+        "coalescing": bot.inflight.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target", choices=["core", "app"], default="core")
+    parser.add_argument("--sessions", default="1,4,16,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--questions", type=int, default=20, help="Questions per session")
+    parser.add_argument("--mix", default="menu=0.3,photo=0.2,qa=0.5", help="Weights of menu/photo/qa questions")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between a session's questions")
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0)
+    parser.add_argument("--retrieval-latency-ms", type=float, default=40.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--corpus", default=os.path.join(BENCH_DIR, "questions.json"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    if args.target == "app":
+        os.environ.setdefault("HUGGING_FACE_API", "stub")
+        os.environ["VECTOR_BACKEND"] = "local"
+        os.environ["FAQ_STORE_PATH"] = ""
+        os.environ["TENANTS_PATH"] = ""
+        # Sessions are driven from pool threads, which Streamlit warns about on every run
+        logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+        os.chdir(ROOT_DIR)
+
+    mix = parse_mix(args.mix)
+    kinds = questions_by_kind(load_corpus(args.corpus))
+    levels = [run_level(args, int(n), kinds, mix) for n in args.sessions.split(",")]
+
+    print(f"target={args.target}, {args.questions} questions/session, mix {args.mix}")
+    print(f"{'sessions':>8} {'qps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'MB/sess':>8} "
+          f"{'answer':>7} {'embed':>7} {'shared':>7}")
+    for level in levels:
+        latency = level["latency"]
+        print(f"{level['sessions']:>8} {level['throughput_qps']:>8.1f} {latency['p50_ms']:>9.1f} "
+              f"{latency['p95_ms']:>9.1f} {latency['p99_ms']:>9.1f} {level['rss_per_session_mb']:>8.2f} "
+              f"{level['answer_cache']['hit_rate']:>7.0%} {level['embedding_cache'].get('hit_rate', 0.0):>7.0%} "
+              f"{level['coalescing']['coalesced_rate']:>7.0%}")
+    print("answer/embed: cache hit rates; shared: QA answers taken from an identical in-flight question")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"target": args.target, "mix": mix, "questions_per_session": args.questions,
+                       "levels": levels}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Retrieval quality and latency report: dense vs. BM25 vs. hybrid (with the lexical fast path).
+
+For each labelled question (benchmarks/retrieval_questions.json) a retrieved chunk counts
+as relevant if it contains one of the question's "relevant" snippets (case-insensitive).
+Reports hit@k, MRR@k, retrieval latency, prompt context tokens and, for hybrid, how many
+questions skipped the embedding. Each mode is scored on the packed context the prompt
+would receive, and once more on the plain top-k ("unpacked") to show what packing saves. By default the dense side uses the stub embeddings from benchmarks/stubs.py
+with an artificial encode latency; --model uses the real embedding model instead.
+
+    python benchmarks/retrieval_report.py [--model] [--embed-latency-ms 30] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_get_response import percentile  # noqa: E402
+from stubs import StubChatbot  # noqa: E402
+
+MODES = ("dense", "bm25", "hybrid")
+
+
+class ModelChatbot(StubChatbot):
+    """StubChatbot with the production embedding model (needs sentence-transformers and the weights)."""
+
+    def setup_embeddings(self):
+        return super(StubChatbot, self).setup_embeddings()
+
+    def setup(self):
+        super(StubChatbot, self).setup()
+
+
+def retrieve(bot, question: str, mode: str):
+    """(documents, used the lexical fast path) for one question."""
+    if mode == "bm25":
+        return bot.lexical_index.documents(bot.lexical_index.search(question, bot.fetch_k)), True
+    if mode == "hybrid":
+        docs = bot.lexical_documents(question)
+        if docs is not None:
+            return docs, True
+        return bot.retrieve_documents(bot.embed_question(question), question), False
+    return bot.retrieve_documents(bot.embed_question(question)), False
+
+
+def prompt_context(bot, docs, packed: bool):
+    """The chunks the prompt would contain: packed by the chatbot, or the plain top-k."""
+    return bot.select_context(docs) if packed else docs[:bot.retrieval_k]
+
+
+def evaluate(bot, labelled: List[Dict], mode: str, packed: bool = True) -> Dict:
+    hits, reciprocal_ranks, latencies, fast_path, fast_path_hits, misses = 0, 0.0, [], 0, 0, []
+    tokens = 0
+    for item in labelled:
+        relevant = [snippet.lower() for snippet in item["relevant"]]
+        start = time.perf_counter()
+        docs, lexical = retrieve(bot, item["question"], mode)
+        docs = prompt_context(bot, docs, packed)
+        latencies.append(time.perf_counter() - start)
+        tokens += sum(bot.context_packer.count_tokens(doc.page_content) for doc in docs)
+        rank = next(
+            (position for position, doc in enumerate(docs, 1)
+             if any(snippet in doc.page_content.lower() for snippet in relevant)),
+            None
+        )
+        if rank is not None:
+            hits += 1
+            reciprocal_ranks += 1 / rank
+        else:
+            misses.append(item["question"])
+        if lexical and mode == "hybrid":
+            fast_path += 1
+            fast_path_hits += rank is not None
+    n = len(labelled)
+    return {
+        "questions": n,
+        f"hit@{bot.retrieval_k}": hits / n,
+        f"mrr@{bot.retrieval_k}": reciprocal_ranks / n,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "mean_ms": sum(latencies) / n * 1000,
+        "mean_context_tokens": tokens / n,
+        "lexical_fast_path": fast_path,
+        "lexical_fast_path_hits": fast_path_hits,
+        "misses": misses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--questions", default=os.path.join(BENCH_DIR, "retrieval_questions.json"))
+    parser.add_argument("--model", action="store_true", help="Use the real embedding model instead of the stub")
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0, help="Stub encode latency")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    with open(args.questions, encoding="utf-8") as f:
+        labelled = json.load(f)
+
+    # No embedding cache, so every dense retrieval pays for an encode
+    bot_class = ModelChatbot if args.model else StubChatbot
+    bot = bot_class(embed_latency=args.embed_latency_ms / 1000, use_cache=False)
+    bot.setup()
+
+    report = {"embeddings": "model" if args.model else "stub", "modes": {}}
+    print(f"{'mode':17} {'hit@k':>7} {'mrr@k':>7} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'tokens':>7} "
+          f"{'lexical':>8}")
+    for mode in MODES:
+        for packed in (False, True):
+            name = mode if packed else f"{mode} (unpacked)"
+            result = evaluate(bot, labelled, mode, packed)
+            report["modes"][name] = result
+            lexical = f"{result['lexical_fast_path']}/{result['questions']}" if mode == "hybrid" else "-"
+            print(f"{name:17} {result[f'hit@{bot.retrieval_k}']:7.2f} {result[f'mrr@{bot.retrieval_k}']:7.2f} "
+                  f"{result['mean_ms']:8.2f} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+                  f"{result['mean_context_tokens']:7.1f} {lexical:>8}")
+    hybrid = report["modes"]["hybrid"]
+    if hybrid["lexical_fast_path"]:
+        print(f"lexical fast path: {hybrid['lexical_fast_path_hits']}/{hybrid['lexical_fast_path']} "
+              "answered with a relevant chunk in the top k")
+    for mode in MODES:
+        if report["modes"][mode]["misses"]:
+            print(f"{mode} misses: {report['modes'][mode]['misses']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Import-time and startup-time report for the chatbot.
+
+    python benchmarks/startup_report.py [--warmup] [--json out.json]
+
+Reports the wall time to import chatbot.py in a fresh interpreter, the heaviest
+modules pulled in by that import (from `python -X importtime`), and the time until
+the menu/photo fast path can answer. With --warmup it also runs the background
+warm-up (needs the usual API keys, or VECTOR_BACKEND=local) and reports per-stage timings.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+
+def measure_import(module: str = "chatbot", top: int = 15) -> dict:
+    """Import a module in a fresh interpreter and collect -X importtime output."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            # Only top-level imports of the measured module's dependencies (depth <= 2)
+            if len(indent) <= 3:
+                modules.append({"module": name, "cumulative_ms": int(cumulative_us) / 1000})
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return {
+        "import_seconds": float(proc.stdout.strip().splitlines()[-1]),
+        "heaviest_imports": modules[:top],
+    }
+
+
+def measure_fast_path() -> dict:
+    """Time constructing the chatbot and answering a menu and a photo question."""
+    from chatbot import AryaChatbot
+
+    start = time.perf_counter()
+    bot = AryaChatbot(
+        pinecone_api_key=os.getenv("PINECONE_API_KEY"),
+        pinecone_env=os.getenv("PINECONE_ENV"),
+        huggingface_api=os.getenv("HUGGING_FACE_API"),
+        vector_backend=os.getenv("VECTOR_BACKEND", "pinecone")
+    )
+    construct = time.perf_counter() - start
+    bot.get_response("What is for dinner on Monday?")
+    bot.get_response("Show me photos of the rooms")
+    first_answer = time.perf_counter() - start
+    return {"construct_seconds": construct, "first_fast_answer_seconds": first_answer, "bot": bot}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chatbot import/startup time report")
+    parser.add_argument("--warmup", action="store_true", help="Also run the background warm-up")
+    parser.add_argument("--json", help="Write the report to this file as JSON")
+    args = parser.parse_args()
+
+    report = measure_import()
+    fast_path = measure_fast_path()
+    bot = fast_path.pop("bot")
+    report.update(fast_path)
+
+    if args.warmup:
+        start = time.perf_counter()
+        bot.start_warmup()
+        bot.wait_until_ready()
+        report["warmup_seconds"] = time.perf_counter() - start
+        report["warmup_stages"] = bot.startup_timings
+        report["warmup_error"] = str(bot.warmup_error) if bot.warmup_error else None
+
+    print(f"import chatbot          : {report['import_seconds'] * 1000:8.1f} ms")
+    print(f"construct AryaChatbot   : {report['construct_seconds'] * 1000:8.1f} ms")
+    print(f"first menu/photo answer : {report['first_fast_answer_seconds'] * 1000:8.1f} ms")
+    if args.warmup:
+        print(f"warm-up (background)    : {report['warmup_seconds'] * 1000:8.1f} ms  {report['warmup_stages']}")
+    print("heaviest imports:")
+    for module in report["heaviest_imports"]:
+        print(f"  {module['cumulative_ms']:8.1f} ms  {module['module']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
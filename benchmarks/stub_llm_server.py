@@ -0,0 +1,152 @@
+"""
+Local stand-in for the Hugging Face text-generation endpoint, with injectable faults.
+
+Speaks the same API ResilientLLM uses: POST {"inputs", "parameters", "stream"} returns
+[{"generated_text": ...}], or server-sent {"token": {"text": ...}} events when streaming.
+Every request takes --latency-ms; a --slow-rate share of requests takes --slow-ms instead,
+a --fail-rate share answers 500 or 503, and the first --cold-requests requests answer
+503 {"error": "Model is loading", "estimated_time": ...} like a cold model. With
+--rate-limit, requests beyond that many per second answer 429 at once, with Retry-After.
+
+    python benchmarks/stub_llm_server.py [--port 8080] [--latency-ms 200] [--slow-rate 0.05]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """Threaded stub endpoint; faults are drawn from a seeded RNG so runs are repeatable."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0), latency: float = 0.2,
+                 slow_rate: float = 0.0, slow_latency: float = 2.0, fail_rate: float = 0.0,
+                 cold_requests: int = 0, cold_estimated_time: float = 0.2, answer: str = "Stub answer.",
+                 rate_limit: Optional[float] = None, seed: Optional[int] = 0):
+        super().__init__(address, StubLLMHandler)
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.fail_rate = fail_rate
+        self.cold_requests = cold_requests
+        self.cold_estimated_time = cold_estimated_time
+        self.answer = answer
+        self.rate_limit = rate_limit
+        self.requests = 0
+        self.rate_limited = 0
+        self._accepted = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/generate"
+
+    def draw(self) -> Tuple[int, float, Optional[int]]:
+        """(request number, latency, error status or None) for the next request."""
+        with self._lock:
+            self.requests += 1
+            slow = self._random.random() < self.slow_rate
+            fail = self._random.random() < self.fail_rate
+            status = self._random.choice([500, 503]) if fail else None
+            return self.requests, self.slow_latency if slow else self.latency, status
+
+    def over_rate_limit(self) -> bool:
+        """Whether this request exceeds rate_limit requests in the last second (it is then not counted)."""
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted and self._accepted[0] <= now - 1.0:
+                self._accepted.popleft()
+            if len(self._accepted) >= self.rate_limit:
+                self.rate_limited += 1
+                return True
+            self._accepted.append(now)
+            return False
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="stub-llm", daemon=True)
+        thread.start()
+        return thread
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status: int, payload, headers: Optional[dict] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server: StubLLMServer = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if server.over_rate_limit():
+            self._send_json(429, {"error": "Rate limit reached"}, {"Retry-After": "1"})
+            return
+        number, latency, error_status = server.draw()
+        if number <= server.cold_requests:
+            self._send_json(503, {"error": "Model is loading", "estimated_time": server.cold_estimated_time})
+            return
+        time.sleep(latency)
+        if error_status:
+            self._send_json(error_status, {"error": "Simulated failure"})
+            return
+        if not payload.get("stream"):
+            self._send_json(200, [{"generated_text": server.answer}])
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for word in server.answer.split(" "):
+            event = {"token": {"text": word + " ", "special": False}}
+            self.wfile.write(f"data:{json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a stub text-generation endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests taking --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answering 500/503")
+    parser.add_argument("--cold-requests", type=int, default=0, help="Answer the first N requests 503 loading")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second before answering 429")
+    args = parser.parse_args()
+
+    server = StubLLMServer((args.host, args.port), latency=args.latency_ms / 1000, slow_rate=args.slow_rate,
+                           slow_latency=args.slow_ms / 1000, fail_rate=args.fail_rate,
+                           cold_requests=args.cold_requests, rate_limit=args.rate_limit, seed=None)
+    print(f"Stub LLM endpoint on {server.url} (set LLM_ENDPOINT_URL to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Deterministic local stand-ins for the remote services used by AryaChatbot.
+
+StubEmbeddings hashes words into a fixed-size vector, so paraphrases that share words
+land close together. StubVectorStore is the in-process LocalVectorStore with an
+optional artificial round-trip delay. StubLLM returns the first retrieved context line,
+streamed word by word. Every stand-in takes a latency in seconds, so benchmarks can
+model Pinecone and the Hugging Face endpoint without network access.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from chatbot import AryaChatbot  # noqa: E402
+from local_index import LocalVectorStore  # noqa: E402
+from semantic_cache import SemanticCache  # noqa: E402
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class StubEmbeddings(Embeddings):
+    """Hashed bag-of-words embeddings with a configurable per-call delay."""
+
+    def __init__(self, dimension: int = 1024, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.model_name = f"stub-{dimension}"
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in _TOKEN.findall(text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+
+class StubVectorStore(LocalVectorStore):
+    """LocalVectorStore that adds a fixed delay per search, like a remote index round trip."""
+
+    latency = 0.0
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, **kwargs: Any):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().similarity_search_with_score_by_vector(embedding, k, **kwargs)
+
+    def similarity_search_by_vectors(self, embeddings, k: int = 4, **kwargs: Any):
+        # One round trip for the whole batch
+        if self.latency:
+            time.sleep(self.latency)
+        return LocalVectorStore.similarity_search_by_vectors(self, embeddings, k)
+
+    async def asimilarity_search_by_vector(self, embedding, k: int = 4, **kwargs: Any):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # Call the undelayed search directly so the delay is not applied twice
+        return [doc for doc, _ in LocalVectorStore.similarity_search_with_score_by_vector(self, embedding, k)]
+
+
+class StubLLM(LLM):
+    """Answers with the first context line of the prompt after a delay; streams it word by word."""
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        match = re.search(r"knowledge base:\s*\n\s*(.+)", prompt)
+        return match.group(1).strip() if match else "I don't know."
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        for i, word in enumerate(self._answer(prompt).split(" ")):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield GenerationChunk(text=word if i == 0 else " " + word)
+
+
+class StubChatbot(AryaChatbot):
+    """AryaChatbot wired to the stand-ins above, on a throwaway local index."""
+
+    def __init__(self, embed_latency: float = 0.0, retrieval_latency: float = 0.0, llm_latency: float = 0.0,
+                 token_latency: float = 0.0, use_cache: bool = True, index_dir: Optional[str] = None, **kwargs):
+        super().__init__(
+            pinecone_api_key=None,
+            pinecone_env=None,
+            huggingface_api=None,
+            vector_backend="local",
+            index_dir=index_dir or tempfile.mkdtemp(prefix="arya-bench-"),
+            answer_cache=kwargs.pop("answer_cache", None) or (SemanticCache() if use_cache else SemanticCache(max_entries=0)),
+            **kwargs
+        )
+        self.embed_latency = embed_latency
+        self.retrieval_latency = retrieval_latency
+        self.llm_latency = llm_latency
+        self.token_latency = token_latency
+        self.use_cache = use_cache
+
+    def setup_embeddings(self) -> Embeddings:
+        # The index is built without delay; the query-time latency is applied afterwards
+        return StubEmbeddings()
+
+    def setup_embedding_cache(self, embeddings: Embeddings) -> Embeddings:
+        if self.use_cache:
+            return super().setup_embedding_cache(embeddings)
+        return embeddings
+
+    def setup_local_index(self) -> LocalVectorStore:
+        store = StubVectorStore.load_or_build(self.embeddings, data_path=self.data_path, index_dir=self.index_dir,
+                                              compression=self.vector_compression, rerank=self.vector_rerank)
+        store.latency = self.retrieval_latency
+        return store
+
+    def setup_llm(self) -> LLM:
+        return StubLLM(latency=self.llm_latency, token_latency=self.token_latency)
+
+    def setup(self):
+        super().setup()
+        base = getattr(self.embeddings, "base", self.embeddings)
+        base.latency = self.embed_latency
+
+
+def make_stub_chatbot(**kwargs) -> StubChatbot:
+    """Build and set up a StubChatbot; kwargs are StubChatbot's latency/cache options."""
+    bot = StubChatbot(**kwargs)
+    bot.setup()
+    return bot
@@ -1,216 +1,839 @@
+import asyncio
+import math
 import os
-from typing import Dict, List
-from langchain.vectorstores import VectorStore
-from langchain_pinecone import PineconeVectorStore
-from langchain_pinecone import PineconeEmbeddings
-from pinecone import Pinecone, PineconeException
-from langchain_huggingface import HuggingFaceEmbeddings, HuggingFaceEndpoint
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
-import re
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
 from menu import MessMenu
 from hostel_photos import HostelPhotos
+from router import IntentRouter, Route
+from semantic_cache import SemanticCache, embedding_model_name, normalize_question
+from single_flight import SingleFlight
+from llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMScheduler, LLMShedError
+from metrics import DEFAULT_METRICS, STAGE_SECONDS, Metrics
+from context_packing import ContextPacker
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# langchain, Pinecone and the Hugging Face stack (transformers/torch) are imported
+# inside the setup methods so that importing this module, and the menu/photo paths, stay fast
+if TYPE_CHECKING:
+    from embedding_cache import CachedEmbeddings
+    from faq_store import FAQStore
+    from lexical_index import BM25Index
+    from llm_client import ResilientLLM
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.language_models.llms import LLM
+    from langchain.chains import RetrievalQA
+    from langchain_core.documents import Document
+    from langchain_core.vectorstores import VectorStore
+
 logger = logging.getLogger(__name__)
 
+# Served instantly when the LLM queue is too long to answer in time (see llm_scheduler.py)
+SHED_ANSWER = ("I'm getting a lot of questions right now and couldn't answer this one in time. "
+               "Please try again in a minute. Mess menu and hostel photo questions still work as usual.")
+
+QA_PROMPT_TEMPLATE = """
+            You are Arya, the official bot of {hostel_name}. Your role is to provide accurate and helpful information about the hostel.
+
+            Context information from the knowledge base:
+            {context}
+
+            Guidelines:
+            - Provide concise, accurate answers based on the given context
+            - If information is not available in the context, politely say you don't know
+            - Be friendly and professional in your responses
+            - Keep responses brief but informative
+
+            Question: {question}
+            Answer:
+            """
+
 class AryaChatbot:
-    def __init__(self, pinecone_api_key: str, pinecone_env: str, huggingface_api: str):
-        """Initialize the chatbot with necessary credentials."""
+    def __init__(self, pinecone_api_key: str, pinecone_env: str, huggingface_api: str,
+                 vector_backend: str = "pinecone", index_dir: str = "data/index",
+                 data_path: str = "data/data.txt", answer_cache: Optional[SemanticCache] = None,
+                 embedding_cache_path: Optional[str] = None, metrics: Optional[Metrics] = None,
+                 retrieval_mode: str = "hybrid", context_token_budget: Optional[int] = 512,
+                 llm_endpoint_url: Optional[str] = None, llm_timeout: float = 30.0, llm_max_attempts: int = 3,
+                 llm_hedge: bool = False, faq_store: Optional["FAQStore"] = None,
+                 menu_path: str = "data/mess_menu.csv", photos_directory: str = "hostel_photos",
+                 pinecone_namespace: str = "ns1", hostel_name: str = "Arya Bhatt Hostel",
+                 embeddings: Optional["Embeddings"] = None, llm: Optional["LLM"] = None, pinecone_index=None,
+                 embedding_backend: str = "torch", embedding_model: str = "intfloat/multilingual-e5-large",
+                 embedding_threads: Optional[int] = None, model_cache_dir: Optional[str] = None,
+                 vector_compression: str = "none", vector_rerank: int = 10,
+                 llm_rate_limit: Optional[float] = None, llm_burst: int = 5, llm_max_in_flight: int = 8,
+                 llm_queue_size: int = 64, llm_deadline: Optional[float] = 20.0,
+                 llm_scheduler: Optional[LLMScheduler] = None):
+        """
+        Initialize the chatbot with necessary credentials.
+        embeddings, llm, llm_scheduler and pinecone_index may be passed in already built, to share
+        one model, one client and one rate budget between several hostels (see tenancy.py);
+        setup() then reuses them.
+        """
         self.pinecone_api_key = pinecone_api_key
         self.pinecone_env = pinecone_env
         self.huggingface_api = huggingface_api
+        self.vector_backend = vector_backend
+        self.index_dir = index_dir
+        self.data_path = data_path
+        self.embedding_cache_path = embedding_cache_path
+        # "torch", "int8", "onnx" or "onnx-int8", and an e5 size alias or model id (embedding_backends.py)
+        self.embedding_backend = embedding_backend
+        self.embedding_model = embedding_model
+        self.embedding_threads = embedding_threads
+        self.model_cache_dir = model_cache_dir
+        # Local index only: "none", "float16", "int8" or "pq" codes, re-ranking vector_rerank * k
+        # candidates at full precision (vector_codecs.py)
+        self.vector_compression = vector_compression
+        self.vector_rerank = vector_rerank
+        self.hostel_name = hostel_name
+        self.pinecone_namespace = pinecone_namespace
+        self.pinecone_index = pinecone_index
+        self.embeddings = embeddings
         self.vector_store = None
-        self.llm = None
+        self.llm = llm
+        # Empty uses the public inference API; set to a dedicated endpoint or a local stub server
+        self.llm_endpoint_url = llm_endpoint_url
+        self.llm_timeout = llm_timeout
+        self.llm_max_attempts = llm_max_attempts
+        self.llm_hedge = llm_hedge
+        # Every LLM call waits here for the rate budget; calls that cannot meet their deadline get SHED_ANSWER
+        self.llm_scheduler = llm_scheduler if llm_scheduler is not None else LLMScheduler(
+            rate=llm_rate_limit, burst=llm_burst, max_in_flight=llm_max_in_flight, max_queue=llm_queue_size,
+            deadline=llm_deadline, metrics=metrics
+        )
         self.qa_chain = None
-        self.menu_system = MessMenu()
-        self.photo_system = HostelPhotos()
+        self.qa_prompt = None
+        self.retrieval_k = 3
+        # Retrieval over-fetches; the context packer then drops paraphrases of the same fact
+        # and keeps at most retrieval_k chunks within the token budget
+        self.fetch_k = 2 * self.retrieval_k
+        self.context_packer = ContextPacker(token_budget=context_token_budget)
+        # "hybrid" fuses BM25 with dense retrieval and answers decisive keyword lookups from BM25 alone
+        self.retrieval_mode = retrieval_mode
+        self.hybrid_candidates = 10
+        self.lexical_index = None
+        self.answer_cache = answer_cache if answer_cache is not None else SemanticCache()
+        # Vetted precomputed answers (faq_store.py), checked before the answer cache
+        self.faq_store = faq_store
+        self.metrics = metrics if metrics is not None else DEFAULT_METRICS
+        # Coalesces concurrent identical questions (by normalized text) onto one computation
+        self.inflight = SingleFlight()
+        self.menu_system = MessMenu(menu_path)
+        self.photo_system = HostelPhotos(photos_directory)
+        self.router = IntentRouter(self.photo_system.photo_categories)
+        self.warmup_timeout = 120.0
+        self.startup_timings: Dict[str, float] = {}
+        self._ready = threading.Event()
+        self._warmup_thread = None
+        self._warmup_error = None
         
     def setup(self):
         """Set up all components of the chatbot."""
         try:
-            self.vector_store = self.setup_pinecone()
-            self.llm = self.setup_llm()
-            self.qa_chain = self.create_qa_chain()
+            if self.embeddings is None:
+                self.embeddings = self._timed("embeddings", lambda: self.setup_embedding_cache(self.setup_embeddings()))
+            self.answer_cache.bind_embeddings(self.embeddings)
+            if self.faq_store is not None:
+                self.faq_store.bind_embeddings(self.embeddings)
+            self.vector_store = self._timed("vector_store", self.setup_vector_store)
+            if self.retrieval_mode == "hybrid":
+                self.lexical_index = self._timed("lexical_index", self.setup_lexical_index)
+            if self.llm is None:
+                self.llm = self._timed("llm", self.setup_llm)
+            self.qa_chain = self._timed("qa_chain", self.create_qa_chain)
         except Exception as e:
             raise Exception(f"Failed to initialize chatbot: {str(e)}")
+        self._ready.set()
+
+    def _timed(self, stage: str, func):
+        start = time.perf_counter()
+        result = func()
+        self.startup_timings[stage] = time.perf_counter() - start
+        return result
+
+    def start_warmup(self) -> threading.Thread:
+        """
+        Run setup() and a first embedding in a background thread.
+        Menu and photo questions are answered meanwhile; QA questions wait for is_ready.
+        """
+        if self._warmup_thread is None:
+            self._warmup_thread = threading.Thread(target=self._warm_up, name="arya-warmup", daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    def _warm_up(self):
+        start = time.perf_counter()
+        try:
+            # Scans the photo tree and starts building any missing thumbnails in the background
+            self._timed("photo_manifest", self.photo_system.manifest.refresh)
+            self.setup()
+            # The first encode pays for lazy weight loading and kernel initialisation
+            self._timed("first_embedding", lambda: self.embeddings.embed_query("warm up"))
+            self.startup_timings["total"] = time.perf_counter() - start
+            logger.info("Chatbot warm-up finished in %.2fs: %s", self.startup_timings["total"], self.startup_timings)
+        except Exception as e:
+            self._warmup_error = e
+            logger.error("Chatbot warm-up failed: %s", e)
+        finally:
+            self._ready.set()
+
+    @property
+    def is_ready(self) -> bool:
+        """True once the QA chain is set up and usable."""
+        return self._ready.is_set() and self._warmup_error is None and self.qa_chain is not None
+
+    @property
+    def warmup_error(self) -> Optional[Exception]:
+        return self._warmup_error
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up has finished (or timeout); returns is_ready."""
+        self._ready.wait(timeout)
+        return self.is_ready
+
+    def _ensure_qa_ready(self):
+        """Wait for a background warm-up if one is running, then check the QA chain exists."""
+        if self.qa_chain:
+            return
+        if self._warmup_thread is not None:
+            self._ready.wait(self.warmup_timeout)
+        if self._warmup_error is not None:
+            raise Exception(f"Chatbot failed to warm up: {str(self._warmup_error)}")
+        if not self.qa_chain:
+            raise Exception("Chatbot not properly initialized. Call setup() first.")
         
-    def setup_pinecone(self, index_name: str = "arya-index-o") -> VectorStore:
+    def setup_embeddings(self) -> "Embeddings":
+        """Initialize the embedding model shared by all vector backends."""
+        from embedding_backends import load_embeddings
+
+        return load_embeddings(self.embedding_backend, self.embedding_model, self.model_cache_dir,
+                               self.embedding_threads)
+
+    def setup_embedding_cache(self, embeddings: "Embeddings") -> "CachedEmbeddings":
+        """Wrap the embedding model with the query-vector LRU (spilling to SQLite if configured)."""
+        from embedding_cache import CachedEmbeddings
+
+        return CachedEmbeddings(embeddings, db_path=self.embedding_cache_path)
+
+    def setup_vector_store(self) -> "VectorStore":
+        """Return the vector store for the configured backend."""
+        if self.vector_backend == "pinecone":
+            return self.setup_pinecone()
+        if self.vector_backend == "local":
+            return self.setup_local_index()
+        raise Exception(f"Unknown vector backend: {self.vector_backend}")
+
+    def setup_pinecone(self, index_name: str = "arya-index-o") -> "VectorStore":
         """Initialize Pinecone and return vector store."""
+        from langchain_pinecone import PineconeVectorStore
+        from pinecone import Pinecone, PineconeException
+
         try:
-            pc = Pinecone(api_key=self.pinecone_api_key, environment=self.pinecone_env)
-            index = pc.Index(index_name)
-            
-            embeddings = HuggingFaceEmbeddings(
-                model_name="intfloat/multilingual-e5-large",
-                encode_kwargs={'normalize_embeddings': True}
-            )
+            if self.pinecone_index is None:
+                pc = Pinecone(api_key=self.pinecone_api_key, environment=self.pinecone_env)
+                self.pinecone_index = pc.Index(index_name)
             
             return PineconeVectorStore(
-                index=index,
-                embedding=embeddings,
-                namespace="ns1"
+                index=self.pinecone_index,
+                embedding=self.embeddings,
+                namespace=self.pinecone_namespace
             )
         except PineconeException as e:
             raise Exception(f"Failed to initialize Pinecone: {str(e)}")
 
-    def setup_llm(self) -> HuggingFaceEndpoint:
+    def setup_local_index(self) -> "VectorStore":
+        """Load (or build) the in-process NumPy index over the knowledge base."""
+        from local_index import LocalVectorStore
+
+        try:
+            return LocalVectorStore.load_or_build(
+                self.embeddings,
+                data_path=self.data_path,
+                index_dir=self.index_dir,
+                embedding_model=embedding_model_name(self.embeddings),
+                compression=self.vector_compression,
+                rerank=self.vector_rerank
+            )
+        except Exception as e:
+            raise Exception(f"Failed to initialize local index: {str(e)}")
+
+    def setup_lexical_index(self) -> "BM25Index":
+        """Build the in-memory BM25 index over the same chunks as the vector store."""
+        from lexical_index import BM25Index
+
+        try:
+            return BM25Index.from_file(self.data_path)
+        except OSError as e:
+            raise Exception(f"Failed to build lexical index: {str(e)}")
+
+    def setup_llm(self) -> "ResilientLLM":
         """Initialize the language model."""
+        from llm_client import ResilientLLM
+
         try:
             repo_id = "mistralai/Mixtral-8x7B-Instruct-v0.1"
-            endpoint_url = f"https://api-inference.huggingface.co/models/{repo_id}"
-            
-            return HuggingFaceEndpoint(
+            endpoint_url = self.llm_endpoint_url or f"https://api-inference.huggingface.co/models/{repo_id}"
+
+            return ResilientLLM(
                 endpoint_url=endpoint_url,
-                huggingfacehub_api_token=self.huggingface_api,
-                max_length=512,
+                api_token=self.huggingface_api,
+                max_new_tokens=512,
                 temperature=0.7,
                 top_k=50,
-                num_return_sequences=1,
-                task="text2text-generation"
+                timeout=self.llm_timeout,
+                max_attempts=self.llm_max_attempts,
+                hedge=self.llm_hedge,
+                # A hedge is an extra request against the same endpoint rate limit
+                hedge_budget=self.llm_scheduler.try_take_token
             )
         except Exception as e:
             raise Exception(f"Failed to initialize language model: {str(e)}")
 
-    def create_qa_chain(self) -> RetrievalQA:
+    def create_qa_chain(self) -> "RetrievalQA":
         """Create the question-answering chain with custom prompt."""
-        try:
-            template = """
-            You are Arya, the official bot of Arya Bhatt Hostel. Your role is to provide accurate and helpful information about the hostel.
+        from langchain.chains import RetrievalQA
+        from langchain.prompts import PromptTemplate
 
-            Context information from the knowledge base:
-            {context}
-
-            Guidelines:
-            - Provide concise, accurate answers based on the given context
-            - If information is not available in the context, politely say you don't know
-            - Be friendly and professional in your responses
-            - Keep responses brief but informative
-
-            Question: {question}
-            Answer:
-            """
-            
-            prompt = PromptTemplate(template=template, input_variables=["context", "question"])
+        try:
+            self.qa_prompt = PromptTemplate(template=QA_PROMPT_TEMPLATE, input_variables=["context", "question"],
+                                            partial_variables={"hostel_name": self.hostel_name})
             
             return RetrievalQA.from_chain_type(
                 llm=self.llm,
                 chain_type="stuff",
-                retriever=self.vector_store.as_retriever(search_kwargs={'k': 3}),
+                retriever=self.vector_store.as_retriever(search_kwargs={'k': self.retrieval_k}),
                 return_source_documents=False,
-                chain_type_kwargs={"prompt": prompt}
+                chain_type_kwargs={"prompt": self.qa_prompt}
             )
         except Exception as e:
             raise Exception(f"Failed to create QA chain: {str(e)}")
 
-    def handle_menu_query(self, question: str) -> str:
+    def handle_menu_query(self, question: str, route: Optional[Route] = None) -> str:
         """Handle questions related to the mess menu."""
         try:
-            question_lower = question.lower()
-            logger.debug(f"Handling menu query: {question_lower}")
+            if route is None:
+                route = self.router.route(question)
+            logger.debug("Handling menu query with route: %s", route)
 
             # Handle current menu query
-            if re.search(r"(current menu|today menu|what's for|what is for|what are we eating|mess menu|food|"
-                        r"today's food|what's being served|what is on the menu|what are we having|"
-                        r"what are we eating today|what's on today's menu|what's on the menu for today|"
-                        r"what are we getting in the mess|what food is in the mess|what is for lunch|"
-                        r"what is for dinner|today's lunch menu|today's dinner menu)", question_lower):
+            if route.intent == "menu_current":
                 logger.debug("Fetching current menu")
                 return self.menu_system.get_current_menu()
 
             # Handle weekly menu query
-            if re.search(r"week(ly)? menu", question_lower):
+            if route.intent == "menu_week":
                 logger.debug("Fetching weekly menu")
-                weekly_menu = self.menu_system.get_full_week_menu()
+                weekly_menu = self.menu_system.get_week_response()
                 if weekly_menu:
-                    return self.menu_system.format_full_menu(weekly_menu)
+                    return weekly_menu
                 return "Sorry, I couldn't retrieve the weekly menu at the moment."
 
-            # Handle specific day and time query
-            days_of_week = ['sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
-            meals = ['breakfast', 'lunch', 'dinner', 'dessert', 'morning', 'night']
-            
-            day_found = None
-            meal_found = None
-
-            # Search for day and meal in the question
-            for day in days_of_week:
-                if day in question_lower:
-                    day_found = day.capitalize()
-                    break
-
-            for meal in meals:
-                if meal in question_lower:
-                    meal_found = meal
-                    break
-
-            if day_found:
-                logger.debug(f"Fetching menu for {day_found}")
-                day_menu = self.menu_system.get_menu_for_day(day_found)
-                if day_menu:
-                    # If a specific meal is mentioned
-                    if meal_found:
-                        logger.debug(f"Fetching {meal_found} for {day_found}")
-                        meal_map = {
-                            'breakfast': 'morning_menu',
-                            'morning': 'morning_menu',  
-                            'lunch': 'evening_menu',
-                            'dinner': 'night_menu',
-                            'night': 'night_menu',  
-                            'dessert': 'dessert'
-                        }
-                        specific_meal = day_menu.get(meal_map.get(meal_found))
-                        if specific_meal and specific_meal != 'OFF':
-                            return f"📅 {day_found.capitalize()}'s {meal_found.capitalize()}: {specific_meal}"
-                        return f"Sorry, no {meal_found} is available for {day_found}."
-
-                    # If no specific meal is mentioned, return the full day's menu
-                    response = [
-                        f"📅 Menu for {day_menu['day_of_week']}:",
-                        f"🌅 Breakfast: {day_menu['morning_menu']}",
-                        f"🌞 Lunch: {day_menu['evening_menu']}",
-                        f"🌙 Dinner: {day_menu['night_menu']}"
-                    ]
-                    
-                    if day_menu['dessert'] != 'OFF':
-                        response.append(f"🍨 Dessert: {day_menu['dessert']}")
-
-                    return "\n".join(response)
-                
-                return f"Sorry, I couldn't retrieve the menu for {day_found}."
+            # Handle specific day and time query, served from pre-rendered responses
+            if route.intent == "menu_day":
+                if route.meal:
+                    logger.debug("Fetching %s for %s", route.meal, route.day)
+                    response = self.menu_system.get_meal_response(route.day, route.meal)
+                else:
+                    logger.debug("Fetching menu for %s", route.day)
+                    response = self.menu_system.get_day_response(route.day)
+                if response:
+                    return response
+                return f"Sorry, I couldn't retrieve the menu for {route.day}."
 
         except Exception as e:
-            logger.error(f"Error handling menu query: {str(e)}")
+            logger.error("Error handling menu query: %s", e)
             return "Sorry, I couldn't retrieve the menu at the moment."
 
         return None
 
 
+    def retrieve_documents(self, query_embedding: List[float], question: Optional[str] = None) -> List["Document"]:
+        """
+        Fetch the top fetch_k knowledge base chunks for an already computed query embedding.
+        In hybrid mode, when the question is given, dense candidates are fused with BM25.
+        """
+        with self.metrics.span("retrieval"):
+            if question is not None and self.lexical_index is not None:
+                dense_docs = self.vector_store.similarity_search_by_vector(query_embedding, k=self.hybrid_candidates)
+                return self.fuse_documents(question, dense_docs)
+            return self.vector_store.similarity_search_by_vector(query_embedding, k=self.fetch_k)
+
+    def lexical_documents(self, question: str) -> Optional[List["Document"]]:
+        """Top fetch_k chunks from BM25 alone if the keyword match is decisive (hybrid mode only), else None."""
+        if self.lexical_index is None:
+            return None
+        with self.metrics.span("lexical"):
+            hits = self.lexical_index.decisive_hits(question, k=self.fetch_k)
+            return self.lexical_index.documents(hits) if hits else None
+
+    def fuse_documents(self, question: str, dense_docs: List["Document"]) -> List["Document"]:
+        """Reciprocal rank fusion of dense candidates with the BM25 ranking, top fetch_k."""
+        from lexical_index import reciprocal_rank_fusion
+
+        hits = self.lexical_index.search(question, self.hybrid_candidates)
+        by_text = {doc.page_content: doc for doc in self.lexical_index.documents(hits)}
+        # Dense documents win on ties so their metadata (ids from the vector store) is kept
+        by_text.update({doc.page_content: doc for doc in dense_docs})
+        fused = reciprocal_rank_fusion(
+            [[doc.page_content for doc in dense_docs], [self.lexical_index.texts[doc_id] for doc_id, _ in hits]],
+            k=self.fetch_k
+        )
+        return [by_text[text] for text in fused]
+
+    def select_context(self, docs: List["Document"]) -> List["Document"]:
+        """De-duplicate and pack retrieved chunks into the prompt's token budget; logs the tokens saved."""
+        packed = self.context_packer.pack(docs, self.retrieval_k)
+        saved = packed.baseline_tokens - packed.tokens
+        self.metrics.observe("arya_context_tokens", packed.tokens)
+        if saved > 0:
+            self.metrics.inc("arya_context_tokens_saved_total", value=saved)
+        logger.info("Context: %d of %d chunks, ~%d tokens (%d saved vs. top-%d, %d near-duplicates dropped)",
+                    len(packed.documents), len(docs), packed.tokens, saved, self.retrieval_k,
+                    packed.dropped_duplicates)
+        return packed.documents
+
+    def build_prompt(self, question: str, docs: List["Document"]) -> str:
+        """Render the QA prompt the same way the "stuff" chain does, from the packed context."""
+        with self.metrics.span("prompt_build"):
+            return self._format_prompt(question, self.select_context(docs))
+
+    def _format_prompt(self, question: str, context_docs: List["Document"]) -> str:
+        context = "\n\n".join(doc.page_content for doc in context_docs)
+        return self.qa_prompt.format(context=context, question=question)
+
+    def answer_with_sources(self, question: str, priority: int = PRIORITY_INTERACTIVE,
+                            deadline: Optional[float] = None) -> Tuple[str, List["Document"]]:
+        """
+        Generate a fresh answer, bypassing every cache, with the chunks the prompt contained.
+        priority and deadline are passed to the LLM scheduler (offline jobs use PRIORITY_BATCH, math.inf).
+        """
+        self._ensure_qa_ready()
+        docs = self.lexical_documents(question)
+        if docs is None:
+            docs = self.retrieve_documents(self.embed_question(question), question)
+        with self.metrics.span("prompt_build"):
+            docs = self.select_context(docs)
+            prompt = self._format_prompt(question, docs)
+        return self._generate(prompt, priority, deadline), docs
+
+    def faq_answer(self, question: str, query_embedding: Optional[List[float]] = None) -> Optional[str]:
+        """Vetted precomputed answer: by exact question, or by similarity when the embedding is given."""
+        if self.faq_store is None:
+            return None
+        if query_embedding is None:
+            return self.faq_store.lookup_question(question)
+        return self.faq_store.lookup(query_embedding)
+
+    def embed_question(self, question: str) -> List[float]:
+        """Embed a question through the (cached) embedding model."""
+        with self.metrics.span("embedding"):
+            return self.embeddings.embed_query(question)
+
+    def answer_with_embedding(self, question: str, query_embedding: List[float]) -> str:
+        """Answer from the knowledge base using an already computed query embedding for retrieval."""
+        # Same prompt and LLM as the "stuff" chain, called step by step so each stage is timed
+        return self._generate(self.build_prompt(question, self.retrieve_documents(query_embedding, question)))
+
+    def _generate(self, prompt: str, priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None) -> str:
+        with self.llm_scheduler.slot(priority, deadline):
+            with self.metrics.span("llm"):
+                return self.llm.invoke(prompt)
+
+    def _record_request(self, path: str, start: float):
+        """Count a finished request and its end-to-end latency by the path that answered it."""
+        labels = {"path": path}
+        self.metrics.inc("arya_requests_total", labels)
+        self.metrics.observe("arya_request_seconds", time.perf_counter() - start, labels)
+
+    @staticmethod
+    def _fast_path(response: Union[str, Dict]) -> str:
+        return "photo" if isinstance(response, dict) else "menu"
+
+    def get_fast_response(self, question: str, route: Optional[Route] = None) -> Optional[Union[str, Dict]]:
+        """Answer menu and photo questions without touching the QA chain; None for everything else."""
+        # Classify the question once; both fast-path handlers reuse the slots
+        if route is None:
+            with self.metrics.span("routing"):
+                route = self.router.route(question)
+
+        # Check if the question is related to the mess menu
+        menu_response = self.handle_menu_query(question, route)
+        if menu_response:
+            return menu_response
+        
+        # Check if the question is related to photos
+        photo_paths = self.photo_system.handle_photo_query(question, route)
+        if photo_paths:
+            # Return as list of image paths
+            return {"photos": photo_paths}
+
+        return None
+
     def get_response(self, question: str) -> str:
+        start = time.perf_counter()
         try:
-            # Check if the question is related to the mess menu
-            menu_response = self.handle_menu_query(question)
-            if menu_response:
-                return menu_response
+            fast_response = self.get_fast_response(question)
+            if fast_response:
+                self._record_request(self._fast_path(fast_response), start)
+                return fast_response
             
-            # Check if the question is related to photos
-            photo_paths = self.photo_system.handle_photo_query(question)
-            if photo_paths:
-                # Return as list of image paths
-                return {"photos": photo_paths}
-            
-            # Handle regular QA response
+            # Vetted FAQ answers need no model, so they are served even during warm-up
+            faq_answer = self.faq_answer(question)
+            if faq_answer is not None:
+                self._record_request("faq", start)
+                return {"text": faq_answer}
+
+            # Identical questions in flight at the same time share one answer
+            (response, path), shared = self.inflight.do(
+                normalize_question(question), lambda: self._answer_question(question)
+            )
+            self._record_request("qa_coalesced" if shared else path, start)
+            return dict(response)
+
+        except LLMShedError:
+            self._record_request("qa_shed", start)
+            return {"text": SHED_ANSWER}
+        except Exception as e:
+            self.metrics.inc("arya_request_errors_total")
+            raise Exception(f"Error getting response: {str(e)}")
+
+    def _answer_question(self, question: str) -> Tuple[Dict, str]:
+        """The knowledge-base part of get_response: (response, path that answered it)."""
+        self._ensure_qa_ready()
+
+        # Keyword lookups that BM25 answers decisively skip the embedding entirely
+        lexical_docs = self.lexical_documents(question)
+        if lexical_docs is not None:
+            cached_answer = self.answer_cache.lookup_question(question)
+            if cached_answer is not None:
+                return {"text": cached_answer}, "qa_cached"
+            answer = self._generate(self.build_prompt(question, lexical_docs))
+            self.answer_cache.store(question, None, answer)
+            return {"text": answer}, "qa_lexical"
+
+        # Embed once and reuse the vector for both the cache lookup and retrieval
+        query_embedding = self.embed_question(question)
+        faq_answer = self.faq_answer(question, query_embedding)
+        if faq_answer is not None:
+            return {"text": faq_answer}, "faq"
+        cached_answer = self.answer_cache.lookup(query_embedding)
+        if cached_answer is not None:
+            return {"text": cached_answer}, "qa_cached"
+
+        answer = self.answer_with_embedding(question, query_embedding)
+        self.answer_cache.store(question, query_embedding, answer)
+        return {"text": answer}, "qa"
+
+    def embed_questions(self, questions: List[str]) -> List[List[float]]:
+        """Embed several questions, in one batch when the embedding cache supports it."""
+        with self.metrics.span("embedding"):
+            embed_queries = getattr(self.embeddings, "embed_queries", None)
+            if embed_queries is not None:
+                return embed_queries(questions)
+            return [self.embeddings.embed_query(question) for question in questions]
+
+    def retrieve_documents_batch(self, query_embeddings: List[List[float]], executor: ThreadPoolExecutor,
+                                 questions: Optional[List[str]] = None) -> List[List["Document"]]:
+        """
+        Top-k chunks for several embeddings: one batched search if the store has one, else in
+        parallel. In hybrid mode, when the questions are given, each result is fused with BM25.
+        """
+        with self.metrics.span("retrieval"):
+            hybrid = questions is not None and self.lexical_index is not None
+            k = self.hybrid_candidates if hybrid else self.fetch_k
+            search_many = getattr(self.vector_store, "similarity_search_by_vectors", None)
+            if search_many is not None:
+                results = search_many(query_embeddings, k=k)
+            else:
+                results = list(executor.map(
+                    lambda embedding: self.vector_store.similarity_search_by_vector(embedding, k=k),
+                    query_embeddings
+                ))
+            if hybrid:
+                results = [self.fuse_documents(question, docs) for question, docs in zip(questions, results)]
+            return results
+
+    def iter_responses(self, questions: List[str], max_concurrency: int = 4) -> Iterator[Union[str, Dict]]:
+        """
+        Answer a batch of questions, yielding one response per question in input order.
+        Menu, photo and exact FAQ questions are answered directly, and in hybrid mode
+        decisive keyword lookups are retrieved from BM25 alone. The rest are embedded in one
+        batch, checked against the FAQ store and the answer cache, retrieved together, and
+        sent to the LLM with at most max_concurrency calls in flight; repeated questions
+        share one call. A question that fails yields {"error": message} instead of stopping
+        the batch.
+        """
+        start = time.perf_counter()
+        results: List[Optional[Union[str, Dict]]] = [None] * len(questions)
+        paths: List[Optional[str]] = [None] * len(questions)
+        pending: List[int] = []
+        for i, question in enumerate(questions):
+            try:
+                fast_response = self.get_fast_response(question)
+            except Exception as e:
+                results[i], paths[i] = {"error": f"Error getting response: {str(e)}"}, "error"
+                continue
+            if fast_response:
+                results[i], paths[i] = fast_response, self._fast_path(fast_response)
+                continue
+            faq_answer = self.faq_answer(question)
+            if faq_answer is not None:
+                results[i], paths[i] = {"text": faq_answer}, "faq"
+            else:
+                pending.append(i)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="arya-batch") as executor:
+            futures = {}
+            if pending:
+                try:
+                    self._ensure_qa_ready()
+                    # (question index, embedding or None on the lexical path, docs if already known)
+                    to_generate = []
+                    to_embed = []
+                    for i in pending:
+                        lexical_docs = self.lexical_documents(questions[i])
+                        if lexical_docs is None:
+                            to_embed.append(i)
+                            continue
+                        cached_answer = self.answer_cache.lookup_question(questions[i])
+                        if cached_answer is not None:
+                            results[i], paths[i] = {"text": cached_answer}, "qa_cached"
+                        else:
+                            to_generate.append((i, None, lexical_docs))
+                            paths[i] = "qa_lexical"
+
+                    embeddings = self.embed_questions([questions[i] for i in to_embed]) if to_embed else []
+                    for i, embedding in zip(to_embed, embeddings):
+                        faq_answer = self.faq_answer(questions[i], embedding)
+                        if faq_answer is not None:
+                            results[i], paths[i] = {"text": faq_answer}, "faq"
+                            continue
+                        cached_answer = self.answer_cache.lookup(embedding)
+                        if cached_answer is not None:
+                            results[i], paths[i] = {"text": cached_answer}, "qa_cached"
+                        else:
+                            to_generate.append((i, embedding, None))
+                            paths[i] = "qa"
+
+                    # Identical questions (after normalisation) are retrieved and generated once
+                    first_of: Dict[str, int] = {}
+                    unique = []
+                    for i, embedding, docs in to_generate:
+                        key = normalize_question(questions[i])
+                        if key not in first_of:
+                            first_of[key] = i
+                            unique.append((i, embedding, docs))
+                    to_retrieve = [(i, embedding) for i, embedding, docs in unique if docs is None]
+                    retrieved = dict(zip(
+                        [i for i, _ in to_retrieve],
+                        self.retrieve_documents_batch([e for _, e in to_retrieve], executor,
+                                                      [questions[i] for i, _ in to_retrieve])
+                    )) if to_retrieve else {}
+                    for i, embedding, docs in unique:
+                        prompt = self.build_prompt(questions[i], docs if docs is not None else retrieved[i])
+                        # Batch calls yield to interactive users and wait for as long as it takes
+                        futures[i] = (executor.submit(self._generate, prompt, PRIORITY_BATCH, math.inf), embedding)
+                    for i, _, _ in to_generate:
+                        futures.setdefault(i, futures[first_of[normalize_question(questions[i])]])
+                except Exception as e:
+                    for i in pending:
+                        if results[i] is None and i not in futures:
+                            results[i], paths[i] = {"error": f"Error getting response: {str(e)}"}, "error"
+
+            stored = set()
+            for i in range(len(questions)):
+                if i in futures:
+                    future, embedding = futures[i]
+                    try:
+                        answer = future.result()
+                        if id(future) not in stored:
+                            stored.add(id(future))
+                            self.answer_cache.store(questions[i], embedding, answer)
+                        results[i] = {"text": answer}
+                    except Exception as e:
+                        results[i], paths[i] = {"error": f"Error getting response: {str(e)}"}, "error"
+                if paths[i] == "error":
+                    self.metrics.inc("arya_request_errors_total")
+                else:
+                    self._record_request(paths[i], start)
+                yield results[i]
+
+    def get_responses(self, questions: List[str], max_concurrency: int = 4) -> List[Union[str, Dict]]:
+        """Batch variant of get_response; see iter_responses."""
+        return list(self.iter_responses(questions, max_concurrency))
+
+    async def aget_response(self, question: str) -> Union[str, Dict]:
+        """
+        Async variant of get_response.
+        Menu and photo questions are answered synchronously; for QA the local embedding
+        runs in the default executor and retrieval and generation use the async clients,
+        so concurrent questions overlap their network waits.
+        """
+        start = time.perf_counter()
+        try:
+            fast_response = self.get_fast_response(question)
+            if fast_response:
+                self._record_request(self._fast_path(fast_response), start)
+                return fast_response
+
+            faq_answer = self.faq_answer(question)
+            if faq_answer is not None:
+                self._record_request("faq", start)
+                return {"text": faq_answer}
+
+            loop = asyncio.get_running_loop()
             if not self.qa_chain:
-                raise Exception("Chatbot not properly initialized. Call setup() first.")
-            
-            response = self.qa_chain.invoke(question)
-            return {"text": response['result']}
-            
+                await loop.run_in_executor(None, self._ensure_qa_ready)
+
+            docs = self.lexical_documents(question)
+            if docs is not None:
+                query_embedding = None
+                cached_answer = self.answer_cache.lookup_question(question)
+            else:
+                query_embedding = await loop.run_in_executor(None, self.embed_question, question)
+                faq_answer = self.faq_answer(question, query_embedding)
+                if faq_answer is not None:
+                    self._record_request("faq", start)
+                    return {"text": faq_answer}
+                cached_answer = self.answer_cache.lookup(query_embedding)
+            if cached_answer is not None:
+                self._record_request("qa_cached", start)
+                return {"text": cached_answer}
+
+            path = "qa_lexical" if docs is not None else "qa"
+            if docs is None:
+                with self.metrics.span("retrieval"):
+                    if self.lexical_index is not None:
+                        docs = self.fuse_documents(question, await self.vector_store.asimilarity_search_by_vector(
+                            query_embedding, k=self.hybrid_candidates))
+                    else:
+                        docs = await self.vector_store.asimilarity_search_by_vector(query_embedding, k=self.fetch_k)
+            prompt = self.build_prompt(question, docs)
+            async with self.llm_scheduler.aslot():
+                with self.metrics.span("llm"):
+                    answer = await self.llm.ainvoke(prompt)
+            self.answer_cache.store(question, query_embedding, answer)
+            self._record_request(path, start)
+            return {"text": answer}
+
+        except LLMShedError:
+            self._record_request("qa_shed", start)
+            return {"text": SHED_ANSWER}
         except Exception as e:
+            self.metrics.inc("arya_request_errors_total")
             raise Exception(f"Error getting response: {str(e)}")
 
+    def stream_response(self, question: str) -> Iterator[Union[str, Dict]]:
+        """
+        Stream the answer to a question.
+        Menu answers, photo results, FAQ and cached answers are yielded whole; otherwise the
+        LLM completion is yielded token by token as the endpoint produces it. The full
+        text is added to the answer cache once the stream finishes. A question already
+        being answered for someone else waits for that answer and yields it whole.
+        """
+        start = time.perf_counter()
+        try:
+            fast_response = self.get_fast_response(question)
+            if fast_response:
+                self._record_request(self._fast_path(fast_response), start)
+                yield fast_response
+                return
+
+            faq_answer = self.faq_answer(question)
+            if faq_answer is not None:
+                self._record_request("faq", start)
+                yield faq_answer
+                return
+
+            key = normalize_question(question)
+            flight, leading = self.inflight.join(key)
+            if not leading:
+                try:
+                    response, _ = flight.result()
+                except CancelledError:
+                    # The leader's stream was closed early; answer this one separately
+                    flight = None
+                else:
+                    self._record_request("qa_coalesced", start)
+                    yield response["text"]
+                    return
+
+            try:
+                text, path = yield from self._stream_answer(question, start)
+            except Exception as e:
+                if flight is not None:
+                    self.inflight.fail(key, flight, e)
+                raise
+            except BaseException:
+                if flight is not None:
+                    self.inflight.abandon(key, flight)
+                raise
+            if flight is not None:
+                self.inflight.finish(key, flight, ({"text": text}, path))
+            self._record_request(path, start)
+
+        except Exception as e:
+            self.metrics.inc("arya_request_errors_total")
+            raise Exception(f"Error streaming response: {str(e)}")
+
+    def _stream_answer(self, question: str, start: float):
+        """Yield the knowledge-base answer in chunks; returns (full text, path that answered it)."""
+        self._ensure_qa_ready()
+
+        docs = self.lexical_documents(question)
+        if docs is not None:
+            query_embedding = None
+            cached_answer = self.answer_cache.lookup_question(question)
+        else:
+            query_embedding = self.embed_question(question)
+            faq_answer = self.faq_answer(question, query_embedding)
+            if faq_answer is not None:
+                yield faq_answer
+                return faq_answer, "faq"
+            cached_answer = self.answer_cache.lookup(query_embedding)
+        if cached_answer is not None:
+            yield cached_answer
+            return cached_answer, "qa_cached"
+
+        path = "qa_lexical" if docs is not None else "qa"
+        if docs is None:
+            docs = self.retrieve_documents(query_embedding, question)
+        prompt = self.build_prompt(question, docs)
+        try:
+            ticket = self.llm_scheduler.acquire()
+        except LLMShedError:
+            yield SHED_ANSWER
+            return SHED_ANSWER, "qa_shed"
+        chunks = []
+        # Time spent waiting for the LLM, not for the caller to take each chunk
+        generating = 0.0
+        error = None
+        try:
+            resumed = time.perf_counter()
+            for chunk in self.llm.stream(prompt):
+                generating += time.perf_counter() - resumed
+                if not chunks:
+                    self.metrics.observe("arya_time_to_first_token_seconds", time.perf_counter() - start)
+                chunks.append(chunk)
+                yield chunk
+                resumed = time.perf_counter()
+            generating += time.perf_counter() - resumed
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.llm_scheduler.release(ticket, error, generating)
+        # A generator cannot hold a span across yields
+        self.metrics.observe(STAGE_SECONDS, generating, {"stage": "llm"})
+
+        text = "".join(chunks)
+        self.answer_cache.store(question, query_embedding, text)
+        return text, path
+
  
 
 
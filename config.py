@@ -4,6 +4,16 @@ import os
 import streamlit as st
 from dotenv import load_dotenv
 
+def _get_setting(var):
+    """
+    Look up a setting in Streamlit secrets (for deployment), then the environment.
+    Returns None only if the setting is unset; a setting given as empty stays "".
+    """
+    if hasattr(st.secrets, var):
+        # Secrets are TOML, so numbers and booleans arrive typed; settings are read as strings
+        return str(st.secrets[var])
+    return os.getenv(var)
+
 def load_config():
     """
     Load configuration from environment variables or Streamlit secrets.
@@ -15,30 +25,91 @@ def load_config():
     # Dictionary to store our configuration
     config = {}
 
+    # Optional settings and their defaults
+    optional_vars = {
+        'VECTOR_BACKEND': 'pinecone',    # "pinecone" or "local"
+        'LOCAL_INDEX_DIR': 'data/index',
+        'RETRIEVAL_MODE': 'hybrid',      # "hybrid" (BM25 + dense) or "dense"
+        'CONTEXT_TOKEN_BUDGET': '512',   # approximate prompt tokens for retrieved context
+        'SEMANTIC_CACHE_THRESHOLD': '0.95',   # cosine similarity needed to reuse an answer
+        'SEMANTIC_CACHE_MAX_ENTRIES': '500',
+        'SEMANTIC_CACHE_TTL': '3600',         # seconds
+        'SEMANTIC_CACHE_PATH': '',            # empty keeps the cache in memory only
+        'FAQ_STORE_PATH': 'data/faq_store.json',  # vetted answers built by faq_store.py; empty disables
+        'FAQ_THRESHOLD': '0.95',              # cosine similarity needed to serve an FAQ answer
+        'EMBEDDING_BACKEND': 'torch',   # "torch", "int8", "onnx" or "onnx-int8" (embedding_backends.py)
+        'EMBEDDING_MODEL': 'large',     # e5 size ("large", "base", "small") or a Hugging Face model id
+        'EMBEDDING_THREADS': '',        # CPU threads for the embedding model; empty uses the runtime default
+        'MODEL_CACHE_DIR': '',          # model downloads and ONNX exports; empty uses the Hugging Face cache
+        'VECTOR_COMPRESSION': 'none',   # local index: "none", "float16", "int8" or "pq" (vector_codecs.py)
+        'VECTOR_RERANK': '10',          # candidates per result re-ranked at full precision; 0 disables
+        'EMBEDDING_CACHE_PATH': 'data/index/embedding_cache.sqlite3',  # empty keeps query vectors in memory only
+        'LLM_ENDPOINT_URL': '',        # empty uses the public Hugging Face inference API
+        'LLM_TIMEOUT': '30',           # seconds per answer, including retries
+        'LLM_MAX_ATTEMPTS': '3',
+        'LLM_HEDGE': 'false',          # "true" re-sends calls slower than the recent p95
+        'LLM_RATE_LIMIT': '',          # LLM calls per second allowed to start; empty: no rate budget
+        'LLM_BURST': '5',              # calls that may start back to back before the rate applies
+        'LLM_MAX_IN_FLIGHT': '8',      # concurrent LLM calls
+        'LLM_QUEUE_SIZE': '64',        # calls waiting for the budget; more are shed
+        'LLM_DEADLINE': '20',          # seconds from asking to answer, shedding calls that cannot make it; empty: none
+        'TENANTS_PATH': '',            # JSON list of hostels served by one process (tenancy.py); empty serves one
+        'TENANT_MEMORY_MB': '256',     # per-hostel data kept loaded before idle hostels are evicted
+        'LOG_LEVEL': 'WARNING',        # DEBUG turns on per-request logging
+        'METRICS_PORT': ''             # e.g. 9100 serves /metrics and /metrics.json; empty disables
+    }
+
+    for var, default in optional_vars.items():
+        value = _get_setting(var)
+        # An empty setting is kept: for several settings it means "disabled"
+        config[var] = default if value is None else value
+
     # List of required environment variables
-    required_vars = [
-        'PINECONE_API_KEY',
-        'PINECONE_ENV',
-        'HUGGING_FACE_API'
-    ]
+    required_vars = ['HUGGING_FACE_API']
+    if config['VECTOR_BACKEND'] == 'pinecone':
+        required_vars += ['PINECONE_API_KEY', 'PINECONE_ENV']
 
     # Try getting variables from different sources
     for var in required_vars:
-        # First check Streamlit secrets (for deployment)
-        if hasattr(st.secrets, var):
-            config[var] = st.secrets[var]
-        # Then check environment variables
-        elif os.getenv(var):
-            config[var] = os.getenv(var)
-        else:
-            config[var] = None
+        config[var] = _get_setting(var)
 
     # Validate configuration
-    missing_vars = [var for var, value in config.items() if value is None]
+    missing_vars = [var for var in required_vars if not config[var]]
     if missing_vars:
         raise EnvironmentError(
             f"Missing required environment variables: {', '.join(missing_vars)}\n"
             "Please set them in .env file for local development or in Streamlit secrets for deployment."
         )
 
-    return config
\ No newline at end of file
+    return config
+
+def chatbot_options(config):
+    """
+    AryaChatbot arguments built from load_config(), shared by the app, the server and the
+    command-line tools. Callers override single entries (e.g. vector_backend from --backend).
+    """
+    return dict(
+        pinecone_api_key=config.get('PINECONE_API_KEY'),
+        pinecone_env=config.get('PINECONE_ENV'),
+        huggingface_api=config['HUGGING_FACE_API'],
+        vector_backend=config['VECTOR_BACKEND'],
+        index_dir=config['LOCAL_INDEX_DIR'],
+        embedding_cache_path=config['EMBEDDING_CACHE_PATH'] or None,
+        embedding_backend=config['EMBEDDING_BACKEND'],
+        embedding_model=config['EMBEDDING_MODEL'],
+        embedding_threads=int(config['EMBEDDING_THREADS']) if config['EMBEDDING_THREADS'] else None,
+        model_cache_dir=config['MODEL_CACHE_DIR'] or None,
+        vector_compression=config['VECTOR_COMPRESSION'],
+        vector_rerank=int(config['VECTOR_RERANK']),
+        retrieval_mode=config['RETRIEVAL_MODE'],
+        context_token_budget=int(config['CONTEXT_TOKEN_BUDGET']),
+        llm_endpoint_url=config['LLM_ENDPOINT_URL'] or None,
+        llm_timeout=float(config['LLM_TIMEOUT']),
+        llm_max_attempts=int(config['LLM_MAX_ATTEMPTS']),
+        llm_hedge=config['LLM_HEDGE'].lower() == 'true',
+        llm_rate_limit=float(config['LLM_RATE_LIMIT']) if config['LLM_RATE_LIMIT'] else None,
+        llm_burst=int(config['LLM_BURST']),
+        llm_max_in_flight=int(config['LLM_MAX_IN_FLIGHT']),
+        llm_queue_size=int(config['LLM_QUEUE_SIZE']),
+        llm_deadline=float(config['LLM_DEADLINE']) if config['LLM_DEADLINE'] else None
+    )
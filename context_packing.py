@@ -0,0 +1,87 @@
+"""
+Post-retrieval context selection for the QA prompt.
+
+The knowledge base holds several paraphrases of the same fact, so the top-k chunks
+often repeat one another. ContextPacker takes an over-fetched, best-first candidate
+list and greedily picks chunks by maximal marginal relevance: relevance from the
+retrieval rank, redundancy as the share of a chunk's words already present in the
+chosen context. Near-duplicates are dropped outright, and chunks are added until
+max_chunks or the token budget is reached.
+"""
+import logging
+import math
+from typing import TYPE_CHECKING, Callable, List, NamedTuple, Optional, Sequence, Set
+
+from lexical_index import tokenize
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count: ~4 characters per token for English text with Mistral-style tokenizers."""
+    return math.ceil(len(text) / 4)
+
+
+class PackedContext(NamedTuple):
+    documents: List["Document"]
+    tokens: int
+    # Tokens the plain top-k would have used, for reporting the saving
+    baseline_tokens: int
+    dropped_duplicates: int
+
+
+class ContextPacker:
+    """
+    Select a diverse, de-duplicated subset of retrieved chunks within a token budget.
+    A candidate whose words are at least duplicate_threshold covered by the chunks already
+    chosen is skipped; among the rest, each step takes the highest
+    mmr_lambda * relevance - (1 - mmr_lambda) * redundancy.
+    """
+
+    def __init__(self, token_budget: Optional[int] = 512, duplicate_threshold: float = 0.6,
+                 mmr_lambda: float = 0.7, count_tokens: Callable[[str], int] = estimate_tokens):
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+        self.mmr_lambda = mmr_lambda
+        self.count_tokens = count_tokens
+
+    @staticmethod
+    def _redundancy(terms: Set[str], covered: Set[str]) -> float:
+        return len(terms & covered) / len(terms) if terms else 1.0
+
+    def pack(self, docs: Sequence["Document"], max_chunks: int = 3) -> PackedContext:
+        """Choose up to max_chunks of docs (best first) for the prompt."""
+        baseline_tokens = sum(self.count_tokens(doc.page_content) for doc in docs[:max_chunks])
+        candidates = [
+            (rank, doc, set(tokenize(doc.page_content)), self.count_tokens(doc.page_content))
+            for rank, doc in enumerate(docs)
+        ]
+        chosen: List["Document"] = []
+        covered: Set[str] = set()
+        tokens = 0
+        while candidates and len(chosen) < max_chunks:
+            best, best_score = None, None
+            for index, (rank, doc, terms, cost) in enumerate(candidates):
+                redundancy = self._redundancy(terms, covered)
+                if chosen and redundancy >= self.duplicate_threshold:
+                    continue
+                relevance = 1.0 - rank / len(docs)
+                score = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * redundancy
+                if best_score is None or score > best_score:
+                    best, best_score = index, score
+            if best is None:
+                break
+            rank, doc, terms, cost = candidates.pop(best)
+            # The best chunk is always kept so an over-long one cannot empty the context
+            if chosen and self.token_budget is not None and tokens + cost > self.token_budget:
+                break
+            chosen.append(doc)
+            covered |= terms
+            tokens += cost
+
+        # Everything left that the chosen context already covers counts as a dropped duplicate
+        dropped = sum(1 for _, _, terms, _ in candidates if self._redundancy(terms, covered) >= self.duplicate_threshold)
+        return PackedContext(chosen, tokens, baseline_tokens, dropped)
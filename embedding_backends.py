@@ -0,0 +1,192 @@
+"""
+Embedding model backends: model size, precision and runtime.
+
+    torch      full-precision sentence-transformers model (the original setup)
+    int8       the same model with its linear layers dynamically quantized to int8 (PyTorch)
+    onnx       the model exported to ONNX and run with onnxruntime
+    onnx-int8  the ONNX export with int8 weights (onnxruntime dynamic quantization)
+
+Every backend mean-pools the last hidden state and L2-normalizes it, like
+HuggingFaceEmbeddings with normalize_embeddings=True. Models are the multilingual e5
+family; "large", "base" and "small" are accepted as aliases. Downloads go to
+cache_dir (default: the Hugging Face cache); ONNX exports are written once under
+<cache_dir>/onnx/ and loaded from there afterwards. Building an export needs
+`optimum[onnxruntime]`; running one only needs onnxruntime and transformers.
+
+Vectors from different models or backends must not share an index or a cache:
+embedding_identity() names the combination and is each backend's model_name, which
+the local index, the query-vector cache and the FAQ store are keyed on.
+
+    python embedding_backends.py --backend onnx-int8 --model small   # export ahead of time
+"""
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODELS = {
+    "large": "intfloat/multilingual-e5-large",   # 1024 dimensions, ~560M parameters
+    "base": "intfloat/multilingual-e5-base",     # 768 dimensions, ~280M parameters
+    "small": "intfloat/multilingual-e5-small",   # 384 dimensions, ~120M parameters
+}
+DEFAULT_MODEL = EMBEDDING_MODELS["large"]
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+
+
+def resolve_model(model: Optional[str]) -> str:
+    """Full model name for an alias ("small") or a Hugging Face model id."""
+    return EMBEDDING_MODELS.get(model or "large", model)
+
+
+def embedding_identity(backend: str, model: Optional[str]) -> str:
+    """
+    Name of the vector space a backend/model pair produces.
+    The original full-precision model keeps its bare name, so existing caches stay valid.
+    """
+    model = resolve_model(model)
+    return model if backend == "torch" else f"{model}:{backend}"
+
+
+def default_cache_dir() -> str:
+    return os.environ.get("HF_HOME") or os.path.join(os.path.expanduser("~"), ".cache", "huggingface")
+
+
+def set_torch_threads(threads: Optional[int]):
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def load_torch_embeddings(model: str, cache_dir: Optional[str] = None, quantize: bool = False,
+                          threads: Optional[int] = None) -> Embeddings:
+    """HuggingFaceEmbeddings, optionally with int8 dynamically quantized linear layers."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    set_torch_threads(threads)
+    embeddings = HuggingFaceEmbeddings(
+        model_name=model,
+        cache_folder=cache_dir,
+        model_kwargs={'device': 'cpu'} if quantize else {},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    if quantize:
+        import torch
+        # Swaps Linear layers for int8-weight versions; activations stay float
+        client = embeddings._client
+        client[0].auto_model = torch.quantization.quantize_dynamic(
+            client[0].auto_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        # model_name is only read when the client is built; from here on it names the vector space
+        embeddings.model_name = embedding_identity("int8", model)
+    return embeddings
+
+
+def export_onnx(model: str, cache_dir: Optional[str] = None, quantize: bool = True) -> Path:
+    """Directory holding the ONNX export (and tokenizer) of model, building it on first use."""
+    export_dir = Path(cache_dir or default_cache_dir()) / "onnx" / model.replace("/", "--")
+    onnx_file = export_dir / ("model_int8.onnx" if quantize else "model.onnx")
+    if onnx_file.exists():
+        return export_dir
+
+    if not (export_dir / "model.onnx").exists():
+        try:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+        except ImportError:
+            raise Exception(f"No ONNX export of {model} in {export_dir}; building one needs "
+                            "`pip install optimum[onnxruntime]`")
+        from transformers import AutoTokenizer
+
+        start = time.perf_counter()
+        logger.info("Exporting %s to ONNX in %s", model, export_dir)
+        ORTModelForFeatureExtraction.from_pretrained(model, export=True, cache_dir=cache_dir).save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model, cache_dir=cache_dir).save_pretrained(export_dir)
+        logger.info("Exported %s in %.1fs", model, time.perf_counter() - start)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info("Quantizing %s to int8", export_dir / "model.onnx")
+        # The fp32 export of e5-large is over 2 GB, so its weights live in external data files
+        quantize_dynamic(str(export_dir / "model.onnx"), str(onnx_file), weight_type=QuantType.QInt8,
+                         use_external_data_format=True)
+    return export_dir
+
+
+class OnnxEmbeddings(Embeddings):
+    """e5 embeddings computed with onnxruntime on CPU: mean pooling, then L2 normalization."""
+
+    def __init__(self, model: str = DEFAULT_MODEL, cache_dir: Optional[str] = None, quantize: bool = True,
+                 threads: Optional[int] = None, batch_size: int = 32, max_length: int = 512):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.model = resolve_model(model)
+        self.model_name = embedding_identity("onnx-int8" if quantize else "onnx", self.model)
+        self.batch_size = batch_size
+        self.max_length = max_length
+        export_dir = export_onnx(self.model, cache_dir, quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        model_file = export_dir / ("model_int8.onnx" if quantize else "model.onnx")
+        self.session = onnxruntime.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        batch = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+        inputs = {name: value.astype(np.int64) for name, value in batch.items() if name in self._input_names}
+        if "token_type_ids" in self._input_names and "token_type_ids" not in inputs:
+            inputs["token_type_ids"] = np.zeros_like(inputs["input_ids"])
+        hidden = self.session.run(None, inputs)[0]
+        mask = batch["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = [self._encode(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        return np.vstack(vectors).tolist() if vectors else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def load_embeddings(backend: str = "torch", model: Optional[str] = None, cache_dir: Optional[str] = None,
+                    threads: Optional[int] = None) -> Embeddings:
+    """The embedding model for a backend (see BACKENDS) and an e5 size alias or model id."""
+    model = resolve_model(model)
+    if backend in ("torch", "int8"):
+        return load_torch_embeddings(model, cache_dir, quantize=backend == "int8", threads=threads)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbeddings(model, cache_dir, quantize=backend == "onnx-int8", threads=threads)
+    raise Exception(f"Unknown embedding backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Download (and for ONNX backends, export) an embedding model")
+    parser.add_argument("--backend", choices=BACKENDS, default="onnx-int8")
+    parser.add_argument("--model", default="large", help="large, base, small or a Hugging Face model id")
+    parser.add_argument("--cache-dir", default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    embeddings = load_embeddings(args.backend, args.model, args.cache_dir)
+    vector = embeddings.embed_query("How many rooms are there in the hostel?")
+    print(f"{embedding_identity(args.backend, args.model)}: {len(vector)} dimensions, "
+          f"ready in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
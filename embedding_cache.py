@@ -0,0 +1,158 @@
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from semantic_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model with an LRU cache of query vectors.
+    Queries are keyed on their normalized text. Misses in memory fall back to an
+    optional SQLite store, so the cache survives restarts. Document embeddings
+    (used for ingestion) pass straight through.
+    """
+
+    def __init__(self, base: Embeddings, max_entries: int = 2048, db_path: Optional[str] = None,
+                 namespace: Optional[str] = None):
+        self.base = base
+        self.max_entries = max_entries
+        # Vectors from different models must never be mixed up
+        self.namespace = namespace or getattr(base, "model_name", type(base).__name__)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self._db = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._connect()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings "
+            "(namespace TEXT, query TEXT, vector BLOB, PRIMARY KEY (namespace, query))"
+        )
+        self._db.commit()
+
+    def reconnect(self):
+        """Open a fresh SQLite connection; call in a forked child, which must not reuse the parent's."""
+        self._lock = threading.Lock()
+        if self.db_path:
+            self._connect()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, key: str) -> Optional[List[float]]:
+        row = self._db.execute(
+            "SELECT vector FROM query_embeddings WHERE namespace = ? AND query = ?", (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        return array("f", row[0]).tolist()
+
+    def _save_to_disk(self, key: str, vector: List[float]):
+        self._db.execute(
+            "INSERT OR REPLACE INTO query_embeddings (namespace, query, vector) VALUES (?, ?, ?)",
+            (self.namespace, key, array("f", vector).tobytes())
+        )
+        self._db.commit()
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_question(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return list(vector)
+            if self._db is not None:
+                vector = self._load_from_disk(key)
+                if vector is not None:
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return list(vector)
+            self.misses += 1
+
+        # Encode outside the lock so concurrent misses do not serialise on the model
+        # Round through float32 so memory and disk hits return identical vectors
+        vector = array("f", self.base.embed_query(text)).tolist()
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._save_to_disk(key, vector)
+        return list(vector)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries, encoding all cache misses in one batch.
+        Misses go through the base model's embed_documents, which for the sentence-transformer
+        models used here encodes exactly like embed_query.
+        """
+        keys = [normalize_question(text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+        missing: Dict[str, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in vectors or key in missing:
+                    continue
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                elif self._db is not None:
+                    vector = self._load_from_disk(key)
+                    if vector is not None:
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+                if vector is None:
+                    self.misses += 1
+                    missing[key] = text
+                else:
+                    vectors[key] = vector
+
+        if missing:
+            encoded = self.base.embed_documents(list(missing.values()))
+            with self._lock:
+                for key, vector in zip(missing, encoded):
+                    vector = array("f", vector).tolist()
+                    vectors[key] = vector
+                    self._remember(key, vector)
+                    if self._db is not None:
+                        self._save_to_disk(key, vector)
+        return [list(vectors[key]) for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def stats(self) -> Dict:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM query_embeddings WHERE namespace = ?", (self.namespace,))
+                self._db.commit()
@@ -0,0 +1,355 @@
+"""
+Precomputed answers to frequently asked questions, served without retrieval or the LLM.
+
+An offline job clusters known questions (a query log or a curated list), generates one
+answer per cluster through the normal QA pipeline, and records the knowledge-base chunks
+the answer was generated from. Entries are reviewed and approved before they are served:
+
+    python faq_store.py build data/faq_questions.txt [--approve]
+    python faq_store.py list
+    python faq_store.py approve <id> [<id> ...] | --all
+
+At runtime AryaChatbot answers a question from the store when it matches a cluster
+question exactly (after normalization, before any model is loaded) or, once embedded,
+when it is within `threshold` cosine similarity of one. An entry stops being served as
+soon as one of its source chunks changes or disappears from data/data.txt; the next
+build regenerates it.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from ingest import chunk_hash, chunk_knowledge_base
+from llm_scheduler import PRIORITY_BATCH
+from semantic_cache import embedding_model_name, normalize_question
+
+logger = logging.getLogger(__name__)
+
+FAQ_STORE_VERSION = 1
+
+
+class FAQStore:
+    """
+    Vetted answers keyed on clusters of paraphrased questions.
+    Each entry holds its questions (with their embeddings), the answer, and the ids
+    (ingest.chunk_hash) of its source chunks. Only vetted entries whose source chunks are
+    all still in data_path are served; data_path is re-checked when its modification time
+    changes, at most every check_interval seconds.
+    """
+
+    def __init__(self, path: str = "data/faq_store.json", data_path: str = "data/data.txt",
+                 threshold: float = 0.95, check_interval: float = 5.0):
+        self.path = Path(path)
+        self.data_path = data_path
+        self.threshold = threshold
+        self.check_interval = check_interval
+        self.embedding_model: Optional[str] = None
+        self.entries: List[Dict] = []
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._stale: Set[str] = set()
+        self._data_mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._vectors_enabled = True
+        self._by_question: Dict[str, Dict] = {}
+        self._rows: List[Dict] = []
+        self._matrix: Optional[np.ndarray] = None
+        if self.path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def is_stale(self, entry: Dict) -> bool:
+        return entry["id"] in self._stale
+
+    def is_active(self, entry: Dict) -> bool:
+        return entry["vetted"] and not self.is_stale(entry)
+
+    def _reindex(self):
+        """Rebuild the question map and vector matrix over the entries currently served."""
+        by_question, rows, vectors = {}, [], []
+        for entry in self.entries:
+            if not self.is_active(entry):
+                continue
+            for question in entry["questions"]:
+                by_question[normalize_question(question)] = entry
+            for vector in entry.get("vectors") or []:
+                rows.append(entry)
+                vectors.append(self._normalize(vector))
+        self._by_question = by_question
+        self._rows = rows
+        self._matrix = np.stack(vectors) if vectors else None
+
+    def refresh(self, force: bool = False):
+        """Mark entries whose source chunks are no longer in the knowledge base as stale."""
+        try:
+            mtime = os.stat(self.data_path).st_mtime
+        except OSError as e:
+            logger.error("Could not check FAQ sources in %s: %s", self.data_path, e)
+            return
+        with self._lock:
+            if not force and mtime == self._data_mtime:
+                return
+            current = {chunk["id"] for chunk in chunk_knowledge_base(self.data_path)}
+            stale = {entry["id"] for entry in self.entries if not set(entry["sources"]) <= current}
+            newly_stale = stale - self._stale
+            self._stale = stale
+            self._data_mtime = mtime
+            self._reindex()
+        if newly_stale:
+            logger.warning("%d FAQ entries invalidated by changes to %s", len(newly_stale), self.data_path)
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.refresh()
+
+    def bind_embeddings(self, embeddings):
+        """Only match by vector if the store was built with the same embedding model as the chatbot."""
+        name = embedding_model_name(embeddings)
+        self._vectors_enabled = self.embedding_model in (None, name)
+        if not self._vectors_enabled:
+            logger.warning("FAQ store was built with %s, not %s; only exact question matches are served",
+                           self.embedding_model, name)
+
+    def lookup_question(self, question: str) -> Optional[str]:
+        """The answer for a question that is in a served cluster (after normalization), or None."""
+        self._maybe_refresh()
+        entry = self._by_question.get(normalize_question(question))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["answer"]
+
+    def lookup(self, vector) -> Optional[str]:
+        """The answer of the closest served cluster question, if within threshold, or None."""
+        self._maybe_refresh()
+        matrix, rows = self._matrix, self._rows
+        if matrix is None or not self._vectors_enabled or matrix.shape[1] != len(vector):
+            self.misses += 1
+            return None
+        scores = matrix @ self._normalize(vector)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.debug("FAQ hit (%.3f) on entry %s", scores[best], rows[best]["id"])
+        return rows[best]["answer"]
+
+    def approve(self, entry_ids: Optional[List[str]] = None) -> int:
+        """Mark entries (all when entry_ids is None) as vetted; returns how many changed."""
+        changed = 0
+        with self._lock:
+            for entry in self.entries:
+                if not entry["vetted"] and (entry_ids is None or entry["id"] in entry_ids):
+                    entry["vetted"] = True
+                    changed += 1
+            self._reindex()
+        return changed
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "served": sum(1 for entry in self.entries if self.is_active(entry)),
+            "stale": len(self._stale),
+            "unvetted": sum(1 for entry in self.entries if not entry["vetted"]),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def save(self):
+        """Write the store to path atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": FAQ_STORE_VERSION, "embedding_model": self.embedding_model, "entries": self.entries}
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Could not load FAQ store from %s: %s", self.path, e)
+            return
+        if payload.get("version") != FAQ_STORE_VERSION:
+            logger.error("Ignoring FAQ store %s with unknown version %s", self.path, payload.get("version"))
+            return
+        self.embedding_model = payload.get("embedding_model")
+        self.entries = payload["entries"]
+        self.refresh(force=True)
+        logger.info("Loaded %d FAQ entries from %s", len(self.entries), self.path)
+
+
+def build_faq(chatbot, questions: List[str], store: FAQStore, cluster_threshold: float = 0.93,
+              min_count: int = 1, approve: bool = False) -> Dict[str, int]:
+    """
+    Cluster questions and add an answer for every new cluster to the store.
+    Questions are taken most frequent first; each joins the closest cluster whose first
+    question is at least cluster_threshold similar, or starts a new one. Entries that are
+    still valid keep their answer and vetting and only gain new paraphrases; stale entries
+    are dropped and their questions clustered again. Clusters asked fewer than min_count
+    times are skipped.
+    """
+    if not chatbot.is_ready:
+        chatbot.setup()
+    model = embedding_model_name(chatbot.embeddings)
+    if store.embedding_model not in (None, model):
+        logger.warning("Re-embedding FAQ store built with %s using %s", store.embedding_model, model)
+        for entry in store.entries:
+            entry["vectors"] = []
+    store.embedding_model = model
+    store.refresh(force=True)
+
+    stats = {"kept": 0, "extended": 0, "generated": 0, "dropped_stale": 0, "skipped": 0}
+    kept = [entry for entry in store.entries if not store.is_stale(entry)]
+    stats["dropped_stale"] = len(store.entries) - len(kept)
+    for entry in store.entries:
+        if store.is_stale(entry):
+            questions = questions + entry["questions"]
+
+    counts = Counter(normalize_question(question) for question in questions)
+    spelling = {}
+    for question in questions:
+        spelling.setdefault(normalize_question(question), question.strip())
+    known = {normalize_question(question) for entry in kept for question in entry["questions"]}
+    new_keys = sorted((key for key in counts if key not in known), key=lambda key: (-counts[key], key))
+
+    # Clusters start from the kept entries, compared by their first question
+    clusters = [{"entry": entry, "vector": None, "members": [], "count": 0} for entry in kept]
+    for cluster in clusters:
+        if not cluster["entry"].get("vectors"):
+            cluster["entry"]["vectors"] = chatbot.embed_questions(cluster["entry"]["questions"])
+        cluster["vector"] = FAQStore._normalize(cluster["entry"]["vectors"][0])
+    vectors = chatbot.embed_questions([spelling[key] for key in new_keys]) if new_keys else []
+    for key, vector in zip(new_keys, vectors):
+        vector = FAQStore._normalize(vector)
+        scores = [float(cluster["vector"] @ vector) for cluster in clusters]
+        best = int(np.argmax(scores)) if scores else -1
+        if best >= 0 and scores[best] >= cluster_threshold:
+            cluster = clusters[best]
+        else:
+            cluster = {"entry": None, "vector": vector, "members": [], "count": 0}
+            clusters.append(cluster)
+        cluster["members"].append((spelling[key], vector))
+        cluster["count"] += counts[key]
+
+    entries = []
+    for cluster in clusters:
+        entry = cluster["entry"]
+        if entry is not None:
+            entry["questions"] += [question for question, _ in cluster["members"]]
+            entry["vectors"] = list(entry["vectors"]) + [vector.tolist() for _, vector in cluster["members"]]
+            stats["extended" if cluster["members"] else "kept"] += 1
+            entries.append(entry)
+            continue
+        if cluster["count"] < min_count:
+            stats["skipped"] += 1
+            continue
+        leader = cluster["members"][0][0]
+        # An offline job: yield to interactive calls and wait as long as it takes instead of being shed
+        answer, docs = chatbot.answer_with_sources(leader, PRIORITY_BATCH, math.inf)
+        entries.append({
+            "id": chunk_hash(normalize_question(leader))[:12],
+            "questions": [question for question, _ in cluster["members"]],
+            "vectors": [vector.tolist() for _, vector in cluster["members"]],
+            "answer": answer,
+            "sources": sorted({chunk_hash(doc.page_content) for doc in docs}),
+            "vetted": approve,
+            "created": time.time(),
+        })
+        stats["generated"] += 1
+        logger.info("Generated FAQ answer for %r (%d questions)", leader, len(cluster["members"]))
+
+    store.entries = entries
+    store.refresh(force=True)
+    stale = sum(1 for entry in entries if store.is_stale(entry))
+    if stale:
+        logger.warning("%d FAQ entries cite chunks that are no longer in %s; re-run ingest.py and build again",
+                       stale, store.data_path)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build and review the precomputed FAQ answer store")
+    parser.add_argument("--store", default=None, help="FAQ store path (default: FAQ_STORE_PATH from the config)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Cluster questions and generate answers for new clusters")
+    build.add_argument("questions", help="Text file (one question per line) or JSONL; repeats count as frequency")
+    build.add_argument("--cluster-threshold", type=float, default=0.93, help="Cosine similarity to join a cluster")
+    build.add_argument("--min-count", type=int, default=1, help="Skip clusters asked fewer times than this")
+    build.add_argument("--approve", action="store_true", help="Mark new answers as vetted without review")
+    build.add_argument("--backend", choices=["local", "pinecone"], default=None,
+                       help="Vector backend (default: VECTOR_BACKEND from the config)")
+    commands.add_parser("list", help="Show entries and whether they are served")
+    approve = commands.add_parser("approve", help="Mark reviewed entries as vetted")
+    approve.add_argument("ids", nargs="*")
+    approve.add_argument("--all", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    from config import chatbot_options, load_config
+
+    config = load_config()
+    if not (args.store or config['FAQ_STORE_PATH']):
+        sys.exit("FAQ_STORE_PATH is empty (the FAQ store is disabled); pass --store to build one")
+    store = FAQStore(args.store or config['FAQ_STORE_PATH'], threshold=float(config['FAQ_THRESHOLD']))
+
+    if args.command == "list":
+        for entry in store.entries:
+            status = "stale" if store.is_stale(entry) else ("served" if entry["vetted"] else "unvetted")
+            print(f"{entry['id']}  {status:8}  {len(entry['questions']):3d} questions  {entry['questions'][0]}")
+            print(f"    {entry['answer'].strip()[:200]}")
+        print(json.dumps(store.stats()))
+        return
+
+    if args.command == "approve":
+        if not args.ids and not args.all:
+            sys.exit("Give entry ids to approve, or --all")
+        print(f"Approved {store.approve(None if args.all else args.ids)} entries")
+        store.save()
+        return
+
+    from batch_answer import read_questions
+    from chatbot import AryaChatbot
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = read_questions(f)
+    options = chatbot_options(config)
+    if args.backend:
+        options['vector_backend'] = args.backend
+    chatbot = AryaChatbot(**options)
+    stats = build_faq(chatbot, questions, store, args.cluster_threshold, args.min_count, args.approve)
+    store.save()
+    print(json.dumps(stats))
+    if not args.approve and stats["generated"]:
+        print("Review the new answers with `python faq_store.py list`, then approve them")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
 import os
 from typing import Dict, List, Optional
 import logging
-import re
 from pathlib import Path
+from photo_manifest import PhotoManifest
+from router import IntentRouter, Route
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class HostelPhotos:
@@ -18,6 +17,8 @@ class HostelPhotos:
             "facilities": ["common_room", "washing_area", "sports","toilet"],
             "exterior": ["building", "entrance", "garden"]
         }
+        self._router = None
+        self.manifest = PhotoManifest(photos_directory)
         
     def setup(self) -> bool:
         """Ensure the photos directory exists and is properly structured."""
@@ -37,83 +38,68 @@ class HostelPhotos:
             
             return True
         except Exception as e:
-            logger.error(f"Failed to setup photos directory structure: {str(e)}")
+            logger.error("Failed to setup photos directory structure: %s", e)
             return False
 
     def get_photo_paths(self, category: Optional[str] = None, subcategory: Optional[str] = None) -> List[str]:
         """
         Get paths to photos based on category and subcategory.
-        Returns a list of photo paths matching the criteria.
+        Returns a list of photo paths matching the criteria, served from the photo manifest.
         """
         try:
-            photo_paths = []
-            
             if category and subcategory:
                 # Get specific subcategory photos
-                photo_dir = self.photos_directory / category / subcategory
-                if photo_dir.exists():
-                    photo_paths.extend([str(p) for p in photo_dir.glob("*.jpg")])
-                    photo_paths.extend([str(p) for p in photo_dir.glob("*.png")])
-            elif category:
+                return self.manifest.get(category, subcategory)
+            if category:
                 # Get all photos in a category
-                category_dir = self.photos_directory / category
-                if category_dir.exists():
-                    for subcategory in self.photo_categories.get(category, []):
-                        photo_dir = category_dir / subcategory
-                        photo_paths.extend([str(p) for p in photo_dir.glob("*.jpg")])
-                        photo_paths.extend([str(p) for p in photo_dir.glob("*.png")])
-            else:
-                # Get all hostel photos
-                for category_dir in self.photos_directory.iterdir():
-                    if category_dir.is_dir():
-                        for subcategory_dir in category_dir.iterdir():
-                            if subcategory_dir.is_dir():
-                                photo_paths.extend([str(p) for p in subcategory_dir.glob("*.jpg")])
-                                photo_paths.extend([str(p) for p in subcategory_dir.glob("*.png")])
-            
-            return photo_paths
+                photo_paths = []
+                for subcategory in self.photo_categories.get(category, []):
+                    photo_paths.extend(self.manifest.get(category, subcategory))
+                return photo_paths
+            # Get all hostel photos
+            return self.manifest.get()
             
         except Exception as e:
-            logger.error(f"Error getting photo paths: {str(e)}")
+            logger.error("Error getting photo paths: %s", e)
             return []
 
-    def handle_photo_query(self, question: str) -> Optional[List[str]]:
+    def handle_photo_query(self, question: str, route: Optional[Route] = None) -> Optional[List[str]]:
         """
         Handle questions related to hostel photos.
         Returns a list of relevant photo paths or None if query isn't photo-related.
         """
         try:
-            question_lower = question.lower()
-            
+            if route is None:
+                if self._router is None:
+                    self._router = IntentRouter(self.photo_categories)
+                route = self._router.route(question)
+
             # Check if the question is asking for photos
-            photo_keywords = r"(photo|picture|image|pic|show me|look|view)"
-            if not re.search(photo_keywords, question_lower):
+            if route.intent != "photo":
                 return None
                 
             # Check for specific categories
             photos_to_return = []
             
-            for category, subcategories in self.photo_categories.items():
-                if category in question_lower:
-                    # Check for specific subcategories
-                    for subcategory in subcategories:
-                        if subcategory.replace("_", " ") in question_lower:
-                            photos = self.get_photo_paths(category, subcategory)
-                            if photos:
-                                photos_to_return.extend(photos)
+            for category, subcategories in route.photo_categories:
+                # Check for specific subcategories
+                for subcategory in subcategories:
+                    photos = self.get_photo_paths(category, subcategory)
+                    if photos:
+                        photos_to_return.extend(photos)
                                 
-                    # If no specific subcategory mentioned, get all category photos
-                    if not photos_to_return:
-                        photos_to_return.extend(self.get_photo_paths(category))
+                # If no specific subcategory mentioned, get all category photos
+                if not photos_to_return:
+                    photos_to_return.extend(self.get_photo_paths(category))
                         
             # If no specific category found but asking for hostel photos
-            if not photos_to_return and re.search(r"(hostel|building|campus)", question_lower):
+            if not photos_to_return and route.whole_hostel:
                 photos_to_return.extend(self.get_photo_paths())
             
             return photos_to_return if photos_to_return else None
             
         except Exception as e:
-            logger.error(f"Error handling photo query: {str(e)}")
+            logger.error("Error handling photo query: %s", e)
             return None
 
 def test_photo_handling():
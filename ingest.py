@@ -0,0 +1,217 @@
+"""
+Incremental ingestion of data/data.txt into the vector index.
+
+Each chunk is identified by the hash of its content, so re-running ingestion
+only embeds chunks that are new or changed and only deletes vectors whose
+chunk has disappeared.
+
+    python ingest.py --backend local
+    python ingest.py --backend pinecone --index arya-index-o --namespace ns1
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+PINECONE_UPSERT_BATCH = 100
+
+
+def chunk_hash(text: str) -> str:
+    """Stable id for a chunk: SHA-1 of its whitespace-normalized text."""
+    normalized = " ".join(text.split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:20]
+
+
+def chunk_knowledge_base(data_path: str = "data/data.txt") -> List[Dict]:
+    """Split the knowledge base into one chunk per fact (non-empty line)."""
+    chunks = []
+    seen = set()
+    with open(data_path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            text = line.strip()
+            if not text:
+                continue
+            chunk_id = chunk_hash(text)
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            chunks.append({"id": chunk_id, "text": text, "line": line_no, "source": data_path})
+    return chunks
+
+
+def diff_chunks(chunks: List[Dict], indexed_ids: Set[str]) -> Tuple[List[Dict], List[str]]:
+    """Return (chunks to embed and upsert, ids to delete)."""
+    current_ids = {chunk["id"] for chunk in chunks}
+    to_add = [chunk for chunk in chunks if chunk["id"] not in indexed_ids]
+    to_delete = sorted(indexed_ids - current_ids)
+    return to_add, to_delete
+
+
+def embed_in_batches(embeddings, texts: List[str], batch_size: int = 32, workers: int = None) -> np.ndarray:
+    """
+    Embed texts in fixed-size batches spread over a thread pool.
+    The embedding model releases the GIL while encoding, so batches run on separate cores.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(batches)))
+    if workers == 1:
+        results = [embeddings.embed_documents(batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(embeddings.embed_documents, batches))
+    return np.asarray([vector for batch in results for vector in batch], dtype=np.float32)
+
+
+def load_manifest(index_dir: str) -> Dict:
+    path = Path(index_dir) / MANIFEST_FILE
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(index_dir: str, manifest: Dict):
+    path = Path(index_dir) / MANIFEST_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def sync_local_index(store, chunks: List[Dict], batch_size: int = 32, workers: int = None,
+                     dry_run: bool = False) -> Dict[str, int]:
+    """Bring a LocalVectorStore in line with chunks, embedding only what changed."""
+    to_add, to_delete = diff_chunks(chunks, set(store.ids))
+    logger.info("Local index: %d to embed, %d to delete, %d unchanged",
+                len(to_add), len(to_delete), len(chunks) - len(to_add))
+    if not dry_run:
+        if to_delete:
+            store.delete(to_delete)
+        if to_add:
+            vectors = embed_in_batches(store.embeddings, [c["text"] for c in to_add], batch_size, workers)
+            store.add_vectors(
+                store._normalize(vectors),
+                [c["text"] for c in to_add],
+                [{"source": c["source"], "line": c["line"]} for c in to_add],
+                [c["id"] for c in to_add],
+            )
+    return {"added": len(to_add), "deleted": len(to_delete), "unchanged": len(chunks) - len(to_add)}
+
+
+def _list_pinecone_ids(index, namespace: str) -> Set[str]:
+    """List vector ids in a namespace (serverless indexes only)."""
+    ids = set()
+    for page in index.list(namespace=namespace):
+        ids.update(page)
+    return ids
+
+
+def sync_pinecone_index(index, namespace: str, embeddings, chunks: List[Dict], manifest_dir: str,
+                        batch_size: int = 32, workers: int = None, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Bring a Pinecone namespace in line with chunks.
+    Indexed ids come from the local manifest, falling back to listing the namespace.
+    """
+    manifest = load_manifest(manifest_dir)
+    key = f"pinecone:{namespace}"
+    if key in manifest:
+        indexed_ids = set(manifest[key])
+    else:
+        try:
+            indexed_ids = _list_pinecone_ids(index, namespace)
+        except Exception as e:
+            logger.warning("Could not list ids in namespace %s (%s); assuming it is empty", namespace, e)
+            indexed_ids = set()
+
+    to_add, to_delete = diff_chunks(chunks, indexed_ids)
+    logger.info("Pinecone %s: %d to embed, %d to delete, %d unchanged",
+                namespace, len(to_add), len(to_delete), len(chunks) - len(to_add))
+    if not dry_run:
+        if to_add:
+            vectors = embed_in_batches(embeddings, [c["text"] for c in to_add], batch_size, workers)
+            records = [
+                {
+                    "id": chunk["id"],
+                    "values": vector.tolist(),
+                    "metadata": {"text": chunk["text"], "source": chunk["source"], "line": chunk["line"]},
+                }
+                for chunk, vector in zip(to_add, vectors)
+            ]
+            for i in range(0, len(records), PINECONE_UPSERT_BATCH):
+                index.upsert(vectors=records[i:i + PINECONE_UPSERT_BATCH], namespace=namespace)
+        if to_delete:
+            for i in range(0, len(to_delete), PINECONE_UPSERT_BATCH):
+                index.delete(ids=to_delete[i:i + PINECONE_UPSERT_BATCH], namespace=namespace)
+        manifest[key] = sorted(chunk["id"] for chunk in chunks)
+        save_manifest(manifest_dir, manifest)
+    return {"added": len(to_add), "deleted": len(to_delete), "unchanged": len(chunks) - len(to_add)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally index data/data.txt")
+    parser.add_argument("--backend", choices=["local", "pinecone"], default="local")
+    parser.add_argument("--data", default="data/data.txt")
+    parser.add_argument("--index-dir", default="data/index")
+    parser.add_argument("--index", default="arya-index-o", help="Pinecone index name")
+    parser.add_argument("--namespace", default="ns1", help="Pinecone namespace")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None, help="Embedding threads (default: CPU count)")
+    parser.add_argument("--reset", action="store_true", help="Delete everything in the namespace first")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from config import chatbot_options, load_config
+    from chatbot import AryaChatbot
+
+    config = load_config()
+    options = chatbot_options(config)
+    options.update(vector_backend=args.backend, index_dir=args.index_dir, data_path=args.data)
+    chatbot = AryaChatbot(**options)
+    embeddings = chatbot.setup_embeddings()
+    chunks = chunk_knowledge_base(args.data)
+
+    if args.backend == "local":
+        from semantic_cache import embedding_model_name
+        from local_index import LocalVectorStore, file_sha1
+        model = embedding_model_name(embeddings)
+        try:
+            store = LocalVectorStore.load(embeddings, args.index_dir)
+        except FileNotFoundError:
+            store = LocalVectorStore(embeddings, index_dir=args.index_dir)
+        if args.reset or not store.matches_model(model):
+            # Vectors from another embedding model cannot be updated incrementally
+            store = LocalVectorStore(embeddings, index_dir=args.index_dir)
+        stats = sync_local_index(store, chunks, args.batch_size, args.workers, args.dry_run)
+        if not args.dry_run:
+            store.source_sha1 = file_sha1(args.data)
+            store.embedding_model = model
+            store.save()
+    else:
+        from pinecone import Pinecone
+        pc = Pinecone(api_key=config['PINECONE_API_KEY'], environment=config['PINECONE_ENV'])
+        index = pc.Index(args.index)
+        if args.reset and not args.dry_run:
+            index.delete(delete_all=True, namespace=args.namespace)
+            manifest = load_manifest(args.index_dir)
+            manifest[f"pinecone:{args.namespace}"] = []
+            save_manifest(args.index_dir, manifest)
+        stats = sync_pinecone_index(index, args.namespace, embeddings, chunks, args.index_dir,
+                                    args.batch_size, args.workers, args.dry_run)
+
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
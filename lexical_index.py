@@ -0,0 +1,137 @@
+"""
+In-memory BM25 index over the knowledge-base chunks.
+
+Used next to the dense index: keyword lookups ("mess fee", "DD", "late fee") are
+answered from BM25 alone when the match is decisive, and otherwise BM25 and dense
+rankings are fused with reciprocal rank fusion.
+"""
+import logging
+import math
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in is it its me my of on or
+our should the their them there they this to was we what when where which who why will with
+you your
+""".split())
+
+# Constant of reciprocal rank fusion; 60 is the value from the original RRF paper
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with a plural "s" stripped so "fees" matches "fee"."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a list of texts, with postings kept in dicts.
+    The knowledge base is ~100 short lines, so a query is a few dict lookups.
+    """
+
+    def __init__(self, texts: Sequence[str], metadatas: Optional[Sequence[Dict]] = None,
+                 k1: float = 1.5, b: float = 0.75):
+        self.texts = list(texts)
+        self.metadatas = [dict(m) for m in metadatas] if metadatas else [{} for _ in self.texts]
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        for doc_id, text in enumerate(self.texts):
+            counts = Counter(tokenize(text))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((doc_id, tf))
+        n = len(self.texts)
+        self._avg_length = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        # Terms that never occur are treated as maximally rare when judging coverage
+        self._max_idf = math.log(1 + (n + 0.5) / 0.5) if n else 0.0
+
+    @classmethod
+    def from_file(cls, data_path: str = "data/data.txt", **kwargs) -> "BM25Index":
+        """Index the same chunks (and ids) that ingest.py embeds into the dense index."""
+        from ingest import chunk_knowledge_base
+
+        chunks = chunk_knowledge_base(data_path)
+        return cls(
+            [chunk["text"] for chunk in chunks],
+            [{"id": chunk["id"], "source": chunk["source"], "line": chunk["line"]} for chunk in chunks],
+            **kwargs
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """(chunk position, BM25 score) pairs for the top-k chunks, best first."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def coverage(self, query: str, doc_id: int) -> float:
+        """Share of the query's idf weight whose terms occur in the chunk (1.0 = every term matched)."""
+        terms = set(tokenize(query))
+        if not terms:
+            return 0.0
+        doc_terms = set(tokenize(self.texts[doc_id]))
+        total = sum(self._idf.get(term, self._max_idf) for term in terms)
+        matched = sum(self._idf[term] for term in terms if term in doc_terms)
+        return matched / total if total else 0.0
+
+    def decisive_hits(self, query: str, k: int = 3, min_coverage: float = 0.8, max_terms: int = 4,
+                      min_score: float = 3.0) -> Optional[List[Tuple[int, float]]]:
+        """
+        Top-k hits if the query is a short keyword lookup that the best chunk covers and
+        scores well on (generic words like "hostel" score low), else None: the caller
+        should fall back to dense or hybrid retrieval.
+        """
+        if len(set(tokenize(query))) > max_terms:
+            return None
+        hits = self.search(query, k)
+        if not hits or hits[0][1] < min_score or self.coverage(query, hits[0][0]) < min_coverage:
+            return None
+        return hits
+
+    def documents(self, hits: Sequence[Tuple[int, float]]) -> List["Document"]:
+        from langchain_core.documents import Document
+
+        return [Document(page_content=self.texts[doc_id], metadata=dict(self.metadatas[doc_id])) for doc_id, _ in hits]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 3,
+                           weights: Optional[Sequence[float]] = None) -> List[str]:
+    """Fuse several best-first rankings of keys into one, scoring each key by sum(weight / (RRF_K + rank))."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + weight / (RRF_K + rank + 1)
+    return sorted(scores, key=lambda key: -scores[key])[:k]
@@ -0,0 +1,363 @@
+"""
+Resilient client for a Hugging Face text-generation endpoint.
+
+ResilientLLM is a LangChain LLM, so it drops in where HuggingFaceEndpoint was used
+(invoke, ainvoke, stream). Over a pooled keep-alive HTTP session it adds:
+
+- a deadline per call, shared by every retry and hedge of that call; a stream only has
+  to start (send its first token) within it, and then may pause stream_gap_timeout
+  seconds between tokens
+- retries with full jitter on connection errors, timeouts and 429/5xx responses,
+  waiting for the model's estimated_time on cold-model 503s
+- optional hedging: if the first request is slower than the recent p95, a duplicate
+  is sent and whichever answers first wins; with a hedge_budget (the LLM scheduler's
+  rate budget) a duplicate is only sent when the budget has a token to spare, and the
+  losing request is not retried once the other has answered
+
+The client is blocking (requests). ainvoke() and astream() run it on a dedicated pool
+of pool_size threads rather than the event loop's default executor, so at most
+pool_size async calls are in flight and the rest wait for a thread.
+
+benchmarks/stub_llm_server.py serves the same API locally with configurable slow and
+failing responses, for testing and benchmarking without network access.
+"""
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import requests
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from pydantic import PrivateAttr
+from requests.adapters import HTTPAdapter
+
+from metrics import DEFAULT_METRICS
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class LLMRequestError(Exception):
+    """A failed generation request; retryable errors may succeed when sent again."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class LatencyTracker:
+    """Rolling window of recent successful request latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class ResilientLLM(LLM):
+    """Text generation over a pooled session with deadlines, jittered retries and optional hedging."""
+
+    endpoint_url: str
+    api_token: Optional[str] = None
+    max_new_tokens: int = 512
+    temperature: float = 0.7
+    top_k: int = 50
+    # Whole-call deadline in seconds, covering retries and hedges (for a stream: up to the first token)
+    timeout: float = 30.0
+    # Seconds a started stream may go without a token
+    stream_gap_timeout: float = 10.0
+    connect_timeout: float = 3.05
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    hedge: bool = False
+    # Used until enough latencies are recorded for a p95
+    hedge_delay: float = 2.0
+    hedge_min_samples: int = 20
+    # Called before each hedge; the hedge is skipped unless it returns True (see LLMScheduler.try_take_token)
+    hedge_budget: Optional[Callable[[], bool]] = None
+    pool_size: int = 10
+
+    _session: requests.Session = PrivateAttr()
+    _executor: ThreadPoolExecutor = PrivateAttr()
+    _async_executor: ThreadPoolExecutor = PrivateAttr()
+    _latencies: LatencyTracker = PrivateAttr()
+    _first_token_latencies: LatencyTracker = PrivateAttr()
+    _stats: Dict[str, int] = PrivateAttr()
+    _stats_lock: threading.Lock = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        if self.api_token:
+            self._session.headers["Authorization"] = f"Bearer {self.api_token}"
+        self._executor = ThreadPoolExecutor(max_workers=2 * self.pool_size, thread_name_prefix="arya-llm")
+        self._async_executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="arya-llm-async")
+        # Whole-response latencies drive hedging; streams only record their time to first token
+        self._latencies = LatencyTracker()
+        self._first_token_latencies = LatencyTracker()
+        self._stats = {"requests": 0, "retries": 0, "hedges": 0, "hedges_skipped": 0, "hedge_wins": 0,
+                       "timeouts": 0, "failures": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "resilient_hf_endpoint"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"endpoint_url": self.endpoint_url, "max_new_tokens": self.max_new_tokens,
+                "temperature": self.temperature, "top_k": self.top_k}
+
+    def _count(self, stat: str, labels: Optional[Dict[str, str]] = None):
+        with self._stats_lock:
+            self._stats[stat] += 1
+        DEFAULT_METRICS.inc(f"arya_llm_{stat}_total", labels)
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["p95_seconds"] = self._latencies.percentile(95)
+        stats["first_token_p95_seconds"] = self._first_token_latencies.percentile(95)
+        return stats
+
+    def _payload(self, prompt: str, stop: Optional[List[str]], stream: bool = False) -> Dict:
+        parameters = {
+            "max_new_tokens": self.max_new_tokens,
+            "temperature": self.temperature,
+            "top_k": self.top_k,
+            "return_full_text": False,
+        }
+        if stop:
+            parameters["stop"] = stop
+        return {"inputs": prompt, "parameters": parameters, "stream": stream}
+
+    @staticmethod
+    def _error_for(response: requests.Response) -> LLMRequestError:
+        retry_after = None
+        message = response.text[:200]
+        try:
+            body = response.json()
+            message = body.get("error", message) if isinstance(body, dict) else message
+            # Cold models answer 503 with the seconds they expect to need for loading
+            if isinstance(body, dict) and "estimated_time" in body:
+                retry_after = float(body["estimated_time"])
+        except ValueError:
+            pass
+        if response.headers.get("Retry-After", "").isdigit():
+            retry_after = float(response.headers["Retry-After"])
+        return LLMRequestError(f"LLM endpoint returned {response.status_code}: {message}",
+                               status=response.status_code,
+                               retryable=response.status_code in RETRYABLE_STATUSES,
+                               retry_after=retry_after)
+
+    def _post(self, payload: Dict, deadline: float, stream: bool = False) -> requests.Response:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMRequestError("LLM call deadline exceeded", retryable=False)
+        self._count("requests")
+        try:
+            response = self._session.post(self.endpoint_url, json=payload, stream=stream,
+                                          timeout=(min(self.connect_timeout, remaining), remaining))
+        except requests.Timeout as e:
+            self._count("timeouts")
+            raise LLMRequestError(f"LLM request timed out: {e}", retryable=True)
+        except requests.ConnectionError as e:
+            raise LLMRequestError(f"LLM connection failed: {e}", retryable=True)
+        if response.status_code != 200:
+            error = self._error_for(response)
+            response.close()
+            raise error
+        return response
+
+    def _with_retries(self, func, deadline: float, superseded: Optional[threading.Event] = None):
+        """
+        Run func(deadline), retrying retryable errors with full-jitter backoff until the deadline.
+        Stops retrying once superseded is set (the other request of a hedged pair answered).
+        """
+        attempt = 0
+        while True:
+            try:
+                return func(deadline)
+            except LLMRequestError as e:
+                if superseded is not None and superseded.is_set():
+                    raise
+                attempt += 1
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if e.retry_after is not None:
+                    delay = max(delay, min(e.retry_after, self.backoff_max))
+                if not e.retryable or attempt >= self.max_attempts or time.monotonic() + delay >= deadline:
+                    self._count("failures")
+                    raise
+                self._count("retries", {"status": str(e.status or "network")})
+                logger.warning("LLM attempt %d failed (%s), retrying in %.2fs", attempt, e, delay)
+                if superseded is None:
+                    time.sleep(delay)
+                elif superseded.wait(delay):
+                    raise
+
+    def _generate_once(self, payload: Dict, deadline: float) -> str:
+        start = time.monotonic()
+        response = self._post(payload, deadline)
+        try:
+            body = response.json()
+        except ValueError:
+            raise LLMRequestError("LLM endpoint returned invalid JSON", status=response.status_code, retryable=True)
+        self._latencies.add(time.monotonic() - start)
+        if isinstance(body, list) and body:
+            body = body[0]
+        if not isinstance(body, dict) or "generated_text" not in body:
+            raise LLMRequestError(f"Unexpected LLM response: {str(body)[:200]}")
+        return body["generated_text"]
+
+    def current_hedge_delay(self) -> float:
+        """Recent p95 latency once enough samples exist, else the configured hedge_delay."""
+        if len(self._latencies) < self.hedge_min_samples:
+            return self.hedge_delay
+        return self._latencies.percentile(95)
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        payload = self._payload(prompt, stop)
+        deadline = time.monotonic() + self.timeout
+        generate = lambda call_deadline: self._generate_once(payload, call_deadline)  # noqa: E731
+        if not self.hedge:
+            return self._with_retries(generate, deadline)
+
+        superseded = threading.Event()
+        primary = self._executor.submit(self._with_retries, generate, deadline, superseded)
+        done, _ = wait([primary], timeout=min(self.current_hedge_delay(), max(0.0, deadline - time.monotonic())))
+        if done:
+            return primary.result()
+        if self.hedge_budget is not None and not self.hedge_budget():
+            self._count("hedges_skipped")
+            done, _ = wait([primary], timeout=max(0.0, deadline - time.monotonic()))
+            if done:
+                return primary.result()
+            raise LLMRequestError("LLM call deadline exceeded")
+
+        # The first request is slower than usual: race a duplicate against it
+        self._count("hedges")
+        hedged = self._executor.submit(self._with_retries, generate, deadline, superseded)
+        pending = {primary, hedged}
+        error = None
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    try:
+                        result = future.result()
+                    except LLMRequestError as e:
+                        error = e
+                        continue
+                    if future is hedged:
+                        self._count("hedge_wins")
+                    return result
+            raise error or LLMRequestError("LLM call deadline exceeded")
+        finally:
+            # The loser finishes its current attempt but is not retried, and is dropped if not yet started
+            superseded.set()
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _set_read_timeout(response: requests.Response, seconds: float):
+        """Change how long reads of a streaming response wait; the request set it to the call deadline."""
+        sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+        if sock is not None:
+            sock.settimeout(seconds)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        """
+        Server-sent token stream; retried only until the first token, never hedged.
+        The call deadline covers the first token; after it, the stream fails only if no
+        token arrives for stream_gap_timeout seconds. Only the time to the first token is
+        recorded: later tokens arrive at the pace the caller consumes them.
+        """
+        payload = self._payload(prompt, stop, stream=True)
+        start = time.monotonic()
+        deadline = start + self.timeout
+        response = self._with_retries(lambda call_deadline: self._post(payload, call_deadline, stream=True), deadline)
+        first_token = True
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if first_token and time.monotonic() > deadline:
+                    self._count("timeouts")
+                    raise LLMRequestError("LLM call deadline exceeded before the first token")
+                if not line or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if "error" in event:
+                    raise LLMRequestError(f"LLM stream failed: {event['error']}")
+                token = event.get("token") or {}
+                if token.get("special"):
+                    continue
+                text = token.get("text", "")
+                if first_token:
+                    self._first_token_latencies.add(time.monotonic() - start)
+                    first_token = False
+                    self._set_read_timeout(response, self.stream_gap_timeout)
+                if run_manager:
+                    run_manager.on_llm_new_token(text)
+                yield GenerationChunk(text=text)
+        except requests.RequestException as e:
+            raise LLMRequestError(f"LLM stream interrupted: {e}")
+        finally:
+            response.close()
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        """ainvoke(): the blocking _call() on the async pool, so waiting callers hold no event-loop thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._async_executor, lambda: self._call(prompt, stop, **kwargs))
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        """astream(): each chunk of the blocking _stream() is read on the async pool."""
+        loop = asyncio.get_running_loop()
+        chunks = self._stream(prompt, stop, **kwargs)
+        end = object()
+        reading = None
+        try:
+            while True:
+                reading = loop.run_in_executor(self._async_executor, next, chunks, end)
+                # Shielded so a cancelled consumer does not close the stream while a thread reads it
+                chunk = await asyncio.shield(reading)
+                reading = None
+                if chunk is end:
+                    return
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            if reading is None:
+                chunks.close()
+            else:
+                reading.add_done_callback(lambda _: chunks.close())
@@ -0,0 +1,315 @@
+"""
+Admission control for LLM calls: a rate budget, a bounded priority queue and deadlines.
+
+Every generation goes through LLMScheduler.slot() (or aslot()) before it reaches the
+endpoint. A call starts when it is at the head of the queue, fewer than max_in_flight
+calls are running and the token bucket has a token; the bucket refills at `rate` calls
+per second up to `burst`, and is emptied for a while whenever the endpoint answers 429.
+
+Waiting calls are ordered by priority (interactive before batch), then by deadline.
+A call is shed with LLMShedError instead of waiting when:
+
+    queue_full  the queue already holds max_queue calls of the same or higher priority
+    evicted     it was queued, and a higher-priority call needed its place in a full queue
+    deadline    on arrival, the estimated wait plus a typical call already overshoots its deadline
+    expired     while queued, its deadline came too close for a typical call to finish
+
+so at peak load users get a fast fallback answer rather than a slow failure. A call
+that finds nothing queued ahead of it and a free slot is never shed on the estimate,
+and only calls finished in the last service_window seconds count towards it:
+otherwise an endpoint that was slow for a while would have every later call shed,
+and with nothing admitted the estimate could never come back down. Retries
+inside ResilientLLM happen within one admitted call and are not budgeted separately;
+a hedge is a second request at the same time, so it needs a token of its own
+(try_take_token()) and is skipped when the budget has none to spare.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from metrics import DEFAULT_METRICS, Metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+
+class LLMShedError(Exception):
+    """An LLM call refused by the scheduler; reason is one of the shedding rules above."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`. Not thread-safe; the scheduler locks it."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float, count: int = 1) -> float:
+        """Seconds until count tokens are available."""
+        self._refill(now)
+        if self.tokens >= count:
+            return 0.0
+        return max(0.0, self.updated - now) + (count - self.tokens) / self.rate
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return max(0.0, self.tokens)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, now: float, seconds: float):
+        """Empty the bucket and start refilling only after seconds (the endpoint said to back off)."""
+        self._refill(now)
+        self.tokens = 0.0
+        self.updated = max(self.updated, now + seconds)
+
+
+class _Ticket:
+    __slots__ = ("priority", "deadline", "seq", "enqueued", "started", "state", "reason")
+
+    def __init__(self, priority: int, deadline: float, seq: int, now: float):
+        self.priority = priority
+        self.deadline = deadline
+        self.seq = seq
+        self.enqueued = now
+        self.started = None
+        self.state = "queued"
+        self.reason = None
+
+    @property
+    def key(self) -> Tuple[int, float, int]:
+        return self.priority, self.deadline, self.seq
+
+
+class LLMScheduler:
+    """Gate for LLM calls shared by every thread (and every hostel) using one endpoint."""
+
+    def __init__(self, rate: Optional[float] = None, burst: int = 5, max_in_flight: int = 8, max_queue: int = 64,
+                 deadline: Optional[float] = 20.0, default_service_seconds: float = 2.0,
+                 service_window: float = 120.0, metrics: Optional[Metrics] = None):
+        """
+        rate is in calls per second (None: no rate budget, only max_in_flight); deadline is
+        the default seconds a call may take from arrival to its answer (None: no deadline).
+        default_service_seconds stands in for the typical call time until enough calls
+        finished in the last service_window seconds are timed.
+        """
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.default_service_seconds = default_service_seconds
+        self.service_window = service_window
+        self.metrics = metrics if metrics is not None else DEFAULT_METRICS
+        # (finished at, seconds) of recent successful calls; kept here rather than in llm_client so
+        # importing stays light
+        self.service_times = deque(maxlen=100)
+        self._cond = threading.Condition()
+        self._queue: List[_Ticket] = []
+        self._in_flight = 0
+        self._seq = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {}
+
+    def service_seconds(self) -> float:
+        """Typical duration of an admitted call: the recent median once a few calls are timed."""
+        now = time.monotonic()
+        recent = sorted(seconds for finished, seconds in self.service_times
+                        if now - finished <= self.service_window)
+        if len(recent) < 5:
+            return self.default_service_seconds
+        return recent[len(recent) // 2]
+
+    def _estimated_wait(self, ticket: _Ticket, now: float) -> float:
+        """Seconds until ticket could start, given the calls queued ahead of it."""
+        ahead = sum(1 for other in self._queue if other.key < ticket.key)
+        free = self.max_in_flight - self._in_flight
+        slots_wait = 0.0 if ahead < free else ((ahead - free) // self.max_in_flight + 1) * self.service_seconds()
+        rate_wait = self.bucket.wait_time(now, ahead + 1) if self.bucket else 0.0
+        return max(slots_wait, rate_wait)
+
+    def _shed(self, ticket: _Ticket, reason: str):
+        ticket.state = "shed"
+        ticket.reason = reason
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        self.metrics.inc("arya_llm_shed_total", {"reason": reason, "priority": self._label(ticket)})
+
+    @staticmethod
+    def _label(ticket: _Ticket) -> str:
+        return PRIORITY_NAMES.get(ticket.priority, str(ticket.priority))
+
+    def _remove(self, ticket: _Ticket):
+        self._queue.remove(ticket)
+        self._publish()
+
+    def _publish(self):
+        self.metrics.set("arya_llm_queue_depth", len(self._queue))
+        self.metrics.set("arya_llm_in_flight", self._in_flight)
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None) -> _Ticket:
+        """
+        Block until the call may start, or raise LLMShedError. deadline overrides the
+        default seconds from now; math.inf waits as long as it takes. Pair with release().
+        """
+        if deadline is None:
+            deadline = self.deadline if self.deadline is not None else math.inf
+        with self._cond:
+            now = time.monotonic()
+            self._seq += 1
+            ticket = _Ticket(priority, now + deadline, self._seq, now)
+
+            # A call that can start right away is let through whatever the estimate says
+            can_start = self._in_flight < self.max_in_flight and not any(
+                other.key < ticket.key for other in self._queue)
+            if not can_start and now + self._estimated_wait(ticket, now) + self.service_seconds() > ticket.deadline:
+                self._shed(ticket, "deadline")
+                raise LLMShedError("The LLM queue is too long to answer in time", "deadline")
+
+            if len(self._queue) >= self.max_queue:
+                worst = max(self._queue, key=lambda other: other.key)
+                if worst.priority <= priority:
+                    self._shed(ticket, "queue_full")
+                    raise LLMShedError("The LLM queue is full", "queue_full")
+                self._shed(worst, "evicted")
+                self._remove(worst)
+                self._cond.notify_all()
+
+            self._queue.append(ticket)
+            self._publish()
+            while True:
+                if ticket.state == "shed":
+                    raise LLMShedError("Dropped from the LLM queue for a higher-priority call", ticket.reason)
+                now = time.monotonic()
+                head = min(self._queue, key=lambda other: other.key)
+                timeout = math.inf
+                if head is ticket and self._in_flight < self.max_in_flight:
+                    timeout = self.bucket.wait_time(now) if self.bucket else 0.0
+                    if timeout == 0.0:
+                        return self._start(ticket, now)
+                # No point starting a call that cannot finish in time
+                latest_start = ticket.deadline - self.service_seconds()
+                if now > latest_start:
+                    self._shed(ticket, "expired")
+                    self._remove(ticket)
+                    self._cond.notify_all()
+                    raise LLMShedError("Waited too long for the LLM", "expired")
+                timeout = min(timeout, latest_start - now)
+                self._cond.wait(None if math.isinf(timeout) else timeout)
+
+    def _start(self, ticket: _Ticket, now: float) -> _Ticket:
+        if self.bucket:
+            self.bucket.take(now)
+        ticket.state = "running"
+        ticket.started = now
+        self._in_flight += 1
+        self.admitted += 1
+        self._remove(ticket)
+        labels = {"priority": self._label(ticket)}
+        self.metrics.inc("arya_llm_admitted_total", labels)
+        self.metrics.observe("arya_llm_queue_wait_seconds", now - ticket.enqueued, labels)
+        # The next call in line may be able to start too
+        self._cond.notify_all()
+        return ticket
+
+    def try_take_token(self) -> bool:
+        """Take a rate token for an extra request (a hedge) if one is free now, without queueing."""
+        with self._cond:
+            if self.bucket is None:
+                return True
+            now = time.monotonic()
+            # Calls waiting at the head of the queue come first
+            if self._queue or self.bucket.wait_time(now) > 0:
+                return False
+            self.bucket.take(now)
+            return True
+
+    def release(self, ticket: _Ticket, error: Optional[BaseException] = None,
+                service_seconds: Optional[float] = None):
+        """
+        Finish an admitted call; a 429 from the endpoint pauses the rate budget.
+        service_seconds is the time the endpoint spent on the call when that is less than the
+        time the slot was held (a stream read at the caller's pace).
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._in_flight -= 1
+            ticket.state = "done"
+            if error is None:
+                if service_seconds is None:
+                    service_seconds = now - ticket.started
+                self.service_times.append((now, service_seconds))
+            elif getattr(error, "status", None) == 429 and self.bucket:
+                pause = getattr(error, "retry_after", None) or max(1.0, 1 / self.bucket.rate)
+                self.bucket.pause(now, pause)
+                self.metrics.inc("arya_llm_rate_limited_total")
+                logger.warning("LLM endpoint is rate limiting; pausing new calls for %.1fs", pause)
+            self._publish()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None) -> Iterator[_Ticket]:
+        """Hold an admitted call for the duration of the block."""
+        ticket = self.acquire(priority, deadline)
+        error = None
+        try:
+            yield ticket
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(ticket, error)
+
+    @asynccontextmanager
+    async def aslot(self, priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None):
+        """slot() for coroutines; the wait in the queue runs in the default executor."""
+        waiter = asyncio.get_running_loop().run_in_executor(None, self.acquire, priority, deadline)
+        try:
+            ticket = await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # The executor thread keeps waiting; give back the slot it may still get
+            waiter.add_done_callback(self._release_abandoned)
+            raise
+        error = None
+        try:
+            yield ticket
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(ticket, error)
+
+    def _release_abandoned(self, waiter: "asyncio.Future"):
+        # Released as an error so the unused slot does not count as a service time
+        if not waiter.cancelled() and waiter.exception() is None:
+            self.release(waiter.result(), asyncio.CancelledError())
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "tokens": self.bucket.available(time.monotonic()) if self.bucket else None,
+                "service_seconds": self.service_seconds(),
+            }
@@ -0,0 +1,341 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from vector_codecs import CODECS, VectorCodec, make_codec
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+DOCS_FILE = "docs.json"
+CODES_FILE = "codes_{}.npz"
+
+
+def file_sha1(path: str) -> str:
+    """Return the SHA-1 of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _replace_file(path: Path, write):
+    """
+    Write a file through a temporary file in the same directory and rename it into place, so
+    readers (and memory maps of the old file) never see a partly written one.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store backed by a NumPy matrix of normalized embeddings.
+    Vectors are persisted as a .npy file and memory-mapped on load, so the
+    index needs no network access and a search is a single matrix-vector product.
+
+    With compression ("float16", "int8" or "pq", see vector_codecs.py) searches score a
+    compressed copy held in memory instead, then re-rank the best rerank * k candidates
+    against the memory-mapped full-precision rows (rerank=0 returns the approximate order).
+    """
+
+    def __init__(self, embedding: Embeddings, index_dir: str = "data/index",
+                 vectors: Optional[np.ndarray] = None, texts: Optional[List[str]] = None,
+                 metadatas: Optional[List[Dict]] = None, ids: Optional[List[str]] = None,
+                 source_sha1: Optional[str] = None, embedding_model: Optional[str] = None,
+                 compression: str = "none", rerank: int = 10):
+        self._embedding = embedding
+        self.index_dir = Path(index_dir)
+        self.texts = list(texts or [])
+        self.metadatas = list(metadatas or [{} for _ in self.texts])
+        self.ids = list(ids or [str(i) for i in range(len(self.texts))])
+        self.source_sha1 = source_sha1
+        # Identity of the model (and backend) the vectors came from; see embedding_backends.py
+        self.embedding_model = embedding_model
+        self.vectors = vectors if vectors is not None else np.zeros((0, 0), dtype=np.float32)
+        self.compression = compression
+        self.rerank = rerank
+        self._codec: Optional[VectorCodec] = None
+        self._codec_lock = threading.Lock()
+        # Whether vectors.npy in index_dir already holds self.vectors (set by load())
+        self._vectors_saved = False
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[Dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """Embed and append texts to the index (in memory until save() is called)."""
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(len(self.ids) + i) for i in range(len(texts))]
+        new_vectors = self._normalize(np.asarray(self._embedding.embed_documents(texts), dtype=np.float32))
+        self.add_vectors(new_vectors, texts, metadatas, ids)
+        return ids
+
+    def add_vectors(self, vectors: np.ndarray, texts: List[str], metadatas: List[Dict], ids: List[str]):
+        """Append already-computed vectors to the index."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.vectors.size:
+            self.vectors = np.vstack([np.asarray(self.vectors), vectors])
+        else:
+            self.vectors = vectors
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self.ids.extend(ids)
+        self._codec = None
+        self._vectors_saved = False
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Remove entries by id."""
+        if not ids:
+            return False
+        drop = set(ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in drop]
+        self.vectors = np.asarray(self.vectors)[keep] if self.vectors.size else self.vectors
+        self.texts = [self.texts[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self.ids = [self.ids[i] for i in keep]
+        self._codec = None
+        self._vectors_saved = False
+        return True
+
+    @property
+    def codec(self) -> Optional[VectorCodec]:
+        """The compressed copy for self.compression, loaded from index_dir or fitted on first use."""
+        if self.compression == "none" or not self.ids:
+            return None
+        codec = self._codec
+        if codec is None or len(codec) != len(self.ids):
+            with self._codec_lock:
+                if self._codec is None or len(self._codec) != len(self.ids):
+                    self._codec = self._load_codec() or self._fit_codec()
+                codec = self._codec
+        return codec
+
+    def _codec_path(self) -> Path:
+        return self.index_dir / CODES_FILE.format(self.compression)
+
+    def _load_codec(self) -> Optional[VectorCodec]:
+        path = self._codec_path()
+        if self.compression not in CODECS or not path.exists():
+            return None
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        # Codes are only valid for the vectors they were fitted on
+        if (str(arrays.pop("source_sha1")) != str(self.source_sha1) or int(arrays.pop("rows")) != len(self.ids)
+                or str(arrays.pop("embedding_model")) != str(self.embedding_model)):
+            return None
+        return CODECS[self.compression].from_state(arrays)
+
+    def _fit_codec(self) -> VectorCodec:
+        codec = make_codec(self.compression).fit(np.asarray(self.vectors, dtype=np.float32))
+        logger.info("Fitted %s codes for %d vectors: %.1f bytes per vector (float32: %d)",
+                    self.compression, len(self.ids), codec.nbytes / len(self.ids), 4 * self.vectors.shape[1])
+        if self.source_sha1 is not None:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            np.savez(self._codec_path(), source_sha1=str(self.source_sha1), rows=len(self.ids),
+                     embedding_model=str(self.embedding_model), **codec.state())
+        return codec
+
+    def compress(self, compression: str, rerank: int = 10) -> "LocalVectorStore":
+        """Switch to a compression mode and load (or fit) its codes now rather than on the first search."""
+        make_codec(compression)  # validates the mode
+        self.compression = compression
+        self.rerank = rerank
+        self._codec = None
+        _ = self.codec
+        return self
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Return the top-k documents by cosine similarity to the given vector."""
+        if not self.texts:
+            return []
+        return self._search(np.asarray(embedding, dtype=np.float32), k)
+
+    @staticmethod
+    def _best(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest scores, best first."""
+        k = min(k, len(scores))
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top])]
+
+    def _documents(self, indices: np.ndarray, scores: np.ndarray) -> List[Tuple[Document, float]]:
+        return [
+            (Document(page_content=self.texts[i], metadata=dict(self.metadatas[i], id=self.ids[i])), float(score))
+            for i, score in zip(indices, scores)
+        ]
+
+    def _top_k(self, scores: np.ndarray, k: int) -> List[Tuple[Document, float]]:
+        top = self._best(scores, k)
+        return self._documents(top, scores[top])
+
+    def _search(self, query: np.ndarray, k: int) -> List[Tuple[Document, float]]:
+        codec = self.codec
+        if codec is None:
+            return self._top_k(self.vectors @ query, k)
+        approx = codec.scores(query)
+        if not self.rerank:
+            return self._top_k(approx, k)
+        # Sorted, so the memory-mapped rows are read in file order
+        candidates = np.sort(self._best(approx, k * self.rerank))
+        exact = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+        top = self._best(exact, k)
+        return self._documents(candidates[top], exact[top])
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 4,
+                                     **kwargs: Any) -> List[List[Document]]:
+        """Top-k documents for several query vectors, scored with one matrix product."""
+        if not self.texts or not embeddings:
+            return [[] for _ in embeddings]
+        if self.codec is not None:
+            return [[doc for doc, _ in self._search(np.asarray(vector, dtype=np.float32), k)] for vector in embeddings]
+        scores = self.vectors @ np.asarray(embeddings, dtype=np.float32).T
+        return [[doc for doc, _ in self._top_k(scores[:, j], k)] for j in range(scores.shape[1])]
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                           **kwargs: Any) -> List[Document]:
+        # A search is a sub-millisecond in-memory product; an executor hop would cost more
+        return self.similarity_search_by_vector(embedding, k)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def _select_relevance_score_fn(self):
+        # Vectors are normalized, so the inner product already is a cosine similarity.
+        return lambda score: score
+
+    def save(self):
+        """
+        Persist vectors and documents to index_dir. The vector file is only rewritten when
+        the vectors changed since load(); self.vectors may be a memory map of it.
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        if not self._vectors_saved:
+            vectors = np.asarray(self.vectors, dtype=np.float32)
+            _replace_file(self.index_dir / VECTORS_FILE, lambda f: np.save(f, vectors))
+            self._vectors_saved = True
+        self.save_docs()
+        logger.info("Saved local index with %d vectors to %s", len(self.ids), self.index_dir)
+
+    def save_docs(self):
+        """Persist documents and index metadata only, leaving the vector file untouched."""
+        docs = json.dumps({
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "source_sha1": self.source_sha1,
+            "embedding_model": self.embedding_model,
+        }, ensure_ascii=False)
+        _replace_file(self.index_dir / DOCS_FILE, lambda f: f.write(docs.encode("utf-8")))
+
+    @classmethod
+    def load(cls, embedding: Embeddings, index_dir: str = "data/index", compression: str = "none",
+             rerank: int = 10) -> "LocalVectorStore":
+        """Load a persisted index, memory-mapping the vector matrix."""
+        index_path = Path(index_dir)
+        with open(index_path / DOCS_FILE, encoding="utf-8") as f:
+            docs = json.load(f)
+        vectors = np.load(index_path / VECTORS_FILE, mmap_mode="r")
+        store = cls(
+            embedding,
+            index_dir=index_dir,
+            vectors=vectors,
+            texts=docs["texts"],
+            metadatas=docs["metadatas"],
+            ids=docs["ids"],
+            source_sha1=docs.get("source_sha1"),
+            embedding_model=docs.get("embedding_model"),
+            compression=compression,
+            rerank=rerank,
+        )
+        store._vectors_saved = True
+        return store
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[Dict]] = None,
+                   ids: Optional[List[str]] = None, index_dir: str = "data/index",
+                   **kwargs: Any) -> "LocalVectorStore":
+        store = cls(embedding, index_dir=index_dir)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def matches_model(self, embedding_model: Optional[str]) -> bool:
+        """
+        Whether the stored vectors came from embedding_model. Indexes saved before the model
+        was recorded are checked by vector dimension, and adopted if it matches.
+        """
+        if embedding_model is None or self.embedding_model == embedding_model:
+            return True
+        if self.embedding_model is None and self.vectors.size:
+            return len(self._embedding.embed_query("dimension check")) == self.vectors.shape[1]
+        return False
+
+    @classmethod
+    def load_or_build(cls, embedding: Embeddings, data_path: str = "data/data.txt",
+                      index_dir: str = "data/index", embedding_model: Optional[str] = None,
+                      compression: str = "none", rerank: int = 10) -> "LocalVectorStore":
+        """
+        Load the persisted index, re-indexing changed chunks if it is missing or stale,
+        and every chunk if it was built with another embedding model. Compressed codes
+        are loaded (or fitted and saved) before returning.
+        """
+        from ingest import chunk_knowledge_base, sync_local_index
+
+        source_sha1 = file_sha1(data_path)
+        try:
+            store = cls.load(embedding, index_dir)
+            if not store.matches_model(embedding_model):
+                logger.info("Local index was built with %s, re-indexing everything with %s",
+                            store.embedding_model, embedding_model)
+                store = cls(embedding, index_dir=index_dir)
+            elif store.source_sha1 == source_sha1:
+                if embedding_model is not None and store.embedding_model != embedding_model:
+                    # Saved before the model was recorded; the vectors themselves are fine
+                    store.embedding_model = embedding_model
+                    store.save_docs()
+                return store.compress(compression, rerank)
+            else:
+                logger.info("Local index is stale, re-indexing changed chunks from %s", data_path)
+        except FileNotFoundError:
+            logger.info("No local index found, building from %s", data_path)
+            store = cls(embedding, index_dir=index_dir)
+
+        sync_local_index(store, chunk_knowledge_base(data_path))
+        store.source_sha1 = source_sha1
+        store.embedding_model = embedding_model or store.embedding_model
+        store.save()
+        return cls.load(embedding, index_dir).compress(compression, rerank)
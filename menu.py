@@ -1,99 +1,189 @@
 from datetime import datetime
-import pandas as pd
+import csv
 import logging
+import os
+import threading
 from typing import Dict, List, Optional
 import pytz
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+DAY_ORDER = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+# Meal words a user may ask for -> CSV column
+MEAL_COLUMNS = {
+    'breakfast': 'morning_menu',
+    'morning': 'morning_menu',
+    'lunch': 'evening_menu',
+    'dinner': 'night_menu',
+    'night': 'night_menu',
+    'dessert': 'dessert'
+}
+
+# Meal slot of the day -> (CSV column, title)
+MEAL_SLOTS = {
+    'morning': ('morning_menu', '🌅 Breakfast'),
+    'evening': ('evening_menu', '🌞 Lunch'),
+    'night': ('night_menu', '🌙 Dinner')
+}
+
+
 class MessMenu:
-    def __init__(self):
+    def __init__(self, menu_path: str = 'data/mess_menu.csv'):
         logger.debug("Initializing MessMenu")
-        # Read CSV file into DataFrame
-        self.df = pd.read_csv('data/mess_menu.csv')
+        self.menu_path = menu_path
         self.meal_times = {
             'morning': (5, 10),    # 5 AM to 10 AM
             'evening': (11, 16),   # 11 AM to 4 PM
             'night': (17, 23)      # 5 PM to 11 PM
         }
-        logger.debug(f"Loaded menu data with {len(self.df)} rows")
-    
+        self.ist = pytz.timezone('Asia/Kolkata')
+        self._mtime = None
+        self._lock = threading.Lock()
+        # Everything derived from the CSV lives in one dict that is swapped atomically on reload
+        self._compiled = {'days': {}, 'week': [], 'day_text': {}, 'meal_text': {}, 'slot_text': {}, 'week_text': None}
+        self._reload_if_changed()
+
+    def _reload_if_changed(self) -> Dict:
+        """Recompile the menu if the CSV's mtime changed since the last load."""
+        try:
+            mtime = os.stat(self.menu_path).st_mtime_ns
+        except OSError as e:
+            logger.error("Cannot stat menu file %s: %s", self.menu_path, e)
+            return self._compiled
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        self._compiled = self._compile(self.menu_path)
+                        self._mtime = mtime
+                        logger.debug("Loaded menu data with %d rows", len(self._compiled['days']))
+                    except (OSError, KeyError, csv.Error) as e:
+                        logger.error("Error loading menu from %s: %s", self.menu_path, e)
+        return self._compiled
+
+    @classmethod
+    def _compile(cls, menu_path: str) -> Dict:
+        """Read the CSV once and pre-render every response the menu can give."""
+        with open(menu_path, newline='', encoding='utf-8') as f:
+            days = {row['day_of_week']: dict(row) for row in csv.DictReader(f)}
+
+        week = [days[day] for day in DAY_ORDER if day in days]
+        day_text = {day: cls._render_day(menu) for day, menu in days.items()}
+        meal_text = {
+            (day, meal): cls._render_meal(day, meal, menu)
+            for day, menu in days.items()
+            for meal in MEAL_COLUMNS
+        }
+        slot_text = {
+            (day, slot): cls._render_slot(day, slot, menu)
+            for day, menu in days.items()
+            for slot in MEAL_SLOTS
+        }
+        week_text = cls._render_week(week) if week else None
+
+        return {
+            'days': days,
+            'week': week,
+            'day_text': day_text,
+            'meal_text': meal_text,
+            'slot_text': slot_text,
+            'week_text': week_text
+        }
+
+    @staticmethod
+    def _render_day(day_menu: Dict) -> str:
+        response = [
+            f"📅 Menu for {day_menu['day_of_week']}:",
+            f"🌅 Breakfast: {day_menu['morning_menu']}",
+            f"🌞 Lunch: {day_menu['evening_menu']}",
+            f"🌙 Dinner: {day_menu['night_menu']}"
+        ]
+        if day_menu['dessert'] != 'OFF':
+            response.append(f"🍨 Dessert: {day_menu['dessert']}")
+        return "\n".join(response)
+
+    @staticmethod
+    def _render_meal(day: str, meal: str, day_menu: Dict) -> str:
+        specific_meal = day_menu.get(MEAL_COLUMNS[meal])
+        if specific_meal and specific_meal != 'OFF':
+            return f"📅 {day}'s {meal.capitalize()}: {specific_meal}"
+        return f"Sorry, no {meal} is available for {day}."
+
+    @staticmethod
+    def _render_slot(day: str, slot: str, day_menu: Dict) -> str:
+        menu_key, meal_title = MEAL_SLOTS[slot]
+        response = [
+            f"📅 {day}'s Menu\n",
+            f"{meal_title}:",
+            f"{day_menu[menu_key]}"
+        ]
+        if day_menu['dessert'] != 'OFF' and slot in ['evening', 'night']:
+            response.append(f"\n🍨 Dessert: {day_menu['dessert']}")
+        return "\n".join(response)
+
+    @classmethod
+    def _render_week(cls, week: List[Dict]) -> str:
+        return "🗓️ Weekly Mess Menu\n\n" + "\n\n".join(cls._render_day(day_menu) for day_menu in week)
+
     def get_menu_for_day(self, day_of_week: str) -> Optional[Dict]:
         """Fetch the menu for a specific day."""
-        logger.debug(f"Fetching menu for {day_of_week}")
-        try:
-            menu = self.df[self.df['day_of_week'] == day_of_week]
-            if not menu.empty:
-                result = menu.iloc[0].to_dict()
-                logger.debug(f"Menu found for {day_of_week}: {result}")
-                return result
-            else:
-                logger.debug(f"No menu found for {day_of_week}")
-                return None
-        except Exception as e:
-            logger.error(f"Error fetching menu for {day_of_week}: {e}")
+        menu = self._reload_if_changed()['days'].get(day_of_week)
+        if menu is None:
+            logger.debug("No menu found for %s", day_of_week)
             return None
+        return dict(menu)
 
     def get_full_week_menu(self) -> Optional[List[Dict]]:
-        logger.debug("Fetching full week menu")
-        try:
-            day_order = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 
-                        'Thursday', 'Friday', 'Saturday']
-            sorted_df = self.df.set_index('day_of_week').loc[day_order].reset_index()
-            result = sorted_df.to_dict('records')
-            logger.debug(f"Retrieved {len(result)} days of menu data")
-            return result
-        except Exception as e:
-            logger.error(f"Error fetching weekly menu: {e}")
+        """Fetch the menu for every day, Sunday first."""
+        week = self._reload_if_changed()['week']
+        if len(week) != len(DAY_ORDER):
+            logger.error("Weekly menu is incomplete: %d of %d days", len(week), len(DAY_ORDER))
             return None
+        return [dict(day_menu) for day_menu in week]
+
+    def format_full_menu(self, weekly_menu: Optional[List[Dict]] = None) -> str:
+        """Format the weekly menu, reusing the pre-rendered text for the current CSV."""
+        compiled = self._reload_if_changed()
+        if weekly_menu is None or weekly_menu == compiled['week']:
+            if compiled['week_text']:
+                return compiled['week_text']
+        return self._render_week(weekly_menu or [])
+
+    def get_week_response(self) -> Optional[str]:
+        """Pre-rendered menu for the whole week, or None if the CSV is incomplete."""
+        compiled = self._reload_if_changed()
+        if len(compiled['week']) != len(DAY_ORDER):
+            return None
+        return compiled['week_text']
+
+    def get_day_response(self, day_of_week: str) -> Optional[str]:
+        """Pre-rendered full menu for a day, or None if the day is unknown."""
+        return self._reload_if_changed()['day_text'].get(day_of_week)
+
+    def get_meal_response(self, day_of_week: str, meal: str) -> Optional[str]:
+        """Pre-rendered response for one meal (breakfast, lunch, dinner, dessert, morning, night) of a day."""
+        return self._reload_if_changed()['meal_text'].get((day_of_week, meal))
 
     def get_current_menu(self) -> str:
-        logger.debug("Getting current menu")
-        ist = pytz.timezone('Asia/Kolkata')
-        current_time = datetime.now(ist)
+        current_time = datetime.now(self.ist)
         current_day = current_time.strftime('%A')
-        current_meal = self.get_current_meal_time()
-        
-        logger.debug(f"Current day: {current_day}, Current meal time: {current_meal}")
-        
-        menu_data = self.get_menu_for_day(current_day)
-        if not menu_data:
+        current_meal = self.get_current_meal_time(current_time.hour)
+
+        body = self._reload_if_changed()['slot_text'].get((current_day, current_meal))
+        if body is None:
             logger.error("Failed to retrieve menu data")
             return "Sorry, I couldn't retrieve the menu at the moment."
 
-        meal_map = {
-            'morning': ('morning_menu', '🌅 Breakfast'),
-            'evening': ('evening_menu', '🌞 Lunch'),
-            'night': ('night_menu', '🌙 Dinner')
-        }
+        return f"🕐 Current Time: {current_time.strftime('%I:%M %p')}\n{body}"
 
-        menu_key, meal_title = meal_map[current_meal]
-        
-        response = [
-            f"🕐 Current Time: {current_time.strftime('%I:%M %p')}",
-            f"📅 {current_day}'s Menu\n",
-            f"{meal_title}:",
-            f"{menu_data[menu_key]}"
-        ]
-
-        if menu_data['dessert'] != 'OFF' and current_meal in ['evening', 'night']:
-            response.append(f"\n🍨 Dessert: {menu_data['dessert']}")
+    def get_current_meal_time(self, current_hour: Optional[int] = None) -> str:
+        if current_hour is None:
+            current_hour = datetime.now(self.ist).hour
 
-        final_response = "\n".join(response)
-        logger.debug(f"Generated menu response: {final_response}")
-        return final_response
-
-    def get_current_meal_time(self) -> str:
-        ist = pytz.timezone('Asia/Kolkata')
-        current_hour = datetime.now(ist).hour
-        logger.debug(f"Current hour: {current_hour}")
-        
         for meal_type, (start_hour, end_hour) in self.meal_times.items():
             if start_hour <= current_hour <= end_hour:
-                logger.debug(f"Current meal time: {meal_type}")
                 return meal_type
-        
-        logger.debug("Outside regular meal times, defaulting to morning")
-        return 'morning'
\ No newline at end of file
+
+        return 'morning'
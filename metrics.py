@@ -0,0 +1,189 @@
+"""
+In-process counters, gauges and latency histograms for the chatbot, exported as
+Prometheus text or JSON.
+
+    with metrics.span("retrieval"):
+        docs = ...
+
+serve_metrics() exposes /metrics (Prometheus text format) and /metrics.json
+from a background thread, so the endpoint works next to Streamlit.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; wide enough for the sub-millisecond menu path and a slow LLM call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = "arya_stage_seconds"
+STAGE_ERRORS = "arya_stage_errors_total"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class _Span:
+    """Times a block into the stage histogram; counts the stage as failed if it raises."""
+
+    __slots__ = ("metrics", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.labels = {"stage": stage}
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(STAGE_SECONDS, time.perf_counter() - self.start, self.labels)
+        if exc_type is not None:
+            self.metrics.inc(STAGE_ERRORS, self.labels)
+        return False
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and fixed-bucket histograms keyed by name and labels."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        # name -> labels -> [per-bucket counts (+inf last), sum, count]
+        self._histograms: Dict[str, Dict[Labels, List]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: Optional[Dict[str, str]] = None, value: float = 1):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """Set a gauge: a current level, such as a queue depth, rather than a running total."""
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            hist[0][index] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    def span(self, stage: str) -> _Span:
+        """Context manager recording the block's duration under arya_stage_seconds{stage=...}."""
+        return _Span(self, stage)
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly copy of every series; histogram buckets are cumulative like Prometheus."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            gauges = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._gauges.items()
+            }
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = []
+                for key, (counts, total, count) in series.items():
+                    cumulative, running = [], 0
+                    for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                        running += bucket_count
+                        cumulative.append([bound if bound != float("inf") else "+Inf", running])
+                    histograms[name].append({
+                        "labels": dict(key),
+                        "count": count,
+                        "sum": total,
+                        "mean": total / count if count else 0.0,
+                        "buckets": cumulative,
+                    })
+        return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {name} counter")
+            for item in series:
+                lines.append(f"{name}{_format_labels(_label_key(item['labels']))} {item['value']}")
+        for name, series in sorted(snapshot["gauges"].items()):
+            lines.append(f"# TYPE {name} gauge")
+            for item in series:
+                lines.append(f"{name}{_format_labels(_label_key(item['labels']))} {item['value']}")
+        for name, series in sorted(snapshot["histograms"].items()):
+            lines.append(f"# TYPE {name} histogram")
+            for item in series:
+                labels = _label_key(item["labels"])
+                for bound, count in item["buckets"]:
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', str(bound)))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {item['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {item['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+# Shared by every chatbot in the process unless one is given its own registry
+DEFAULT_METRICS = Metrics()
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0", metrics: Metrics = DEFAULT_METRICS) -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus) and /metrics.json from a daemon thread; returns the server."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                body = metrics.render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/metrics.json":
+                body = json.dumps(metrics.snapshot()).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics %s - " + format, self.address_string(), *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="arya-metrics", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", host, server.server_address[1])
+    return server
@@ -0,0 +1,265 @@
+"""
+Manifest of hostel photos with pre-generated WebP thumbnails.
+
+The photo tree (hostel_photos/<category>/<subcategory>/<image>) is scanned once
+and described in a JSON manifest. Thumbnails are only regenerated for images
+whose size or mtime changed, so rebuilding after adding one photo is cheap.
+
+    python photo_manifest.py [--photos hostel_photos]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = (".jpg", ".png")
+THUMBNAIL_DIR = ".thumbnails"
+MANIFEST_FILE = "manifest.json"
+THUMBNAIL_SIZE = (480, 480)
+THUMBNAIL_QUALITY = 70
+
+
+def _scan_tree(photos_directory: Path) -> Tuple[Dict[str, Dict], Dict[str, int]]:
+    """Return (images keyed by relative path, mtime_ns of every category/subcategory dir)."""
+    images = {}
+    dir_mtimes = {}
+    for category_entry in sorted(os.scandir(photos_directory), key=lambda e: e.name):
+        if not category_entry.is_dir() or category_entry.name.startswith("."):
+            continue
+        dir_mtimes[category_entry.name] = category_entry.stat().st_mtime_ns
+        for sub_entry in sorted(os.scandir(category_entry.path), key=lambda e: e.name):
+            if not sub_entry.is_dir():
+                continue
+            rel_dir = f"{category_entry.name}/{sub_entry.name}"
+            dir_mtimes[rel_dir] = sub_entry.stat().st_mtime_ns
+            for image_entry in sorted(os.scandir(sub_entry.path), key=lambda e: e.name):
+                if not image_entry.is_file() or not image_entry.name.lower().endswith(IMAGE_SUFFIXES):
+                    continue
+                stat = image_entry.stat()
+                images[f"{rel_dir}/{image_entry.name}"] = {
+                    "category": category_entry.name,
+                    "subcategory": sub_entry.name,
+                    "path": str(Path(photos_directory) / category_entry.name / sub_entry.name / image_entry.name),
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+    return images, dir_mtimes
+
+
+def _make_thumbnail(source: str, target: Path) -> Tuple[int, int]:
+    """Write a downscaled WebP copy of source; returns the original (width, height)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as img:
+        size = img.size
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(THUMBNAIL_SIZE)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+        img.save(target, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+    return size
+
+
+def build_manifest(photos_directory: str = "hostel_photos") -> Dict:
+    """Scan the photo tree and (re)generate thumbnails for new or changed images only."""
+    photos_path = Path(photos_directory)
+    thumbs_path = photos_path / THUMBNAIL_DIR
+    thumbs_path.mkdir(parents=True, exist_ok=True)
+    manifest_path = thumbs_path / MANIFEST_FILE
+
+    previous = {}
+    if manifest_path.exists():
+        with open(manifest_path, encoding="utf-8") as f:
+            previous = json.load(f).get("images", {})
+
+    images, dir_mtimes = _scan_tree(photos_path)
+    regenerated = 0
+    for rel_path, entry in images.items():
+        old = previous.get(rel_path)
+        thumb_name = hashlib.sha1(rel_path.encode("utf-8")).hexdigest()[:16] + ".webp"
+        entry["thumbnail"] = str(thumbs_path / thumb_name)
+        if (old and old["size"] == entry["size"] and old["mtime_ns"] == entry["mtime_ns"]
+                and Path(entry["thumbnail"]).exists()):
+            entry["width"], entry["height"] = old.get("width"), old.get("height")
+            continue
+        try:
+            entry["width"], entry["height"] = _make_thumbnail(entry["path"], Path(entry["thumbnail"]))
+            regenerated += 1
+        except Exception as e:
+            logger.error("Could not create thumbnail for %s: %s", entry["path"], e)
+            entry["thumbnail"] = None
+
+    # Drop thumbnails of images that no longer exist
+    live = {Path(entry["thumbnail"]).name for entry in images.values() if entry.get("thumbnail")}
+    for thumb in thumbs_path.glob("*.webp"):
+        if thumb.name not in live:
+            thumb.unlink()
+
+    manifest = {"version": 1, "dir_mtimes": dir_mtimes, "images": images}
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+    logger.info("Photo manifest: %d images, %d thumbnails regenerated", len(images), regenerated)
+    return manifest
+
+
+class PhotoManifest:
+    """
+    Read side of the manifest: photo paths by category/subcategory and cached thumbnail bytes.
+    The manifest is rebuilt (incrementally) when a category or subcategory directory or an
+    image file (by size and mtime) changes. The rebuild runs in a background thread: until it
+    finishes, photo paths come from a fresh scan and new or changed images have no thumbnail,
+    so callers show the original.
+    """
+
+    def __init__(self, photos_directory: str = "hostel_photos", check_interval: float = 2.0):
+        self.photos_directory = Path(photos_directory)
+        self.check_interval = check_interval
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict] = None
+        self._by_group: Dict[Tuple[Optional[str], Optional[str]], List[str]] = {}
+        self._thumbnails: Dict[str, Optional[str]] = {}
+        self._thumbnail_bytes: Dict[str, bytes] = {}
+        self._build_thread: Optional[threading.Thread] = None
+        self._build_again = False
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.photos_directory / THUMBNAIL_DIR / MANIFEST_FILE
+
+    def _is_stale(self) -> bool:
+        for rel_dir, mtime_ns in self._manifest["dir_mtimes"].items():
+            try:
+                if os.stat(self.photos_directory / rel_dir).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        # A photo overwritten under the same name leaves its directory's mtime alone
+        for entry in self._manifest["images"].values():
+            try:
+                stat = os.stat(entry["path"])
+            except OSError:
+                return True
+            if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+                return True
+        try:
+            current_dirs = sum(
+                1 + sum(1 for sub in os.scandir(entry.path) if sub.is_dir())
+                for entry in os.scandir(self.photos_directory)
+                if entry.is_dir() and not entry.name.startswith(".")
+            )
+        except OSError:
+            return True
+        return current_dirs != len(self._manifest["dir_mtimes"])
+
+    def _index(self, manifest: Dict):
+        by_group: Dict[Tuple[Optional[str], Optional[str]], List[str]] = {}
+        thumbnails = {}
+        for entry in manifest["images"].values():
+            for key in ((entry["category"], entry["subcategory"]), (entry["category"], None), (None, None)):
+                by_group.setdefault(key, []).append(entry["path"])
+            thumbnails[entry["path"]] = entry.get("thumbnail")
+        self._manifest = manifest
+        self._by_group = by_group
+        self._thumbnails = thumbnails
+        self._thumbnail_bytes = {}
+
+    def refresh(self):
+        """Load the manifest; if it is missing or the tree changed, rescan and rebuild thumbnails in the background."""
+        now = time.monotonic()
+        if self._manifest is not None and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if self._manifest is None and self.manifest_path.exists():
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    self._index(json.load(f))
+            if self._manifest is None or self._is_stale():
+                images, dir_mtimes = _scan_tree(self.photos_directory)
+                # Unchanged images keep their thumbnail; the rest are served full size until the build is done
+                previous = self._manifest["images"] if self._manifest is not None else {}
+                for rel_path, entry in images.items():
+                    old = previous.get(rel_path)
+                    if old and old["size"] == entry["size"] and old["mtime_ns"] == entry["mtime_ns"]:
+                        entry["thumbnail"] = old.get("thumbnail")
+                self._index({"version": 1, "dir_mtimes": dir_mtimes, "images": images})
+                self._start_build()
+            self._last_check = now
+
+    def _start_build(self):
+        """Rebuild the manifest in a background thread (once more after it, if one is running). Holds _lock."""
+        if self._build_thread is not None:
+            self._build_again = True
+            return
+        self._build_thread = threading.Thread(target=self._build, name="photo-manifest", daemon=True)
+        self._build_thread.start()
+
+    def _build(self):
+        while True:
+            try:
+                manifest = build_manifest(str(self.photos_directory))
+            except OSError as e:
+                # e.g. a read-only deployment: keep serving paths without thumbnails
+                logger.error("Could not write photo manifest, serving without thumbnails: %s", e)
+                manifest = None
+            with self._lock:
+                if manifest is not None and not self._build_again:
+                    self._index(manifest)
+                if not self._build_again:
+                    self._build_thread = None
+                    return
+                self._build_again = False
+
+    def wait_for_build(self, timeout: Optional[float] = None) -> bool:
+        """Block until a background rebuild (if any) has finished; returns False on timeout."""
+        thread = self._build_thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def get(self, category: Optional[str] = None, subcategory: Optional[str] = None) -> List[str]:
+        """Full-size photo paths for a category/subcategory (or all photos)."""
+        self.refresh()
+        if subcategory and not category:
+            return []
+        return list(self._by_group.get((category, subcategory), []))
+
+    def thumbnail_bytes(self, photo_path: str) -> Optional[bytes]:
+        """WebP thumbnail bytes for a photo path, read from disk once and then kept in memory."""
+        data = self._thumbnail_bytes.get(photo_path)
+        if data is not None:
+            return data
+        thumbnail = self._thumbnails.get(photo_path)
+        if not thumbnail:
+            return None
+        try:
+            with open(thumbnail, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            logger.error("Could not read thumbnail %s: %s", thumbnail, e)
+            return None
+        self._thumbnail_bytes[photo_path] = data
+        return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the hostel photo manifest and thumbnails")
+    parser.add_argument("--photos", default="hostel_photos")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manifest = build_manifest(args.photos)
+    print(f"{len(manifest['images'])} images in {Path(args.photos) / THUMBNAIL_DIR / MANIFEST_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+DAYS_OF_WEEK = ['sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
+MEALS = ['breakfast', 'lunch', 'dinner', 'dessert', 'morning', 'night']
+
+CURRENT_MENU_PHRASES = [
+    "current menu", "today menu", "what's for", "what is for", "what are we eating", "mess menu", "food",
+    "today's food", "what's being served", "what is on the menu", "what are we having",
+    "what are we eating today", "what's on today's menu", "what's on the menu for today",
+    "what are we getting in the mess", "what food is in the mess", "what is for lunch",
+    "what is for dinner", "today's lunch menu", "today's dinner menu",
+]
+WEEKLY_MENU_PHRASES = ["week menu", "weekly menu"]
+PHOTO_PHRASES = ["photo", "picture", "image", "pic", "show me", "look", "view"]
+WHOLE_HOSTEL_PHRASES = ["hostel", "building", "campus"]
+
+DEFAULT_PHOTO_CATEGORIES = {
+    "rooms": ["rooms"],
+    "mess": ["dining", "kitchen", "food"],
+    "facilities": ["common_room", "washing_area", "sports", "toilet"],
+    "exterior": ["building", "entrance", "garden"]
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    """Result of routing a question: the intent plus the slots its handler needs."""
+    intent: str                                   # menu_current, menu_week, menu_day, photo or qa
+    day: Optional[str] = None                     # capitalized day name, e.g. "Monday"
+    meal: Optional[str] = None                    # one of MEALS
+    photo_categories: List[Tuple[str, List[str]]] = field(default_factory=list)
+    whole_hostel: bool = False                    # photo request naming the hostel/building/campus
+
+
+def _alternation(phrases: List[str]) -> "re.Pattern":
+    return re.compile("|".join(re.escape(phrase) for phrase in phrases))
+
+
+class IntentRouter:
+    """
+    Classifies a question as menu/day/meal/photo/QA.
+    Precedence matches the original handlers: current menu, weekly menu, a named day,
+    then photo requests; everything else goes to the QA chain.
+    """
+
+    def __init__(self, photo_categories: Optional[Dict[str, List[str]]] = None):
+        self.photo_categories = photo_categories or DEFAULT_PHOTO_CATEGORIES
+        self._current_menu = _alternation(CURRENT_MENU_PHRASES)
+        self._weekly_menu = _alternation(WEEKLY_MENU_PHRASES)
+        self._photo = _alternation(PHOTO_PHRASES)
+        self._whole_hostel = _alternation(WHOLE_HOSTEL_PHRASES)
+        # Routes without free-form slots are built once and shared
+        self._menu_current = Route("menu_current")
+        self._menu_week = Route("menu_week")
+        self._qa = Route("qa")
+
+    def route(self, question: str) -> Route:
+        """Route a question to a handler, extracting day, meal and photo category slots."""
+        question_lower = question.lower()
+
+        if self._current_menu.search(question_lower):
+            return self._menu_current
+        if self._weekly_menu.search(question_lower):
+            return self._menu_week
+
+        # When several days or meals are mentioned, the earliest in the list wins
+        day = next((day for day in DAYS_OF_WEEK if day in question_lower), None)
+        if day:
+            meal = next((meal for meal in MEALS if meal in question_lower), None)
+            return Route("menu_day", day=day.capitalize(), meal=meal)
+
+        if self._photo.search(question_lower):
+            photo_categories = [
+                (category, [sub for sub in subcategories if sub.replace("_", " ") in question_lower])
+                for category, subcategories in self.photo_categories.items()
+                if category in question_lower
+            ]
+            return Route("photo", photo_categories=photo_categories,
+                         whole_hostel=bool(self._whole_hostel.search(question_lower)))
+
+        return self._qa
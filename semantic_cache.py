@@ -0,0 +1,270 @@
+import atexit
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Canonical form of a question for cache keys: lowercase, single spaces, no trailing punctuation."""
+    return _WHITESPACE.sub(" ", text.lower()).strip().strip("?!.,;: ")
+
+
+def embedding_model_name(embeddings) -> str:
+    """Identity of an embedding model, so vectors from another model are never compared."""
+    return getattr(embeddings, "namespace", None) or getattr(embeddings, "model_name", None) or type(embeddings).__name__
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on query embeddings.
+    A lookup returns a stored answer when the cosine similarity between the new
+    query and a cached query is at or above `threshold`. Entries are evicted
+    least-recently-used once `max_entries` is reached, and expire after `ttl` seconds.
+    Entries are keyed on the normalized question, so lookup_question() finds exact
+    repeats without an embedding; entries stored without a vector are only found that way.
+    Vectors are only compared with queries from the same embedding model (see
+    bind_embeddings()); vectors of another model are dropped and their answers kept.
+    With persist_path, changes are written from a background timer at most every
+    persist_interval seconds (and at exit), never on the request path.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 500, ttl: Optional[float] = 3600,
+                 persist_path: Optional[str] = None, persist_interval: float = 5.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.persist_interval = persist_interval
+        self.hits = 0
+        self.misses = 0
+        self.embedding_model: Optional[str] = None
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        if self.persist_path:
+            if self.persist_path.exists():
+                self._load()
+            atexit.register(self.flush)
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry: Dict, now: float) -> bool:
+        return self.ttl is not None and now - entry["created"] > self.ttl
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if self._expired(entry, now)]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _drop_vectors(self, keys: List[str]):
+        """Forget the vectors of keys but keep their answers for exact repeats. Call with the lock held."""
+        for key in keys:
+            self._entries[key] = dict(self._entries[key], vector=None)
+        if keys:
+            self._matrix = None
+            self._schedule_flush()
+
+    def bind_embeddings(self, embeddings):
+        """Match by vector only with the embedding model of the chatbot; drop vectors of another model."""
+        name = embedding_model_name(embeddings)
+        with self._lock:
+            if self.embedding_model not in (None, name):
+                stale = [key for key, entry in self._entries.items() if entry["vector"] is not None]
+                logger.warning("Semantic cache was built with %s, not %s; dropping %d cached vectors",
+                               self.embedding_model, name, len(stale))
+                self._drop_vectors(stale)
+            if self.embedding_model != name:
+                self.embedding_model = name
+                self._schedule_flush()
+
+    def _rebuild_matrix(self, dim: int):
+        stale = [key for key, entry in self._entries.items()
+                 if entry["vector"] is not None and len(entry["vector"]) != dim]
+        if stale:
+            logger.warning("Dropping %d semantic cache vectors that are not %d-dimensional", len(stale), dim)
+            self._drop_vectors(stale)
+        self._keys = [key for key, entry in self._entries.items() if entry["vector"] is not None]
+        if self._keys:
+            self._matrix = np.stack([self._entries[key]["vector"] for key in self._keys])
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def lookup(self, vector) -> Optional[str]:
+        """Return the cached answer for the closest matching query, or None."""
+        query = self._normalize(vector)
+        with self._lock:
+            now = time.time()
+            self._evict_expired(now)
+            if self._matrix is None or (self._keys and self._matrix.shape[1] != len(query)):
+                self._rebuild_matrix(len(query))
+            if not self._keys:
+                self.misses += 1
+                return None
+
+            scores = self._matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = self._keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            logger.debug("Semantic cache hit (%.3f) for %r", scores[best], key)
+            return self._entries[key]["answer"]
+
+    def lookup_question(self, question: str) -> Optional[str]:
+        """Return the cached answer for the same question (after normalization), or None."""
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry, time.time()):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["answer"]
+
+    def store(self, question: str, vector, answer: str):
+        """
+        Cache an answer for a query, evicting the least recently used entry if full.
+        vector may be None for answers produced without an embedding.
+        """
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = {
+                "vector": self._normalize(vector) if vector is not None else None,
+                "answer": answer,
+                "created": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+            self._schedule_flush()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.hits = 0
+            self.misses = 0
+            self._schedule_flush()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        """Write pending changes and drop the flush timer and exit hook, which would otherwise keep this cache alive."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _schedule_flush(self):
+        """Mark the entries as changed and start the flush timer if none is pending. Call with the lock held."""
+        if not self.persist_path:
+            return
+        self._dirty = True
+        # A timer pending in a parent process does not survive fork, so check the thread, not a flag
+        if self._flush_timer is None or not self._flush_timer.is_alive():
+            self._flush_timer = threading.Timer(self.persist_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Write pending changes to persist_path now, atomically."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            # Entries are replaced rather than mutated, so a shallow copy is a consistent snapshot
+            items = list(self._entries.items())
+            embedding_model = self.embedding_model
+        vectors = [entry["vector"] for _, entry in items if entry["vector"] is not None]
+        payload = {
+            "embedding_model": embedding_model,
+            "dimension": len(vectors[0]) if vectors else None,
+            "entries": [
+                {"question": key, "vector": entry["vector"].tolist() if entry["vector"] is not None else None,
+                 "answer": entry["answer"],
+                 "created": entry["created"]}
+                for key, entry in items
+            ],
+        }
+        with self._write_lock:
+            try:
+                self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self.persist_path.parent, prefix=self.persist_path.name + ".",
+                                                suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(payload, f, ensure_ascii=False)
+                    os.replace(tmp_path, self.persist_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            except OSError as e:
+                logger.error("Could not save semantic cache to %s: %s", self.persist_path, e)
+                with self._lock:
+                    self._dirty = True
+
+    def _load(self):
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Could not load semantic cache from %s: %s", self.persist_path, e)
+            return
+        if isinstance(payload, list):
+            # Written before the model was recorded: vectors are checked against the first query
+            payload = {"embedding_model": None, "dimension": None, "entries": payload}
+        self.embedding_model = payload["embedding_model"]
+        dimension = payload["dimension"]
+        now = time.time()
+        for item in payload["entries"][-self.max_entries:]:
+            vector = item["vector"]
+            if vector is not None and dimension is not None and len(vector) != dimension:
+                vector = None
+            entry = {
+                "vector": np.asarray(vector, dtype=np.float32) if vector is not None else None,
+                "answer": item["answer"],
+                "created": item["created"],
+            }
+            if not self._expired(entry, now):
+                self._entries[normalize_question(item["question"])] = entry
+        logger.info("Loaded %d semantic cache entries from %s", len(self._entries), self.persist_path)
@@ -0,0 +1,322 @@
+"""
+Headless HTTP/JSON server around AryaChatbot.
+
+    python server.py [--host 127.0.0.1] [--port 8000] [--threads 8] [--processes 1]
+
+Endpoints:
+    POST /v1/answer    {"question": "..."}        -> {"question", "type", "text" | "photos"}
+    POST /v1/answers   {"questions": ["...", ...]} -> {"answers": [...]} in input order
+                       both take an optional "hostel" id when TENANTS_PATH is set
+    GET  /healthz      200 while the process is serving
+    GET  /readyz       200 once the QA chain is warmed up, 503 before (or if warm-up failed)
+    GET  /metrics      Prometheus text; /metrics.json for JSON
+
+Each process answers requests on a fixed pool of threads that share one chatbot,
+so the model, indexes and caches are loaded once per process. Health checks and
+metrics are answered on a separate small pool, so they do not queue behind answers
+waiting on the LLM. With --processes N the chatbot is warmed up before forking and
+the workers share the listening socket; every worker keeps its own caches and
+metrics, and only the first process writes the answer cache to SEMANTIC_CACHE_PATH
+(the others would overwrite it with their own snapshots). With TENANTS_PATH set, one
+process serves every hostel in that file (see tenancy.py); /readyz reports on the
+first (default) hostel.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from batch_answer import to_record
+from metrics import DEFAULT_METRICS
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_BATCH_QUESTIONS = 100
+# Requests answered on the probe pool, matched on the start of the request line
+PROBE_REQUESTS = (b"GET /healthz", b"GET /readyz", b"GET /metrics")
+PEEK_TIMEOUT = 5.0
+
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that hands connections to a fixed-size pool instead of a thread each."""
+
+    def __init__(self, server_address: Tuple[str, int], handler_class, threads: int = 8, probe_threads: int = 2):
+        super().__init__(server_address, handler_class)
+        # Threads start lazily on the first request, so the server can be forked before then
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="arya-http")
+        # Sorts new connections and answers health checks and metrics itself
+        self.probe_pool = ThreadPoolExecutor(max_workers=probe_threads, thread_name_prefix="arya-http-probe")
+
+    def process_request(self, request, client_address):
+        self.probe_pool.submit(self._dispatch, request, client_address)
+
+    def _dispatch(self, request, client_address):
+        """Answer a probe or metrics request here; hand anything else to the request pool."""
+        try:
+            request.settimeout(PEEK_TIMEOUT)
+            head = request.recv(max(len(probe) for probe in PROBE_REQUESTS), socket.MSG_PEEK)
+            request.settimeout(None)
+        except OSError:
+            self.shutdown_request(request)
+            return
+        if head.startswith(PROBE_REQUESTS):
+            self.process_request_thread(request, client_address)
+        else:
+            self.pool.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+        self.probe_pool.shutdown(wait=False)
+
+
+def make_handler(chatbot, max_concurrency: int = 4, tenants=None):
+    """Request handler class bound to a shared chatbot, or to a TenantRegistry serving several hostels."""
+
+    class ChatbotHandler(BaseHTTPRequestHandler):
+        server_version = "Arya/1.0"
+
+        def _send_json(self, status: int, payload: Dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_text(self, status: int, text: str, content_type: str = "text/plain; charset=utf-8"):
+            body = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> Optional[Dict]:
+            """Parsed JSON object from the request body, or None after sending a 4xx."""
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._send_json(400, {"error": "Content-Length must be a non-negative integer"})
+                return None
+            if length > MAX_BODY_BYTES:
+                self._send_json(413, {"error": f"Request body over {MAX_BODY_BYTES} bytes"})
+                return None
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": "Request body is not valid JSON"})
+                return None
+            if not isinstance(payload, dict):
+                self._send_json(400, {"error": "Request body must be a JSON object"})
+                return None
+            return payload
+
+        def _chatbot_for(self, payload: Dict):
+            """The chatbot for the request's "hostel" (default: the first one), or None after sending a 404."""
+            hostel = payload.get("hostel")
+            if tenants is None:
+                if hostel is None:
+                    return chatbot
+            elif hostel is None or isinstance(hostel, str):
+                try:
+                    return tenants.get(hostel)
+                except KeyError:
+                    pass
+            self._send_json(404, {"error": f"Unknown hostel: {hostel}"})
+            return None
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/healthz":
+                self._send_json(200, {"status": "ok"})
+            elif path == "/readyz":
+                if chatbot.is_ready:
+                    self._send_json(200, {"status": "ready"})
+                elif chatbot.warmup_error is not None:
+                    self._send_json(503, {"status": "failed", "error": str(chatbot.warmup_error)})
+                else:
+                    self._send_json(503, {"status": "warming_up"})
+            elif path == "/metrics":
+                self._send_text(200, DEFAULT_METRICS.render_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+            elif path == "/metrics.json":
+                self._send_json(200, DEFAULT_METRICS.snapshot())
+            else:
+                self._send_json(404, {"error": f"Unknown path: {path}"})
+
+        def do_POST(self):
+            path = self.path.split("?", 1)[0]
+            if path not in ("/v1/answer", "/v1/answers"):
+                self._send_json(404, {"error": f"Unknown path: {path}"})
+                return
+            payload = self._read_json()
+            if payload is None:
+                return
+            bot = self._chatbot_for(payload)
+            if bot is None:
+                return
+
+            if path == "/v1/answer":
+                question = payload.get("question")
+                if not isinstance(question, str) or not question.strip():
+                    self._send_json(400, {"error": "\"question\" must be a non-empty string"})
+                    return
+                try:
+                    response = bot.get_response(question)
+                except Exception as e:
+                    logger.error("Error answering %r: %s", question, e)
+                    self._send_json(500, {"question": question, "type": "error", "error": str(e)})
+                    return
+                self._send_json(200, to_record(question, response))
+                return
+
+            questions = payload.get("questions")
+            if (not isinstance(questions, list) or not questions
+                    or not all(isinstance(q, str) and q.strip() for q in questions)):
+                self._send_json(400, {"error": "\"questions\" must be a non-empty list of strings"})
+                return
+            if len(questions) > MAX_BATCH_QUESTIONS:
+                self._send_json(413, {"error": f"At most {MAX_BATCH_QUESTIONS} questions per request"})
+                return
+            responses = bot.get_responses(questions, max_concurrency=max_concurrency)
+            self._send_json(200, {"answers": [to_record(q, r, i) for i, (q, r) in enumerate(zip(questions, responses))]})
+
+        def log_message(self, format, *args):
+            logger.debug("%s - " + format, self.address_string(), *args)
+
+    return ChatbotHandler
+
+
+def _keep_answer_caches_in_memory(chatbot, tenants=None):
+    """In a forked worker: stop writing answer caches, so the first process's files are not overwritten."""
+    chatbot.answer_cache.persist_path = None
+    if tenants is not None:
+        factory = tenants.answer_cache_factory
+
+        def in_memory(tenant):
+            cache = factory(tenant)
+            cache.persist_path = None
+            return cache
+
+        tenants.answer_cache_factory = in_memory
+
+
+def serve(chatbot, host: str = "127.0.0.1", port: int = 8000, threads: int = 8, processes: int = 1,
+          max_concurrency: int = 4, tenants=None):
+    """Bind, optionally pre-fork, and serve until interrupted."""
+    server = PooledHTTPServer((host, port), make_handler(chatbot, max_concurrency, tenants), threads)
+    logger.info("Serving on http://%s:%d with %d threads x %d processes", host, server.server_address[1],
+                threads, processes)
+
+    children: List[int] = []
+    for _ in range(processes - 1):
+        pid = os.fork()
+        if pid == 0:
+            reconnect = getattr(chatbot.embeddings, "reconnect", None)
+            if reconnect is not None:
+                reconnect()
+            _keep_answer_caches_in_memory(chatbot, tenants)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+        server.server_close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve AryaChatbot over HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--threads", type=int, default=8, help="Request threads per process")
+    parser.add_argument("--processes", type=int, default=1, help="Pre-forked worker processes (POSIX only)")
+    parser.add_argument("--concurrency", type=int, default=4, help="LLM calls in flight per batch request")
+    parser.add_argument("--backend", choices=["local", "pinecone"], default=None,
+                        help="Vector backend (default: VECTOR_BACKEND from the config)")
+    args = parser.parse_args(argv)
+
+    from config import chatbot_options, load_config
+    from chatbot import AryaChatbot
+    from semantic_cache import SemanticCache
+    from faq_store import FAQStore
+    from tenancy import TenantRegistry, load_tenants, tenant_cache_path
+
+    config = load_config()
+    logging.basicConfig(level=config['LOG_LEVEL'].upper())
+    chatbot_kwargs = chatbot_options(config)
+    if args.backend:
+        chatbot_kwargs['vector_backend'] = args.backend
+
+    def answer_cache(persist_path):
+        return SemanticCache(
+            threshold=float(config['SEMANTIC_CACHE_THRESHOLD']),
+            max_entries=int(config['SEMANTIC_CACHE_MAX_ENTRIES']),
+            ttl=float(config['SEMANTIC_CACHE_TTL']),
+            persist_path=persist_path
+        )
+
+    tenants = None
+    if config['TENANTS_PATH']:
+        tenants = TenantRegistry(
+            load_tenants(config['TENANTS_PATH']), chatbot_kwargs,
+            memory_budget_mb=float(config['TENANT_MEMORY_MB']),
+            answer_cache_factory=lambda tenant: answer_cache(tenant_cache_path(config['SEMANTIC_CACHE_PATH'], tenant))
+        )
+        # The default hostel is loaded up front; the others on their first request
+        chatbot = tenants.get()
+        serve(chatbot, args.host, args.port, args.threads, args.processes, args.concurrency, tenants)
+        return
+
+    chatbot = AryaChatbot(
+        answer_cache=answer_cache(config['SEMANTIC_CACHE_PATH'] or None),
+        faq_store=FAQStore(config['FAQ_STORE_PATH'], threshold=float(config['FAQ_THRESHOLD']))
+        if config['FAQ_STORE_PATH'] else None,
+        **chatbot_kwargs
+    )
+
+    if args.processes > 1:
+        if not hasattr(os, "fork"):
+            sys.exit("--processes > 1 needs os.fork; use --threads instead")
+        # Threads do not survive fork, so load everything up front; the workers then share
+        # the model weights copy-on-write
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        chatbot.setup()
+        chatbot.embeddings.embed_query("warm up")
+    else:
+        # Serve health checks (and menu/photo questions) while the model loads
+        chatbot.start_warmup()
+
+    serve(chatbot, args.host, args.port, args.threads, args.processes, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
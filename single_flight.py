@@ -0,0 +1,92 @@
+"""
+Single-flight coalescing of identical concurrent work.
+
+When many users ask the same question at once, only the first request (the leader)
+computes the answer; requests for the same key that arrive while it is in flight
+(followers) wait for it and share its result or its error. Once the leader finishes
+the key is released, so later requests are served by the answer cache instead.
+"""
+import logging
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    In-flight computations keyed by string, shared across threads.
+    join/finish/fail/abandon let a leader publish a result it produces incrementally
+    (e.g. a token stream); do() wraps the common call-and-publish case.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def join(self, key: str) -> Tuple[Future, bool]:
+        """The flight for key and whether the caller leads it (and must finish, fail or abandon it)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.followers += 1
+                return flight, False
+            flight = Future()
+            self._flights[key] = flight
+            self.leaders += 1
+            return flight, True
+
+    def _release(self, key: str, flight: Future):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def finish(self, key: str, flight: Future, result: Any):
+        self._release(key, flight)
+        flight.set_result(result)
+
+    def fail(self, key: str, flight: Future, error: BaseException):
+        self._release(key, flight)
+        flight.set_exception(error)
+
+    def abandon(self, key: str, flight: Future):
+        """Give up without a result (e.g. a closed stream); waiting followers compute their own."""
+        self._release(key, flight)
+        flight.cancel()
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        (func's result, whether it was shared from another caller's flight).
+        Followers raise the leader's exception; if the leader abandons the flight they call func themselves.
+        """
+        flight, leading = self.join(key)
+        if not leading:
+            try:
+                return flight.result(), True
+            except CancelledError:
+                logger.debug("Flight for %r abandoned, computing it again", key)
+                return func(), False
+        try:
+            result = func()
+        except Exception as e:
+            self.fail(key, flight, e)
+            raise
+        except BaseException:
+            self.abandon(key, flight)
+            raise
+        self.finish(key, flight, result)
+        return result, False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = len(self._flights)
+        total = self.leaders + self.followers
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "in_flight": in_flight,
+            "coalesced_rate": self.followers / total if total else 0.0,
+        }
@@ -1,11 +1,21 @@
 import streamlit as st
 import warnings
-from config import load_config
+from config import chatbot_options, load_config
 from chatbot import AryaChatbot
+from faq_store import FAQStore
+from semantic_cache import SemanticCache
+from tenancy import TenantRegistry, load_tenants, tenant_cache_path
+from metrics import DEFAULT_METRICS, serve_metrics
 import gc
-import functools
-from PIL import Image
+import itertools
+import logging
 import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Exchanges shown under the input form
+RECENT_EXCHANGES = 5
 
 # Cache decorators remain the same
 @st.cache_data
@@ -13,29 +23,62 @@ def cached_load_config():
     """Cache configuration loading to reduce disk reads."""
     return load_config()
 
+@st.cache_resource
+def setup_observability(log_level, metrics_port):
+    """Configure logging and start the metrics endpoint once per process."""
+    logging.basicConfig(level=log_level.upper())
+    if metrics_port:
+        try:
+            return serve_metrics(int(metrics_port))
+        except OSError as e:
+            logger.error("Could not start metrics endpoint on port %s: %s", metrics_port, e)
+    return None
+
+def answer_cache(config, persist_path):
+    return SemanticCache(
+        threshold=float(config['SEMANTIC_CACHE_THRESHOLD']),
+        max_entries=int(config['SEMANTIC_CACHE_MAX_ENTRIES']),
+        ttl=float(config['SEMANTIC_CACHE_TTL']),
+        persist_path=persist_path
+    )
+
+@st.cache_resource
+def initialize_tenants(config):
+    """One registry per process; each hostel's chatbot is loaded on its first visit."""
+    return TenantRegistry(
+        load_tenants(config['TENANTS_PATH']), chatbot_options(config),
+        memory_budget_mb=float(config['TENANT_MEMORY_MB']),
+        answer_cache_factory=lambda tenant: answer_cache(config, tenant_cache_path(config['SEMANTIC_CACHE_PATH'], tenant))
+    )
+
+def tenant_chatbot(config, hostel):
+    """The chatbot for ?hostel= (default: the first hostel in TENANTS_PATH)."""
+    try:
+        return initialize_tenants(config).get(hostel)
+    except KeyError:
+        st.error(f"Unknown hostel: {hostel}")
+    except Exception as e:
+        st.error(f"Failed to initialize chatbot: {str(e)}")
+    return None
+
 @st.cache_resource
 def initialize_chatbot(config):
     """Initialize and cache the chatbot instance."""
     try:
         chatbot = AryaChatbot(
-            pinecone_api_key=config['PINECONE_API_KEY'],
-            pinecone_env=config['PINECONE_ENV'],
-            huggingface_api=config['HUGGING_FACE_API']
+            answer_cache=answer_cache(config, config['SEMANTIC_CACHE_PATH'] or None),
+            faq_store=FAQStore(config['FAQ_STORE_PATH'], threshold=float(config['FAQ_THRESHOLD']))
+            if config['FAQ_STORE_PATH'] else None,
+            **chatbot_options(config)
         )
-        chatbot.setup()
+        # Load the embedding model and chains in the background so the page renders
+        # immediately; menu and photo questions work before warm-up finishes
+        chatbot.start_warmup()
         return chatbot
     except Exception as e:
         st.error(f"Failed to initialize chatbot: {str(e)}")
         return None
 
-@st.cache_data(max_entries=100, ttl=3600)
-def get_cached_response(question: str) -> str:
-    """Cache chatbot responses to reduce API calls and computation."""
-    chatbot = st.session_state.chatbot
-    if chatbot is None:
-        raise ValueError("Chatbot not initialized")
-    return chatbot.get_response(question)
-
 def init_session_state():
     """Initialize all session state variables."""
     if "chatbot" not in st.session_state:
@@ -44,11 +87,14 @@ def init_session_state():
         st.session_state.chat_history = []
     if "user_input" not in st.session_state:
         st.session_state.user_input = ""
+    if "pending_question" not in st.session_state:
+        st.session_state.pending_question = None
+    if "history_rendered_id" not in st.session_state:
+        st.session_state.history_rendered_id = 0
 
 def clear_chat_history():
     """Clear chat history and session state."""
     st.session_state.chat_history = []
-    get_cached_response.clear()
     gc.collect()
 
 def manage_chat_history(history, max_length=50):
@@ -57,46 +103,129 @@ def manage_chat_history(history, max_length=50):
         history = history[-max_length:]
     return history
 
-def display_images(photo_paths):
-    """Display images in a grid layout."""
+def image_source(path, photo_system, full_size):
+    """Thumbnail bytes (kept in memory by the photo manifest), or full-size bytes from the cache."""
+    if not full_size:
+        thumbnail = photo_system.manifest.thumbnail_bytes(path)
+        if thumbnail is not None:
+            return thumbnail
+    try:
+        return load_image_bytes(path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return path
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_image_bytes(path, mtime_ns):
+    """Full-size image bytes, read once per file version and shared by all sessions."""
+    with open(path, "rb") as f:
+        return f.read()
+
+@st.fragment
+def display_images(photo_paths, photo_system, key):
+    """Display thumbnails in a grid layout; full-size images are loaded only on request."""
     try:
+        # A fragment, so flipping the toggle reruns only this grid
+        show_full_size = st.toggle("Show full-size images", key=f"full_size_{key}")
         cols = st.columns(min(3, len(photo_paths)))
         for idx, path in enumerate(photo_paths):
-            if os.path.exists(path):
-                try:
-                    with Image.open(path) as img:
-                        cols[idx % 3].image(img, caption=f"Image {idx + 1}", use_column_width=True)
-                except Exception as e:
-                    cols[idx % 3].error(f"Error loading image: {str(e)}")
-            else:
-                cols[idx % 3].error(f"Image not found: {path}")
+            try:
+                cols[idx % 3].image(image_source(path, photo_system, show_full_size),
+                                    caption=f"Image {idx + 1}", width="stretch")
+            except Exception as e:
+                cols[idx % 3].error(f"Error loading image: {str(e)}")
     except Exception as e:
         st.error(f"Error displaying images: {str(e)}")
 
+def exchange_markdown(question, response):
+    """Markdown for one exchange, built once when it is added to the history."""
+    return f"**You:** {question}\n\n**ARYA:** {response}"
+
+def render_exchange(chat):
+    """Render one finished exchange from its stored markdown."""
+    with st.container():
+        st.markdown(chat['markdown'])
+        if 'photos' in chat and st.session_state.chatbot is not None:
+            display_images(chat['photos'], st.session_state.chatbot.photo_system, chat['id'])
+        st.markdown("---")
+
 def handle_input():
     """Handle the submission of user input."""
     if st.session_state.user_input.strip():
-        user_question = st.session_state.user_input
-        try:
-            with st.spinner('Processing your question...'):
-                response = get_cached_response(user_question)
-                result = {'question': user_question}
-                
-                if isinstance(response, dict) and "photos" in response:
-                    result['response'] = "Here are the photos you requested:"
-                    result['photos'] = response["photos"]
-                else:
-                    result['response'] = response if isinstance(response, str) else response.get("text", "I'm not sure how to respond to that.")
-                
-                st.session_state.chat_history.append(result)
-                st.session_state.chat_history = manage_chat_history(st.session_state.chat_history)
-                
-        except Exception as e:
-            st.error(f"Error processing your question: {str(e)}")
+        # The answer is streamed from the chat view so it renders in place, below the form
+        st.session_state.pending_question = st.session_state.user_input
     
     st.session_state.user_input = ""
 
+def stream_pending_answer():
+    """Stream the answer to the pending question, then record it in the chat history."""
+    user_question = st.session_state.pending_question
+    st.session_state.pending_question = None
+    chatbot = st.session_state.chatbot
+    placeholder = st.empty()
+    try:
+        if chatbot is None:
+            raise ValueError("Chatbot not initialized")
+
+        result = {'id': time.time_ns(), 'question': user_question}
+        with placeholder.container():
+            st.write(f"**You:** {user_question}")
+            stream = chatbot.stream_response(user_question)
+            start = time.perf_counter()
+            with st.spinner('Processing your question...'):
+                first = next(stream, "")
+            logger.info("Time to first token: %.3fs", time.perf_counter() - start)
+
+            if isinstance(first, dict) and "photos" in first:
+                result['response'] = "Here are the photos you requested:"
+                result['photos'] = first["photos"]
+            else:
+                st.write("**ARYA:**")
+                text = st.write_stream(itertools.chain([first], stream))
+                result['response'] = text or "I'm not sure how to respond to that."
+
+        result['markdown'] = exchange_markdown(user_question, result['response'])
+        st.session_state.chat_history.append(result)
+        st.session_state.chat_history = manage_chat_history(st.session_state.chat_history)
+
+    except Exception as e:
+        st.error(f"Error processing your question: {str(e)}")
+    finally:
+        # The finished exchange is rendered with the other new exchanges
+        placeholder.empty()
+
+def record_render_time(view, start):
+    elapsed = time.perf_counter() - start
+    DEFAULT_METRICS.observe("arya_render_seconds", elapsed, {"view": view})
+    logger.debug("Rendered %s in %.1f ms", view, elapsed * 1000)
+
+@st.fragment
+def chat_view():
+    """
+    The input form and the exchanges added since the last full-page run.
+    Submitting the form reruns only this fragment: the header, footer and the history
+    rendered by the last full run stay on the page untouched.
+    """
+    start = time.perf_counter()
+    with st.form(key='chat_form', clear_on_submit=True):
+        st.text_input(
+            "Your Question:",
+            key="user_input"
+        )
+        st.form_submit_button("Send", on_click=handle_input)
+
+    if st.session_state.pending_question:
+        stream_pending_answer()
+
+    rendered_id = st.session_state.history_rendered_id
+    new_chats = [chat for chat in st.session_state.chat_history if chat['id'] > rendered_id]
+    if st.session_state.chat_history:
+        st.write("### Recent Conversations")
+    for chat in reversed(new_chats[-RECENT_EXCHANGES:]):
+        render_exchange(chat)
+    record_render_time("chat", start)
+
 def main():
+    start = time.perf_counter()
     try:
         # Initialize session state first
         init_session_state()
@@ -113,41 +242,46 @@ def main():
         
         # Load cached config
         config = cached_load_config()
+        setup_observability(config['LOG_LEVEL'], config['METRICS_PORT'])
         
         # Initialize chatbot if not already done
-        if st.session_state.chatbot is None:
+        if config['TENANTS_PATH']:
+            # Looked up on every run, so a hostel evicted since the last run is loaded again
+            st.session_state.chatbot = tenant_chatbot(config, st.query_params.get("hostel"))
+        elif st.session_state.chatbot is None:
             st.session_state.chatbot = initialize_chatbot(config)
         
         st.title("🏢 ARYA - Hostel AI Chatbot")
-        st.markdown("""
-        Welcome to the Arya Bhatt Hostel chatbot! I'm here to help you with any questions about the hostel.
+        chatbot = st.session_state.chatbot
+        hostel_name = chatbot.hostel_name if chatbot is not None else "Arya Bhatt Hostel"
+        st.markdown(f"""
+        Welcome to the {hostel_name} chatbot! I'm here to help you with any questions about the hostel.
         Feel free to ask about facilities, rules, or any other hostel-related matters.
         """)
         
+        if chatbot is not None and not chatbot.is_ready:
+            if chatbot.warmup_error is not None:
+                st.error(f"Failed to initialize chatbot: {str(chatbot.warmup_error)}")
+            else:
+                st.info("ARYA is still loading its knowledge base. Menu and photo questions work right away.")
+        
         # Add clear chat button
         if st.button("Clear Chat History"):
             clear_chat_history()
         
-        # Create input form
-        with st.form(key='chat_form', clear_on_submit=True):
-            user_input = st.text_input(
-                "Your Question:",
-                key="user_input"
-            )
-            submit_button = st.form_submit_button("Send", on_click=handle_input)
+        # A full run renders the existing history below the chat view; exchanges added
+        # after this point are rendered by the chat fragment alone
+        history = st.session_state.chat_history
+        rendered_id = history[-1]['id'] if history else 0
+        st.session_state.history_rendered_id = rendered_id
+        chat_view()
         
-        # Display chat history
-        if st.session_state.chat_history:
-            st.write("### Recent Conversations")
-            for chat in reversed(st.session_state.chat_history[-5:]):
-                with st.container():
-                    st.write(f"**You:** {chat['question']}")
-                    st.write(f"**ARYA:** {chat['response']}")
-                    
-                    if 'photos' in chat:
-                        display_images(chat['photos'])
-                    
-                    st.markdown("---")
+        # Display chat history, after any exchange the chat view just added
+        history = st.session_state.chat_history
+        older = [chat for chat in history if chat['id'] <= rendered_id]
+        older_count = max(0, RECENT_EXCHANGES - (len(history) - len(older)))
+        for chat in reversed(older[-older_count:] if older_count else []):
+            render_exchange(chat)
         
         # Footer
         st.markdown("""
@@ -159,9 +293,8 @@ def main():
     except Exception as e:
         st.error(f"Application Error: {str(e)}")
         st.info("Please contact the administrator for assistance.")
-        
     finally:
-        gc.collect()
+        record_render_time("page", start)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
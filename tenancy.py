@@ -0,0 +1,288 @@
+"""
+Several hostels served from one process.
+
+Every hostel (tenant) gets its own AryaChatbot with its own index, menu, photo
+manifest, answer cache and FAQ store, but all of them share one embedding model,
+one query-embedding cache and one LLM client (and, on Pinecone, one index handle,
+with a namespace per hostel). Tenants are loaded on their first request and the
+least recently used ones are dropped once their estimated memory exceeds the budget.
+
+The tenants file is JSON, a list of objects with an "id" and optional overrides:
+
+    [{"id": "arya", "name": "Arya Bhatt Hostel", "data_path": "data/data.txt",
+      "index_dir": "data/index", "menu_path": "data/mess_menu.csv",
+      "photos_directory": "hostel_photos", "pinecone_namespace": "ns1"},
+     {"id": "raman", "name": "C. V. Raman Hostel"}]
+
+Paths left out default to tenants/<id>/ (data.txt, index/, mess_menu.csv, photos/).
+
+    python tenancy.py tenants.json    # list tenants and their resolved paths
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from types import FunctionType, MethodType, ModuleType
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from chatbot import AryaChatbot
+from metrics import DEFAULT_METRICS
+from semantic_cache import SemanticCache
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Tenant:
+    """One hostel and where its data lives."""
+    id: str
+    name: str = ""
+    data_path: str = ""
+    index_dir: str = ""
+    menu_path: str = ""
+    photos_directory: str = ""
+    pinecone_namespace: str = ""
+    faq_store_path: str = ""   # empty: no FAQ store
+
+    def __post_init__(self):
+        base = os.path.join("tenants", self.id)
+        self.name = self.name or self.id
+        self.data_path = self.data_path or os.path.join(base, "data.txt")
+        self.index_dir = self.index_dir or os.path.join(base, "index")
+        self.menu_path = self.menu_path or os.path.join(base, "mess_menu.csv")
+        self.photos_directory = self.photos_directory or os.path.join(base, "photos")
+        self.pinecone_namespace = self.pinecone_namespace or self.id
+
+
+def load_tenants(path: str) -> List[Tenant]:
+    """Tenants from a JSON list; unknown keys are an error so typos do not go unnoticed."""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise Exception(f"{path} must hold a non-empty JSON list of tenants")
+    known = {field.name for field in fields(Tenant)}
+    tenants = []
+    for entry in entries:
+        unknown = set(entry) - known
+        if unknown:
+            raise Exception(f"Unknown tenant keys in {path}: {', '.join(sorted(unknown))}")
+        tenants.append(Tenant(**entry))
+    ids = [tenant.id for tenant in tenants]
+    if len(set(ids)) != len(ids):
+        raise Exception(f"Duplicate tenant ids in {path}")
+    return tenants
+
+
+def tenant_cache_path(path: Optional[str], tenant: Tenant) -> Optional[str]:
+    """Per-tenant variant of a cache file path (answers.json -> answers.<id>.json); None stays None."""
+    if not path:
+        return None
+    root, ext = os.path.splitext(path)
+    return f"{root}.{tenant.id}{ext}"
+
+
+def deep_sizeof(obj, exclude: Set[int]) -> int:
+    """
+    Approximate bytes reachable from obj, not counting objects whose id is in exclude
+    (the shared model and client) or anything reachable only through them.
+    Modules, classes and functions are shared by every tenant and are skipped.
+    """
+    seen = set(exclude)
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, (type, ModuleType, FunctionType, MethodType)):
+            continue
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            total += sys.getsizeof(item) + (item.nbytes if item.base is None else 0)
+            if item.base is not None:
+                stack.append(item.base)
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, (str, bytes, bytearray, int, float, bool)) or item is None:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            state = getattr(item, "__dict__", None)
+            if state is not None:
+                stack.append(state)
+            for slot in getattr(type(item), "__slots__", ()):
+                if isinstance(slot, str) and hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+class TenantRegistry:
+    """Lazily loaded per-hostel chatbots sharing one embedding model and LLM client."""
+
+    def __init__(self, tenants: List[Tenant], chatbot_kwargs: Dict, memory_budget_mb: float = 256.0,
+                 answer_cache_factory: Optional[Callable[[Tenant], SemanticCache]] = None,
+                 chatbot_class=AryaChatbot, metrics=None):
+        if not tenants:
+            raise Exception("TenantRegistry needs at least one tenant")
+        self.tenants: Dict[str, Tenant] = {tenant.id: tenant for tenant in tenants}
+        self.default_id = tenants[0].id
+        self.chatbot_kwargs = dict(chatbot_kwargs)
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.answer_cache_factory = answer_cache_factory or (lambda tenant: SemanticCache())
+        self.chatbot_class = chatbot_class
+        self.metrics = metrics if metrics is not None else DEFAULT_METRICS
+        self.loads = 0
+        self.evictions = 0
+        self._shared: Dict = {}
+        self._shared_lock = threading.Lock()
+        self._loaded: "OrderedDict[str, AryaChatbot]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._loading = SingleFlight()
+
+    def shared_resources(self) -> Dict:
+        """The embedding model (with its query cache), LLM client and LLM scheduler, built on first use."""
+        with self._shared_lock:
+            if not self._shared:
+                builder = self.chatbot_class(**self.chatbot_kwargs)
+                start = time.perf_counter()
+                self._shared["embeddings"] = builder.setup_embedding_cache(builder.setup_embeddings())
+                self._shared["llm"] = builder.setup_llm()
+                # One endpoint, so one rate budget and queue for every hostel
+                self._shared["llm_scheduler"] = builder.llm_scheduler
+                logger.info("Loaded shared embedding model and LLM client in %.2fs", time.perf_counter() - start)
+            return dict(self._shared)
+
+    def _shared_ids(self) -> Set[int]:
+        return {id(value) for value in self._shared.values()} | {id(self.metrics)}
+
+    def get(self, tenant_id: Optional[str] = None) -> AryaChatbot:
+        """The ready chatbot for tenant_id (default: the first tenant), loading it if needed."""
+        tenant_id = tenant_id or self.default_id
+        if tenant_id not in self.tenants:
+            raise KeyError(tenant_id)
+        with self._lock:
+            chatbot = self._loaded.get(tenant_id)
+            if chatbot is not None:
+                self._loaded.move_to_end(tenant_id)
+                return chatbot
+        # Concurrent first requests for the same hostel load it once
+        chatbot, _ = self._loading.do(tenant_id, lambda: self._load_once(tenant_id))
+        return chatbot
+
+    def _load_once(self, tenant_id: str) -> AryaChatbot:
+        # A load that finished between get()'s check and this flight has already stored the tenant
+        with self._lock:
+            chatbot = self._loaded.get(tenant_id)
+            if chatbot is not None:
+                self._loaded.move_to_end(tenant_id)
+                return chatbot
+        return self._load(self.tenants[tenant_id])
+
+    def _load(self, tenant: Tenant) -> AryaChatbot:
+        start = time.perf_counter()
+        shared = self.shared_resources()
+        kwargs = dict(self.chatbot_kwargs)
+        kwargs.update(
+            shared,
+            hostel_name=tenant.name,
+            data_path=tenant.data_path,
+            index_dir=tenant.index_dir,
+            menu_path=tenant.menu_path,
+            photos_directory=tenant.photos_directory,
+            pinecone_namespace=tenant.pinecone_namespace,
+            answer_cache=self.answer_cache_factory(tenant),
+            faq_store=None,
+        )
+        if tenant.faq_store_path:
+            from faq_store import FAQStore
+            kwargs["faq_store"] = FAQStore(tenant.faq_store_path, data_path=tenant.data_path)
+        chatbot = self.chatbot_class(**kwargs)
+        chatbot.setup()
+        if chatbot.pinecone_index is not None:
+            # One index handle serves every namespace
+            with self._shared_lock:
+                self._shared.setdefault("pinecone_index", chatbot.pinecone_index)
+
+        size = deep_sizeof(chatbot, self._shared_ids())
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._loaded[tenant.id] = chatbot
+            self._sizes[tenant.id] = size
+            self.loads += 1
+            evicted = self._evict_over_budget()
+        self.metrics.inc("arya_tenant_loads_total", {"tenant": tenant.id})
+        self.metrics.observe("arya_tenant_load_seconds", elapsed)
+        logger.info("Loaded tenant %s in %.2fs (~%.1f MB)", tenant.id, elapsed, size / 1024 / 1024)
+        for tenant_id, evicted_chatbot in evicted:
+            self._release(evicted_chatbot)
+            self.metrics.inc("arya_tenant_evictions_total", {"tenant": tenant_id})
+            logger.info("Evicted idle tenant %s", tenant_id)
+        return chatbot
+
+    def _evict_over_budget(self) -> List[Tuple[str, AryaChatbot]]:
+        """Drop least recently used tenants until the rest fit; the newest one always stays. Holds _lock."""
+        evicted = []
+        while len(self._loaded) > 1 and sum(self._sizes.values()) > self.memory_budget:
+            tenant_id, chatbot = self._loaded.popitem(last=False)
+            del self._sizes[tenant_id]
+            self.evictions += 1
+            evicted.append((tenant_id, chatbot))
+        return evicted
+
+    @staticmethod
+    def _release(chatbot: AryaChatbot):
+        """Save an evicted tenant's answer cache and drop its exit hook, so the memory is actually freed."""
+        chatbot.answer_cache.close()
+
+    def evict(self, tenant_id: str) -> bool:
+        """Drop a loaded tenant (e.g. after its data changed); it is reloaded on its next request."""
+        with self._lock:
+            chatbot = self._loaded.pop(tenant_id, None)
+            if chatbot is None:
+                return False
+            del self._sizes[tenant_id]
+            self.evictions += 1
+        self._release(chatbot)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sizes = dict(self._sizes)
+        return {
+            "tenants": len(self.tenants),
+            "loaded": list(sizes),
+            "loaded_mb": {tenant_id: size / 1024 / 1024 for tenant_id, size in sizes.items()},
+            "total_mb": sum(sizes.values()) / 1024 / 1024,
+            "budget_mb": self.memory_budget / 1024 / 1024,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="List the tenants in a tenants file")
+    parser.add_argument("tenants_path")
+    args = parser.parse_args(argv)
+    for tenant in load_tenants(args.tenants_path):
+        missing = [path for path in (tenant.data_path, tenant.menu_path, tenant.photos_directory)
+                   if not os.path.exists(path)]
+        print(f"{tenant.id}: {tenant.name}")
+        print(f"    data {tenant.data_path}, index {tenant.index_dir}, menu {tenant.menu_path}")
+        print(f"    photos {tenant.photos_directory}, namespace {tenant.pinecone_namespace}")
+        if missing:
+            print(f"    missing: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# The modules live at the repository root, as for the benchmarks; benchmarks/stubs.py
+# provides the stand-in embeddings, LLM and chatbot
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+sys.path.insert(0, ROOT_DIR)
@@ -0,0 +1,51 @@
+import pytest
+
+import config
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    monkeypatch.setattr(config, "load_dotenv", lambda: None)
+    monkeypatch.setenv("HUGGING_FACE_API", "token")
+    monkeypatch.setenv("VECTOR_BACKEND", "local")
+    return monkeypatch
+
+
+def test_get_setting_tells_unset_from_empty(monkeypatch):
+    monkeypatch.delenv("ARYA_TEST_SETTING", raising=False)
+    assert config._get_setting("ARYA_TEST_SETTING") is None
+    monkeypatch.setenv("ARYA_TEST_SETTING", "")
+    assert config._get_setting("ARYA_TEST_SETTING") == ""
+    monkeypatch.setenv("ARYA_TEST_SETTING", "0")
+    assert config._get_setting("ARYA_TEST_SETTING") == "0"
+
+
+def test_unset_settings_use_their_default(environment):
+    environment.delenv("FAQ_STORE_PATH", raising=False)
+    assert config.load_config()['FAQ_STORE_PATH'] == 'data/faq_store.json'
+
+
+def test_empty_setting_disables_the_faq_store(environment):
+    environment.setenv("FAQ_STORE_PATH", "")
+    assert config.load_config()['FAQ_STORE_PATH'] == ''
+
+
+def test_zero_is_not_replaced_by_the_default(environment):
+    environment.setenv("VECTOR_RERANK", "0")
+    assert config.chatbot_options(config.load_config())['vector_rerank'] == 0
+
+
+def test_empty_required_setting_is_missing(environment):
+    environment.setenv("HUGGING_FACE_API", "")
+    with pytest.raises(EnvironmentError):
+        config.load_config()
+
+
+def test_empty_embedding_cache_path_keeps_vectors_in_memory(environment):
+    environment.setenv("EMBEDDING_CACHE_PATH", "")
+    assert config.chatbot_options(config.load_config())['embedding_cache_path'] is None
+
+
+def test_empty_llm_deadline_means_no_deadline(environment):
+    environment.setenv("LLM_DEADLINE", "")
+    assert config.chatbot_options(config.load_config())['llm_deadline'] is None
@@ -0,0 +1,23 @@
+import math
+import os
+
+from faq_store import FAQStore, build_faq
+from llm_scheduler import PRIORITY_BATCH
+from stubs import StubChatbot
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def test_build_faq_generates_at_batch_priority_without_a_deadline(tmp_path):
+    data_path = os.path.join(ROOT_DIR, "data", "data.txt")
+    chatbot = StubChatbot(data_path=data_path, index_dir=str(tmp_path / "index"), faq_store=None)
+    acquired = []
+    acquire = chatbot.llm_scheduler.acquire
+    chatbot.llm_scheduler.acquire = lambda priority, deadline: acquired.append((priority, deadline)) or acquire(
+        priority, deadline)
+    store = FAQStore(str(tmp_path / "faq.json"), data_path=data_path)
+
+    stats = build_faq(chatbot, ["What is the mess timing?", "Where is the gym?"], store)
+
+    assert stats["generated"] == 2
+    assert acquired == [(PRIORITY_BATCH, math.inf)] * 2
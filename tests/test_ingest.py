@@ -0,0 +1,51 @@
+from ingest import chunk_hash, chunk_knowledge_base, diff_chunks, sync_local_index
+from local_index import LocalVectorStore
+from stubs import StubEmbeddings
+
+
+def write_data(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return chunk_knowledge_base(str(path))
+
+
+def test_chunks_are_identified_by_their_normalized_text(tmp_path):
+    chunks = write_data(tmp_path / "data.txt", ["Mess opens at 7.", "", "Mess  opens at 7. ", "Gym closes at 10."])
+
+    assert [chunk["text"] for chunk in chunks] == ["Mess opens at 7.", "Gym closes at 10."]
+    assert chunks[0]["id"] == chunk_hash("Mess   opens at 7.")
+
+
+def test_diff_chunks_adds_new_and_deletes_missing_ids(tmp_path):
+    chunks = write_data(tmp_path / "data.txt", ["kept", "new"])
+
+    to_add, to_delete = diff_chunks(chunks, {chunk_hash("kept"), chunk_hash("gone")})
+
+    assert [chunk["text"] for chunk in to_add] == ["new"]
+    assert to_delete == [chunk_hash("gone")]
+
+
+def test_sync_local_index_embeds_only_what_changed(tmp_path):
+    embeddings = StubEmbeddings(dimension=32)
+    store = LocalVectorStore(embeddings, index_dir=str(tmp_path / "index"))
+    data_path = tmp_path / "data.txt"
+
+    stats = sync_local_index(store, write_data(data_path, ["Mess opens at 7.", "Gym closes at 10."]))
+    assert stats == {"added": 2, "deleted": 0, "unchanged": 0}
+    calls = embeddings.calls
+
+    stats = sync_local_index(store, write_data(data_path, ["Mess opens at 7.", "Wifi password is on the board."]))
+    assert stats == {"added": 1, "deleted": 1, "unchanged": 1}
+    assert embeddings.calls == calls + 1
+    assert store.texts == ["Mess opens at 7.", "Wifi password is on the board."]
+    assert store.vectors.shape == (2, 32)
+    wifi = "Wifi password is on the board."
+    assert store.similarity_search(wifi, k=1)[0].page_content == wifi
+
+
+def test_dry_run_leaves_the_index_alone(tmp_path):
+    store = LocalVectorStore(StubEmbeddings(dimension=32), index_dir=str(tmp_path / "index"))
+
+    stats = sync_local_index(store, write_data(tmp_path / "data.txt", ["Mess opens at 7."]), dry_run=True)
+
+    assert stats["added"] == 1
+    assert store.ids == []
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_client import LLMRequestError, ResilientLLM
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each request with the server's next scripted step."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with self.server.lock:
+            self.server.requests += 1
+            number = self.server.requests
+        self.server.respond(self, number)
+
+    def send_body(self, status: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, tokens, gap: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            data = f"data:{json.dumps({'token': {'text': token}})}\n\n".encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+            time.sleep(gap)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def endpoint():
+    servers = []
+
+    def start(respond):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+        server.respond = respond
+        server.requests = 0
+        server.lock = threading.Lock()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stream_may_outlast_the_call_deadline(endpoint):
+    _, url = endpoint(lambda handler, number: handler.send_stream(["a", "b", "c"], gap=0.4))
+    llm = ResilientLLM(endpoint_url=url, timeout=0.5, stream_gap_timeout=1.0, max_attempts=1)
+    assert "".join(llm.stream("question")) == "abc"
+
+
+def test_stalled_stream_fails_after_the_gap_timeout(endpoint):
+    _, url = endpoint(lambda handler, number: handler.send_stream(["a", "b"], gap=1.0))
+    llm = ResilientLLM(endpoint_url=url, timeout=5.0, stream_gap_timeout=0.3, max_attempts=1)
+    with pytest.raises(LLMRequestError):
+        "".join(llm.stream("question"))
+
+
+def test_losing_hedge_is_not_retried(endpoint):
+    def respond(handler, number):
+        if number == 1:
+            time.sleep(0.5)
+            handler.send_body(503, {"error": "overloaded"})
+        else:
+            handler.send_body(200, [{"generated_text": "answer"}])
+
+    server, url = endpoint(respond)
+    llm = ResilientLLM(endpoint_url=url, hedge=True, hedge_delay=0.1, backoff_base=0.01)
+    assert llm.invoke("question") == "answer"
+    time.sleep(0.8)
+    assert server.requests == 2
+    assert llm.stats()["retries"] == 0
+
+
+def test_hedge_is_skipped_without_budget(endpoint):
+    def respond(handler, number):
+        time.sleep(0.3)
+        handler.send_body(200, [{"generated_text": "answer"}])
+
+    server, url = endpoint(respond)
+    llm = ResilientLLM(endpoint_url=url, hedge=True, hedge_delay=0.05, hedge_budget=lambda: False)
+    assert llm.invoke("question") == "answer"
+    assert server.requests == 1
+    assert llm.stats()["hedges_skipped"] == 1
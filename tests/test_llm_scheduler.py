@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMScheduler, LLMShedError
+from metrics import Metrics
+
+
+def make_scheduler(**kwargs) -> LLMScheduler:
+    kwargs.setdefault("metrics", Metrics())
+    return LLMScheduler(**kwargs)
+
+
+def wait_for(condition, timeout: float = 2.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "condition not reached"
+        time.sleep(0.005)
+
+
+def queue_in_thread(scheduler: LLMScheduler, outcomes: list, **kwargs) -> threading.Thread:
+    """acquire() in a thread, appending the ticket or the shed reason to outcomes."""
+    def run():
+        try:
+            outcomes.append(scheduler.acquire(**kwargs))
+        except LLMShedError as e:
+            outcomes.append(e.reason)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_slow_calls_do_not_lock_out_an_idle_scheduler():
+    scheduler = make_scheduler(deadline=20.0)
+    for _ in range(5):
+        scheduler.release(scheduler.acquire(), service_seconds=25.0)
+    assert scheduler.service_seconds() == 25.0
+
+    ticket = scheduler.acquire()
+    scheduler.release(ticket)
+    assert scheduler.admitted == 6
+    assert scheduler.shed == {}
+
+
+def test_old_service_times_stop_counting():
+    scheduler = make_scheduler(service_window=0.05, default_service_seconds=1.0)
+    for _ in range(5):
+        scheduler.release(scheduler.acquire(), service_seconds=25.0)
+    time.sleep(0.1)
+    assert scheduler.service_seconds() == 1.0
+
+
+def test_failed_calls_are_not_timed():
+    scheduler = make_scheduler(default_service_seconds=1.0)
+    for _ in range(5):
+        scheduler.release(scheduler.acquire(), RuntimeError("boom"))
+    assert scheduler.service_seconds() == 1.0
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_shed_on_deadline_when_the_wait_is_too_long():
+    scheduler = make_scheduler(max_in_flight=1, default_service_seconds=1.0)
+    held = scheduler.acquire()
+    with pytest.raises(LLMShedError) as shed:
+        scheduler.acquire(deadline=0.5)
+    assert shed.value.reason == "deadline"
+    scheduler.release(held)
+
+
+def test_shed_when_the_queue_is_full():
+    scheduler = make_scheduler(max_in_flight=1, max_queue=1, deadline=None)
+    held = scheduler.acquire()
+    outcomes = []
+    waiter = queue_in_thread(scheduler, outcomes)
+    wait_for(lambda: scheduler.stats()["queued"] == 1)
+
+    with pytest.raises(LLMShedError) as shed:
+        scheduler.acquire()
+    assert shed.value.reason == "queue_full"
+
+    scheduler.release(held)
+    waiter.join(1)
+    scheduler.release(outcomes[0])
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_interactive_call_evicts_a_queued_batch_call():
+    scheduler = make_scheduler(max_in_flight=1, max_queue=1, deadline=None)
+    held = scheduler.acquire()
+    outcomes = []
+    waiter = queue_in_thread(scheduler, outcomes, priority=PRIORITY_BATCH)
+    wait_for(lambda: scheduler.stats()["queued"] == 1)
+
+    interactive = []
+    queued = queue_in_thread(scheduler, interactive, priority=PRIORITY_INTERACTIVE)
+    waiter.join(1)
+    assert outcomes == ["evicted"]
+
+    scheduler.release(held)
+    queued.join(1)
+    scheduler.release(interactive[0])
+    assert scheduler.shed == {"evicted": 1}
+
+
+def test_queued_call_expires_before_its_deadline():
+    scheduler = make_scheduler(max_in_flight=1, default_service_seconds=0.1)
+    held = scheduler.acquire()
+    start = time.monotonic()
+    with pytest.raises(LLMShedError) as shed:
+        scheduler.acquire(deadline=0.35)
+    assert shed.value.reason == "expired"
+    # Shed once a typical call could no longer finish, not at the deadline itself
+    assert time.monotonic() - start < 0.35
+    scheduler.release(held)
+
+
+def test_rate_budget_spaces_calls_and_pauses_on_429():
+    scheduler = make_scheduler(rate=20.0, burst=1, deadline=None)
+    scheduler.release(scheduler.acquire())
+    start = time.monotonic()
+    scheduler.release(scheduler.acquire())
+    assert time.monotonic() - start >= 0.04
+
+    error = RuntimeError("rate limited")
+    error.status = 429
+    error.retry_after = 0.2
+    scheduler.release(scheduler.acquire(), error)
+    assert scheduler.try_take_token() is False
+    start = time.monotonic()
+    scheduler.release(scheduler.acquire())
+    assert time.monotonic() - start >= 0.15
+
+
+def test_cancelled_async_waiter_releases_its_slot():
+    scheduler = make_scheduler(max_in_flight=1, deadline=None)
+
+    async def main():
+        held = scheduler.acquire()
+
+        async def waiter():
+            async with scheduler.aslot():
+                pass
+
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        scheduler.release(held)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert scheduler.stats()["in_flight"] == 0
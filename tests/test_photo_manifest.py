@@ -0,0 +1,54 @@
+import os
+import time
+
+from PIL import Image
+
+import photo_manifest
+from photo_manifest import PhotoManifest
+
+
+def make_photo(photos, name: str, color: str):
+    folder = photos / "rooms" / "rooms"
+    folder.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (64, 48), color).save(folder / name)
+    return str(folder / name)
+
+
+def test_photos_are_served_before_their_thumbnails_are_built(tmp_path, monkeypatch):
+    photos = tmp_path / "photos"
+    path = make_photo(photos, "a.jpg", "red")
+    make_thumbnail = photo_manifest._make_thumbnail
+
+    def slow_thumbnail(source, target):
+        time.sleep(0.5)
+        return make_thumbnail(source, target)
+
+    monkeypatch.setattr(photo_manifest, "_make_thumbnail", slow_thumbnail)
+    manifest = PhotoManifest(str(photos), check_interval=0.0)
+
+    start = time.perf_counter()
+    assert manifest.get("rooms", "rooms") == [path]
+    assert time.perf_counter() - start < 0.4
+    assert manifest.thumbnail_bytes(path) is None
+
+    assert manifest.wait_for_build(5.0)
+    assert manifest.thumbnail_bytes(path)[:4] == b"RIFF"
+
+
+def test_a_changed_photo_drops_its_old_thumbnail_until_the_rebuild(tmp_path):
+    photos = tmp_path / "photos"
+    path = make_photo(photos, "a.jpg", "red")
+    manifest = PhotoManifest(str(photos), check_interval=0.0)
+    manifest.refresh()
+    assert manifest.wait_for_build(5.0)
+    old = manifest.thumbnail_bytes(path)
+    assert old
+
+    Image.new("RGB", (96, 96), "blue").save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    manifest.refresh()
+    assert manifest._thumbnails[path] is None
+
+    assert manifest.wait_for_build(5.0)
+    assert manifest.thumbnail_bytes(path) not in (None, old)
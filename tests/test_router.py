@@ -0,0 +1,21 @@
+import pytest
+
+from bench_router import QUESTIONS, legacy_route, router_route
+from router import IntentRouter
+
+EXTRA_QUESTIONS = [
+    "Weekly menu?",
+    "Sunday and Monday dinner",
+    "Monday night food",
+    "Show me the common room and the washing area",
+    "Any pics of the toilet in the facilities block?",
+    "View of the campus",
+    "Can I look at the mess kitchen",
+    "What is the curfew?",
+    "",
+]
+
+
+@pytest.mark.parametrize("question", QUESTIONS + EXTRA_QUESTIONS)
+def test_router_matches_the_original_cascade(question):
+    assert router_route(IntentRouter(), question) == legacy_route(question)
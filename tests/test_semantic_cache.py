@@ -0,0 +1,54 @@
+import time
+from types import SimpleNamespace
+
+import semantic_cache
+from semantic_cache import SemanticCache
+
+
+def test_lookup_honours_the_similarity_threshold():
+    cache = SemanticCache(threshold=0.9)
+    cache.store("Mess timings?", [1.0, 0.0], "7 to 9")
+
+    assert cache.lookup([0.95, 0.1]) == "7 to 9"
+    assert cache.lookup([0.5, 0.5]) is None
+    assert cache.lookup_question("  mess TIMINGS ") == "7 to 9"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now)
+    cache = SemanticCache(ttl=60)
+    cache.store("Mess timings?", [1.0, 0.0], "7 to 9")
+
+    now += 61
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.lookup_question("Mess timings?") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticCache(max_entries=2)
+    cache.store("first", [1.0, 0.0, 0.0], "a")
+    cache.store("second", [0.0, 1.0, 0.0], "b")
+    assert cache.lookup([1.0, 0.0, 0.0]) == "a"
+
+    cache.store("third", [0.0, 0.0, 1.0], "c")
+
+    assert cache.lookup_question("second") is None
+    assert cache.lookup_question("first") == "a"
+    assert cache.lookup_question("third") == "c"
+
+
+def test_vectors_of_another_embedding_model_are_dropped_but_answers_kept(tmp_path):
+    path = tmp_path / "answers.json"
+    cache = SemanticCache(persist_path=str(path))
+    cache.bind_embeddings(SimpleNamespace(model_name="model-a"))
+    cache.store("Mess timings?", [1.0, 0.0], "7 to 9")
+    cache.close()
+
+    reloaded = SemanticCache(persist_path=str(path))
+    assert reloaded.embedding_model == "model-a"
+    reloaded.bind_embeddings(SimpleNamespace(model_name="model-b"))
+    assert reloaded.lookup([1.0, 0.0]) is None
+    assert reloaded.lookup_question("Mess timings?") == "7 to 9"
+    reloaded.close()
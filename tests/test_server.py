@@ -0,0 +1,58 @@
+import http.client
+import threading
+import time
+
+import pytest
+
+from server import PooledHTTPServer, make_handler
+
+
+class SlowChatbot:
+    is_ready = True
+    warmup_error = None
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def get_response(self, question):
+        time.sleep(self.seconds)
+        return "answer"
+
+
+@pytest.fixture
+def server():
+    httpd = PooledHTTPServer(("127.0.0.1", 0), make_handler(SlowChatbot(1.0)), threads=1)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(server, method: str, path: str, body: bytes = b"", headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def test_health_checks_do_not_wait_for_busy_request_threads(server):
+    answering = [threading.Thread(target=request, args=(server, "POST", "/v1/answer", b'{"question": "hi"}'))
+                 for _ in range(2)]
+    for thread in answering:
+        thread.start()
+    time.sleep(0.1)
+
+    start = time.monotonic()
+    assert request(server, "GET", "/healthz")[0] == 200
+    assert request(server, "GET", "/readyz")[0] == 200
+    assert request(server, "GET", "/metrics")[0] == 200
+    assert time.monotonic() - start < 0.5
+    for thread in answering:
+        thread.join()
+
+
+@pytest.mark.parametrize("length", ["abc", "-1"])
+def test_invalid_content_length_is_a_bad_request(server, length):
+    status, _ = request(server, "POST", "/v1/answer", headers={"Content-Length": length})
+    assert status == 400
@@ -0,0 +1,69 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_followers_share_the_leaders_result():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(flights.do, "key", compute) for _ in range(4)]
+        while flights.leaders + flights.followers < 4:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert all(result == "answer" for result, _ in results)
+    assert flights.stats() == {"leaders": 1, "followers": 3, "in_flight": 0, "coalesced_rate": 0.75}
+
+
+def test_followers_raise_the_leaders_error():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise ValueError("endpoint down")
+
+    with ThreadPoolExecutor(3) as executor:
+        futures = [executor.submit(flights.do, "key", compute) for _ in range(3)]
+        while flights.leaders + flights.followers < 3:
+            time.sleep(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="endpoint down"):
+                future.result()
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_followers_compute_for_themselves_when_the_leader_abandons():
+    flights = SingleFlight()
+    flight, leading = flights.join("key")
+    assert leading
+
+    with ThreadPoolExecutor(1) as executor:
+        follower = executor.submit(flights.do, "key", lambda: "own answer")
+        while flights.followers < 1:
+            time.sleep(0.01)
+        flights.abandon("key", flight)
+        assert follower.result() == ("own answer", False)
+
+
+def test_a_finished_key_starts_a_new_flight():
+    flights = SingleFlight()
+    assert flights.do("key", lambda: 1) == (1, False)
+    assert flights.do("key", lambda: 2) == (2, False)
+    assert flights.leaders == 2
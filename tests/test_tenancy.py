@@ -0,0 +1,57 @@
+import gc
+import os
+import threading
+import weakref
+
+from semantic_cache import SemanticCache
+from stubs import StubChatbot
+from tenancy import Tenant, TenantRegistry
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def make_tenants(tmp_path, count: int):
+    return [Tenant(id=f"hostel{i}", data_path=os.path.join(ROOT_DIR, "data", "data.txt"),
+                   index_dir=str(tmp_path / f"index{i}"), menu_path=os.path.join(ROOT_DIR, "data", "mess_menu.csv"),
+                   photos_directory=os.path.join(ROOT_DIR, "hostel_photos"))
+            for i in range(count)]
+
+
+def test_concurrent_first_requests_load_a_tenant_once(tmp_path):
+    registry = TenantRegistry(make_tenants(tmp_path, 1), {}, memory_budget_mb=float("inf"),
+                              chatbot_class=StubChatbot)
+    chatbots = []
+    threads = [threading.Thread(target=lambda: chatbots.append(registry.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.loads == 1
+    assert all(chatbot is chatbots[0] for chatbot in chatbots)
+
+
+def test_flight_started_after_a_load_reuses_the_loaded_tenant(tmp_path):
+    registry = TenantRegistry(make_tenants(tmp_path, 1), {}, memory_budget_mb=float("inf"),
+                              chatbot_class=StubChatbot)
+    chatbot = registry.get()
+    # What a request that missed get()'s check while the first load finished ends up running
+    assert registry._load_once("hostel0") is chatbot
+    assert registry.loads == 1
+
+
+def test_evicted_tenant_saves_and_releases_its_answer_cache(tmp_path):
+    registry = TenantRegistry(
+        make_tenants(tmp_path, 2), {}, memory_budget_mb=0.0, chatbot_class=StubChatbot,
+        answer_cache_factory=lambda tenant: SemanticCache(persist_path=str(tmp_path / f"{tenant.id}.json"))
+    )
+    first = registry.get("hostel0")
+    first.answer_cache.store("What is the fee?", None, "1000")
+    evicted_cache = weakref.ref(first.answer_cache)
+    del first
+    registry.get("hostel1")
+
+    assert registry.stats()["loaded"] == ["hostel1"]
+    gc.collect()
+    # No exit hook keeps the evicted tenant's cache in memory
+    assert evicted_cache() is None
+    assert (tmp_path / "hostel0.json").exists()
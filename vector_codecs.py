@@ -0,0 +1,172 @@
+"""
+Compressed in-memory copies of an index's vectors, for approximate search.
+
+    float16  half-precision copy (2 bytes per dimension); scores are near exact
+    int8     per-dimension scalar quantization to one byte per dimension, with the
+             query kept in float (asymmetric distance)
+    pq       product quantization: the vector is split into `subvectors` pieces, each
+             stored as the id of its nearest of 256 centroids (one byte per piece);
+             a query scores against per-piece lookup tables (asymmetric distance)
+
+A codec returns approximate inner-product scores for every stored vector; LocalVectorStore
+takes the best candidates and re-ranks them against the full-precision vectors, which
+stay memory-mapped on disk, so only the candidate rows are read.
+"""
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows upcast to float32 at a time when scoring, bounding the scratch memory per query
+BLOCK_ROWS = 8192
+
+
+class VectorCodec:
+    """Base class: fit on the full-precision vectors, then score queries against the codes."""
+
+    name = "none"
+
+    def fit(self, vectors: np.ndarray) -> "VectorCodec":
+        raise NotImplementedError
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate inner products of query with every stored vector."""
+        raise NotImplementedError
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Arrays to persist; from_state() rebuilds the codec from them."""
+        raise NotImplementedError
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "VectorCodec":
+        codec = cls.__new__(cls)
+        codec.__dict__.update(state)
+        return codec
+
+    @property
+    def nbytes(self) -> int:
+        return sum(value.nbytes for value in self.state().values())
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+class Float16Codec(VectorCodec):
+    name = "float16"
+
+    def fit(self, vectors: np.ndarray) -> "Float16Codec":
+        self.codes = np.asarray(vectors, dtype=np.float16)
+        return self
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        # NumPy has no BLAS for float16, so score in float32 a block at a time
+        out = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = self.codes[start:start + BLOCK_ROWS].astype(np.float32) @ query
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codes": self.codes}
+
+
+class Int8Codec(VectorCodec):
+    """x[d] ~ offset[d] + scale[d] * code[d], with codes in 0..255 spanning each dimension's range."""
+
+    name = "int8"
+
+    def fit(self, vectors: np.ndarray) -> "Int8Codec":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        self.offset = low
+        self.scale = np.where(high > low, (high - low) / 255, 1.0).astype(np.float32)
+        self.codes = np.clip(np.rint((vectors - low) / self.scale), 0, 255).astype(np.uint8)
+        return self
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        # q . x ~ (q * scale) . code + q . offset
+        scaled = query * self.scale
+        bias = float(query @ self.offset)
+        out = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = self.codes[start:start + BLOCK_ROWS].astype(np.float32) @ scaled
+        return out + bias
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codes": self.codes, "offset": self.offset, "scale": self.scale}
+
+
+def kmeans(points: np.ndarray, k: int, iterations: int = 15, seed: int = 0) -> np.ndarray:
+    """Centroids of points (Lloyd's algorithm, started from k distinct random points)."""
+    rng = np.random.default_rng(seed)
+    centroids = points[rng.choice(len(points), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignment = nearest(points, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, points)
+        counts = np.bincount(assignment, minlength=k)
+        # Empty clusters keep their previous centroid
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid (squared Euclidean distance) for each point."""
+    distances = (centroids ** 2).sum(axis=1)[None, :] - 2 * points @ centroids.T
+    return distances.argmin(axis=1)
+
+
+class PQCodec(VectorCodec):
+    """Product quantization with 256 centroids (one byte) per subvector."""
+
+    name = "pq"
+
+    def __init__(self, subvectors: int = 64, train_size: int = 10000, seed: int = 0):
+        self.subvectors = subvectors
+        self.train_size = train_size
+        self.seed = seed
+
+    def fit(self, vectors: np.ndarray) -> "PQCodec":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n, dim = vectors.shape
+        # The largest piece count up to the requested one that divides the dimension
+        m = max(d for d in range(1, min(self.subvectors, dim) + 1) if dim % d == 0)
+        sub = dim // m
+        k = min(256, n)
+        rng = np.random.default_rng(self.seed)
+        train = vectors[rng.choice(n, self.train_size, replace=False)] if n > self.train_size else vectors
+        self.centroids = np.stack([
+            kmeans(train[:, j * sub:(j + 1) * sub], k, seed=self.seed + j) for j in range(m)
+        ])
+        self.codes = np.empty((n, m), dtype=np.uint8)
+        for j in range(m):
+            self.codes[:, j] = nearest(vectors[:, j * sub:(j + 1) * sub], self.centroids[j])
+        return self
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        m, k, sub = self.centroids.shape
+        # tables[j, c] = query piece j . centroid c of piece j
+        tables = np.einsum("jcd,jd->jc", self.centroids, query.reshape(m, sub))
+        pieces = np.arange(m)
+        out = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = tables[pieces, self.codes[start:start + BLOCK_ROWS]].sum(axis=1)
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codes": self.codes, "centroids": self.centroids}
+
+
+CODECS = {codec.name: codec for codec in (Float16Codec, Int8Codec, PQCodec)}
+COMPRESSION_MODES = ("none",) + tuple(CODECS)
+
+
+def make_codec(mode: str) -> Optional[VectorCodec]:
+    """An unfitted codec for a compression mode, or None for "none"."""
+    if mode == "none":
+        return None
+    if mode not in CODECS:
+        raise Exception(f"Unknown vector compression: {mode} (expected one of {', '.join(COMPRESSION_MODES)})")
+    return CODECS[mode]()